@@ -0,0 +1,75 @@
+"""Micro-benchmark: per-page field resolution, legacy per-field loop vs. the precompiled FIELD_PLAN.
+
+Usage: PYTHONPATH=src python scripts/bench_field_resolution.py [html-file] [iterations]
+Only the mapping from the parsed header/value dict to Subject fields is timed (no HTML parsing).
+"""
+
+import logging
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, get_args, get_origin
+
+from pydantic import AliasChoices
+
+from extractors import FIELD_PLAN, _clean_value, _map_fields, _parse_detail_table, _split_list_value, make_soup
+from models import JOINED_FIELDS, Subject
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE = Path(__file__).resolve().parent.parent / "tests/fixtures/html/small/2025_AA_10000100.html"
+
+
+def legacy_map_fields(raw_data_dict: dict[str, str]) -> dict[str, Any]:
+    """The per-page resolution extract_subject_data used before FIELD_PLAN (kept for comparison)."""
+    subject_data: dict[str, Any] = {}
+    for field_name, field_info in Subject.model_fields.items():
+        if field_name in JOINED_FIELDS:
+            # Filled from another page after extraction; not part of the detail table (nor of FIELD_PLAN).
+            continue
+        possible_keys: set[str] = set()
+        if field_info.alias:
+            possible_keys.add(field_info.alias)
+        if isinstance(field_info.validation_alias, AliasChoices):
+            possible_keys.update(c for c in field_info.validation_alias.choices if isinstance(c, str))
+        br_variants: set[str] = set()
+        for key in possible_keys:
+            if " " in key:
+                for br in ("<br>", "<BR>", "<br/>", "<BR/>"):
+                    br_variants.add(key.replace(" ", br))
+        possible_keys.update(br_variants)
+        raw_value = next((raw_data_dict[k] for k in possible_keys if k in raw_data_dict), None)
+        cleaned_value = _clean_value(raw_value)
+        annotation = field_info.annotation
+        is_list_type = get_origin(annotation) is list or any(get_origin(a) is list for a in get_args(annotation))
+        if is_list_type:
+            subject_data[field_name] = _split_list_value(cleaned_value) or []
+        else:
+            subject_data[field_name] = cleaned_value if cleaned_value is not None else ""
+    return subject_data
+
+
+def main():
+    page = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PAGE
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000  # noqa: PLR2004
+    raw = _parse_detail_table(make_soup(page.read_text(encoding="utf-8")))
+    if legacy_map_fields(raw) != _map_fields(raw, FIELD_PLAN):
+        logger.error("Legacy and planned field resolution disagree for %s", page)
+        return 1
+
+    results = {}
+    for name, fn in (("legacy", lambda: legacy_map_fields(raw)), ("plan", lambda: _map_fields(raw, FIELD_PLAN))):
+        best = min(timeit.repeat(fn, number=iterations, repeat=5))
+        results[name] = best / iterations * 1e6
+        logger.info("%-6s %8.1f us/page", name, results[name])
+    logger.info(
+        "saving: %.1f us/page (%.1fx faster)",
+        results["legacy"] - results["plan"],
+        results["legacy"] / results["plan"],
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Measure CLI startup: ``import cli`` (via ``python -X importtime``) and ``cli --help`` wall time.
+
+Usage: PYTHONPATH=src python scripts/bench_import_time.py [budget-ms] [runs]
+Lists the slowest imports, and fails (exit status 1) when a heavy dependency is imported at startup,
+when startup touches the filesystem, or when the median ``--help`` run exceeds budget-ms (default 500).
+The budget leaves headroom over the ~300 ms seen on a loaded 1-CPU machine; the median of several runs
+(default 7) keeps one slow run from failing the check.
+Everything runs in fresh interpreters inside an empty temporary directory.
+"""
+
+import logging
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+# Only the commands that actually harvest may import these.
+HEAVY_MODULES = ("pandas", "numpy", "bs4", "html5lib", "lxml", "requests", "pyarrow", "models", "harvester")
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _env() -> dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (str(SRC_DIR), env.get("PYTHONPATH")) if p)
+    return env
+
+
+def import_profile(cwd: Path) -> list[tuple[str, int, int]]:
+    """``python -X importtime -c 'import cli'`` の結果を (モジュール, 自身 us, 累積 us) のリストで返す"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import cli"],
+        cwd=cwd,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2))))
+    return rows
+
+
+def help_wall_times(cwd: Path, runs: int) -> list[float]:
+    """``python -m cli --help`` の各回の実行時間 (秒)"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "cli", "--help"], cwd=cwd, env=_env(), capture_output=True, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 500.0  # noqa: PLR2004
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 7  # noqa: PLR2004
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = Path(tmp)
+        rows = import_profile(cwd)
+        total_us = next(cumulative for name, _, cumulative in rows if name == "cli")
+        logger.info("import cli: %.1f ms cumulative; slowest imports:", total_us / 1000)
+        for name, own, cumulative in sorted(rows, key=lambda r: r[2], reverse=True)[:10]:
+            logger.info("  %8.1f ms  (self %6.1f ms)  %s", cumulative / 1000, own / 1000, name)
+
+        heavy = sorted({name.split(".")[0] for name, _, _ in rows} & set(HEAVY_MODULES))
+        if heavy:
+            logger.error("Heavy modules imported at CLI startup: %s", ", ".join(heavy))
+            failed = True
+
+        times = help_wall_times(cwd, runs)
+        median = statistics.median(times)
+        logger.info(
+            "cli --help: %.1f ms (median of %d, min %.1f ms, max %.1f ms, budget %.0f ms)",
+            median * 1000,
+            runs,
+            min(times) * 1000,
+            max(times) * 1000,
+            budget_ms,
+        )
+        if median * 1000 > budget_ms:
+            logger.error("cli --help is over budget.")
+            failed = True
+
+        created = sorted(p.name for p in cwd.iterdir() if p.name != "__pycache__")
+        if created:
+            logger.error("CLI startup created files in the working directory: %s", created)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Benchmark Subject construction: per-record validation vs. validate_subjects vs. model_validate of dumped records.
+
+Usage: PYTHONPATH=src python scripts/bench_validation.py [records] [html-file]
+Raw dicts are taken from the fixture page (as extract_subject_data builds them) and repeated.
+"""
+
+import logging
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from extractors import FIELD_PLAN, _map_fields, _parse_detail_table, make_soup
+from models import Subject, validate_subjects
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE = Path(__file__).resolve().parent.parent / "tests/fixtures/html/small/2025_AA_10000100.html"
+
+
+def _best_of(fn: Callable[[], object], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    page = Path(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PAGE  # noqa: PLR2004
+    raw = _map_fields(_parse_detail_table(make_soup(page.read_text(encoding="utf-8"))), FIELD_PLAN)
+    # Fresh dicts each run: the model's before-validators normalize values in place.
+    raw_records = [dict(raw) for _ in range(n)]
+    dumped = [r.model_dump(mode="json") for r in validate_subjects(dict(d) for d in raw_records)]
+
+    timings = {
+        "per-record Subject(**d)": _best_of(lambda: [Subject(**dict(d)) for d in raw_records]),
+        "validate_subjects(batch)": _best_of(lambda: validate_subjects(dict(d) for d in raw_records)),
+        "model_validate(dumped)": _best_of(lambda: [Subject.model_validate(d) for d in dumped]),
+        "model_construct(dumped)": _best_of(lambda: [Subject.model_construct(**d) for d in dumped]),
+    }
+    baseline = timings["per-record Subject(**d)"]
+    for name, seconds in timings.items():
+        logger.info("%-26s %8.2f us/record  %5.2fx", name, seconds / n * 1e6, baseline / seconds)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Benchmark local harvesting and saving on synthetic corpora of increasing size.
+
+Usage: PYTHONPATH=src python scripts/benchmark.py [--sizes 100 1000 10000] [--workers N]
+       [--parser html5lib|lxml] [--format json ...] [--corpus-dir DIR] [--json results.json]
+
+For each size a corpus is generated with scripts/generate_corpus.py (reused if --corpus-dir already
+holds one of that size) and measured in a fresh subprocess, so peak RSS is per size. Reported per stage:
+pages/sec, per-page latency percentiles and peak RSS. For harvest_from_local a page's latency is the
+time the consumer waits for it; for save_results it is the time spent writing that record. JSON and
+JSON Lines are streamed record by record, so their cost shows in the percentiles; Parquet buffers a row
+group and writes it every 10,000 records, so its cost lands on those records as tail latency.
+--json writes the results as a JSON file for comparison between releases.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_SIZES = (100, 1000, 10000)
+PERCENTILES = (50, 90, 99)
+
+
+def _timed_produce(items: Iterable[T], latencies: list[float]) -> Iterator[T]:
+    """items を順に yield し、各要素が生成されるまでの待ち時間を latencies に追記する"""
+    it = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        latencies.append(time.perf_counter() - start)
+        yield item
+
+
+def _timed_consume(items: Iterable[T], latencies: list[float]) -> Iterator[T]:
+    """items を順に yield し、呼び出し側が各要素を処理して次を要求するまでの時間を latencies に追記する"""
+    for item in items:
+        start = time.perf_counter()
+        yield item
+        latencies.append(time.perf_counter() - start)
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux (bytes on macOS). Worker processes are counted separately.
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    kib = max(own, children) / (1024 if sys.platform == "darwin" else 1)
+    return kib / 1024
+
+
+def _stage(name: str, count: int, elapsed: float, latencies: list[float]) -> dict[str, Any]:
+    ordered = sorted(latencies)
+    stage: dict[str, Any] = {
+        "stage": name,
+        "records": count,
+        "seconds": round(elapsed, 4),
+        "pages_per_sec": round(count / elapsed, 1) if elapsed else 0.0,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+    for pct in PERCENTILES:
+        stage[f"p{pct}_ms"] = round(_percentile(ordered, pct) * 1000, 3)
+    return stage
+
+
+def run_once(corpus_dir: Path, workers: int, parser: str, formats: list[str]) -> list[dict[str, Any]]:
+    """1つのコーパスに対して harvest_from_local と save_results を計測する (子プロセスで呼ぶ)"""
+    # Imported here so that the parent process stays small and does not skew the children's RSS.
+    from harvester import Harvester
+    from settings import get_settings
+    from writers import OutputFormat
+
+    logging.getLogger("config").setLevel(logging.ERROR)
+    settings = get_settings()
+    settings.html_parser = parser
+    harv = Harvester(settings)
+
+    latencies: list[float] = []
+    start = time.perf_counter()
+    # Equivalent to harvest_from_local(), with each page timed as it arrives.
+    subjects = list(_timed_produce(harv.iter_local(corpus_dir, workers), latencies))
+    harvest = _stage("harvest_from_local", len(subjects), time.perf_counter() - start, latencies)
+
+    latencies = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        start = time.perf_counter()
+        count = harv.save_results(
+            _timed_consume(subjects, latencies), Path(out_dir) / "subjects.json", [OutputFormat(f) for f in formats]
+        )
+        save = _stage("save_results", count, time.perf_counter() - start, latencies)
+    return [harvest, save]
+
+
+def _ensure_corpus(root: Path, size: int) -> Path:
+    from scripts.generate_corpus import generate_corpus
+
+    corpus_dir = root / f"corpus_{size}"
+    if len(list(corpus_dir.glob("*_*_*.html"))) != size:
+        logger.info("Generating %d pages in %s ...", size, corpus_dir)
+        generate_corpus(corpus_dir, size)
+    return corpus_dir
+
+
+def _run_child(corpus_dir: Path, args: argparse.Namespace) -> list[dict[str, Any]]:
+    cmd = [sys.executable, __file__, "--child", str(corpus_dir), "--workers", str(args.workers)]
+    cmd += ["--parser", args.parser, "--format", *args.format]
+    completed = subprocess.run(cmd, check=True, capture_output=True, text=True)
+    return json.loads(completed.stdout)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--parser", default="html5lib")
+    ap.add_argument("--format", nargs="+", default=["json"])
+    ap.add_argument("--corpus-dir", type=Path, help="where corpora are generated and reused (default: a temp dir)")
+    ap.add_argument("--json", type=Path, help="write the results to this JSON file")
+    ap.add_argument("--child", type=Path, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child is not None:
+        json.dump(run_once(args.child, args.workers, args.parser, args.format), sys.stdout)
+        return 0
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    results: list[dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.corpus_dir or Path(tmp)
+        for size in args.sizes:
+            for stage in _run_child(_ensure_corpus(root, size), args):
+                stage["pages"] = size
+                results.append(stage)
+                logger.info(
+                    "%6d pages  %-18s %9.1f pages/s  p50 %8.3f ms  p90 %8.3f ms  p99 %8.3f ms  peak RSS %7.1f MB",
+                    size,
+                    stage["stage"],
+                    stage["pages_per_sec"],
+                    stage["p50_ms"],
+                    stage["p90_ms"],
+                    stage["p99_ms"],
+                    stage["peak_rss_mb"],
+                )
+
+    if args.json is not None:
+        payload = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "workers": args.workers,
+            "parser": args.parser,
+            "formats": args.format,
+            "results": results,
+        }
+        args.json.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        logger.info("Results written to %s", args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""Run two HTML parser backends over a corpus and report field-level differences.
+
+Usage: python scripts/check_parser_parity.py <html-dir> [baseline] [candidate]
+Exit status is 0 when every page produces identical records, 1 otherwise.
+"""
+
+import logging
+import sys
+from collections import Counter
+from pathlib import Path
+
+from parity import compare_parsers, iter_html_dir
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    if len(sys.argv) < 2:  # noqa: PLR2004
+        logger.error("Usage: check_parser_parity.py <html-dir> [baseline] [candidate]")
+        return 2
+    html_dir = Path(sys.argv[1])
+    baseline = sys.argv[2] if len(sys.argv) > 2 else "html5lib"  # noqa: PLR2004
+    candidate = sys.argv[3] if len(sys.argv) > 3 else "lxml"  # noqa: PLR2004
+    if not html_dir.is_dir():
+        logger.error("Directory not found: %s", html_dir)
+        return 2
+
+    # Keep per-page extraction logs out of the report
+    logging.getLogger("config").setLevel(logging.ERROR)
+    diffs = list(compare_parsers(iter_html_dir(html_dir), baseline, candidate))
+    if diffs:
+        for d in diffs:
+            logger.error("[%s] %s: %s=%r %s=%r", d.source, d.field, baseline, d.baseline, candidate, d.candidate)
+        by_field = Counter(d.field for d in diffs)
+        logger.error(
+            "%d differences in %d pages; by field: %s",
+            len(diffs),
+            len({d.source for d in diffs}),
+            dict(by_field.most_common()),
+        )
+        return 1
+
+    logger.info("%s and %s produce identical records for %s.", baseline, candidate, html_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    sys.exit(main())
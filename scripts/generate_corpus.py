@@ -0,0 +1,181 @@
+"""Generate a synthetic syllabus corpus for benchmarking from the fixture detail page.
+
+Usage: PYTHONPATH=src python scripts/generate_corpus.py <out-dir> [pages] [seed]
+Writes <pages> detail pages (2025_<faculty>_<code>.html) spread over several faculties, one listing
+page per faculty (2025_<faculty>.html) and an index.html, so the tree can be harvested locally or
+served to the crawler. Field lengths, header <BR> markup, rowspans and colspan quoting vary per
+page; every page still carries the canonical headers and extracts to a valid Subject.
+"""
+
+import logging
+import random
+import re
+import sys
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_DIR = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "html" / "small"
+DETAIL_TEMPLATE = FIXTURE_DIR / "2025_AA_10000100.html"
+LISTING_TEMPLATE = FIXTURE_DIR / "2025_AA.html"
+INDEX_TEMPLATE = FIXTURE_DIR / "index.html"
+
+YEAR = "2025"
+FACULTIES = (
+    ("AA", "教養教育"),
+    ("01", "総合科学部"),
+    ("02", "文学部"),
+    ("03", "教育学部"),
+    ("05", "経済学部"),
+    ("06", "理学部"),
+    ("09", "工学部"),
+    ("11", "生物生産学部"),
+)
+TERMS = ("１ターム", "２ターム", "３ターム", "４ターム", "セメスター（前期）", "セメスター（後期）")
+FAMILY_NAMES = ("林", "山田", "佐藤", "鈴木", "高橋", "田中", "伊藤", "渡辺", "中村", "小林")
+GIVEN_NAMES = ("光緒", "崇史", "太郎", "花子", "健一", "由美", "誠", "直樹", "恵", "翔")
+SUBJECT_WORDS = ("基礎", "演習", "概論", "特論", "入門", "実験", "セミナー", "応用", "研究", "講究")
+BR_VARIANTS = ("<BR>", "<br>", "<br/>", "<BR />", "<br>\n                    ")
+
+_TH_RE = re.compile(r'(<TH class="detail-head"[^>]*>)(.*?)(</TH>)', re.S)
+_BR_RE = re.compile(r"<BR>\s*", re.I)
+_OVERVIEW_RE = re.compile(r"(<TH[^>]*>授業の目標・概要等</TH>\s*<TD[^>]*>\s*)(.*?)(&nbsp;</TD>)", re.S)
+_PLAN_RE = re.compile(r"(<TH[^>]*>授業計画</TH>\s*<td[^>]*>\s*)(.*?)(&nbsp;\s*</td>)", re.S)
+_METHOD_ROWS = (
+    '<TH class="detail-head" align="center" rowspan="2">授業の方法</TH>\n'
+    '                <TD class="detail-data" rowspan="2">'
+)
+_LISTING_ROW = """
+        <tr>
+            <td class="kamoku-data" align="center">{year}</td>
+            <td class="kamoku-data" align="center">{term}</td>
+            <td class="kamoku-data">{faculty_name}</td>
+            <td class="kamoku-data">
+                {subject_name}
+            </td>
+            <td class="kamoku-data" align="center">
+                <a href="{page}">
+                    {code}
+                </a>
+            </td>
+            <td class="kamoku-data">
+                {instructor}
+            </td>
+            <td class="kamoku-data">
+                B：日本語・英語
+            </td>
+        </tr>"""
+_INDEX_LINK = """
+        <img src="../image/syllabus_list.gif">
+
+        <a href="{page}">
+            {faculty_name}
+        </a>
+        <br>"""
+
+
+def _replace_once(text: str, old: str, new: str) -> str:
+    if old not in text:
+        raise ValueError(f"Template does not contain {old!r}")
+    return text.replace(old, new, 1)
+
+
+def _vary_headers(html: str, rng: random.Random) -> str:
+    """ヘッダーセル内の <BR> の書き方を変える (抽出後のヘッダー文字列は変わらない)"""
+
+    def repl(m: re.Match[str]) -> str:
+        inner = _BR_RE.sub(lambda _: rng.choice(BR_VARIANTS), m.group(2))
+        return m.group(1) + inner + m.group(3)
+
+    return _TH_RE.sub(repl, html)
+
+
+def render_detail_page(template: str, code: str, faculty_name: str, rng: random.Random) -> tuple[str, dict[str, str]]:
+    """テンプレートの詳細ページを1件分書き換え、HTML と一覧ページ用の値を返す"""
+    subject_name = "".join(rng.sample(SUBJECT_WORDS, k=rng.randint(1, 3))) + rng.choice(("", "Ⅰ", "Ⅱ", "A"))
+    instructor = f"{rng.choice(FAMILY_NAMES)}　{rng.choice(GIVEN_NAMES)}"
+    term = rng.choice(TERMS)
+
+    html = _replace_once(template, '<TD class="detail-data">10000100</TD>', f'<TD class="detail-data">{code}</TD>')
+    html = _replace_once(html, "\n                    教養教育 </TD>", f"\n                    {faculty_name} </TD>")
+    # The subject name also appears in <title>.
+    html = html.replace("大学教育入門[1総総,1文,1経]", subject_name)
+    html = _replace_once(html, "林　光緒 </td>", f"{instructor} </td>")
+    html = _replace_once(html, "１ターム </TD>", f"{term} </TD>")
+
+    # Long free-text fields range from a single sentence to ~20x the template's length.
+    html = _OVERVIEW_RE.sub(lambda m: m.group(1) + m.group(2) * rng.randint(1, 20) + m.group(3), html, count=1)
+    html = _PLAN_RE.sub(
+        lambda m: m.group(1) + "<BR>".join([m.group(2)] * rng.randint(1, 8)) + m.group(3), html, count=1
+    )
+
+    # Some pages span the 授業の方法 block over an extra (empty) row, as a few real pages do.
+    if rng.random() < 0.3:  # noqa: PLR2004
+        html = _replace_once(html, _METHOD_ROWS, _METHOD_ROWS.replace('rowspan="2"', 'rowspan="3"'))
+        html = html.replace(
+            "moodleを用いて各自オンラインで受講する）&nbsp;</TD>\n            </tr>",
+            "moodleを用いて各自オンラインで受講する）&nbsp;</TD>\n            </tr>"
+            "\n            <tr>\n            </tr>",
+            1,
+        )
+    if rng.random() < 0.5:  # noqa: PLR2004
+        html = html.replace("colspan=5>", 'colspan="5">')
+    html = _vary_headers(html, rng)
+    return html, {"subject_name": subject_name, "instructor": instructor, "term": term}
+
+
+def generate_corpus(out_dir: Path, pages: int, seed: int = 0) -> list[Path]:
+    """out_dir に pages 件の詳細ページと、学部別一覧ページ・index.html を書き出す。
+
+    戻り値は書き出した詳細ページのパス。同じ seed なら同じコーパスになる。
+    """
+    rng = random.Random(seed)
+    template = DETAIL_TEMPLATE.read_text(encoding="utf-8")
+    listing_template = LISTING_TEMPLATE.read_text(encoding="utf-8")
+    index_template = INDEX_TEMPLATE.read_text(encoding="utf-8")
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    rows: dict[str, list[str]] = {fac: [] for fac, _ in FACULTIES}
+    written: list[Path] = []
+    for i in range(pages):
+        fac, faculty_name = FACULTIES[i % len(FACULTIES)]
+        code = f"{20000000 + i:08d}"
+        page = f"{YEAR}_{fac}_{code}.html"
+        html, values = render_detail_page(template, code, faculty_name, rng)
+        path = out_dir / page
+        path.write_text(html, encoding="utf-8")
+        written.append(path)
+        rows[fac].append(_LISTING_ROW.format(year=YEAR, faculty_name=faculty_name, page=page, code=code, **values))
+
+    # Listing pages: keep the template's header and footer, replace its subject rows.
+    head, rest = listing_template.split('\n        <tr>\n            <td class="kamoku-data"', 1)
+    tail = rest[rest.index("\n\n        <tr>\n        </tr>\n    </table>") :]
+    links = []
+    for fac, faculty_name in FACULTIES:
+        if not rows[fac]:
+            continue
+        page = f"{YEAR}_{fac}.html"
+        (out_dir / page).write_text(head + "".join(rows[fac]) + tail, encoding="utf-8")
+        links.append(_INDEX_LINK.format(page=page, faculty_name=faculty_name))
+
+    index_head, index_rest = index_template.split('\n        <img src="../image/syllabus_list.gif">', 1)
+    index_tail = index_rest[index_rest.rindex("\n\n    </blockquote>") :]
+    (out_dir / "index.html").write_text(index_head + "".join(links) + index_tail, encoding="utf-8")
+    return written
+
+
+def main():
+    if len(sys.argv) < 2:  # noqa: PLR2004
+        logger.error("Usage: generate_corpus.py <out-dir> [pages] [seed]")
+        return 2
+    out_dir = Path(sys.argv[1])
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 1000  # noqa: PLR2004
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0  # noqa: PLR2004
+    written = generate_corpus(out_dir, pages, seed)
+    logger.info("Wrote %d detail pages to %s.", len(written), out_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.exit(main())
@@ -1,7 +1,7 @@
 import json
 from pathlib import Path
 
-from models import Subject
+from models import JOINED_FIELDS, Subject
 
 
 def generate_json_schema(out_dir: Path):
@@ -20,9 +20,10 @@ def generate_json_schema(out_dir: Path):
                 schema_type = types[0]
                 # Replace property with the schema_type (no null)
                 props[k] = schema_type
-    # Add required list with all property names (aliases) derived from the model
+    # Add required list with all property names (aliases) derived from the model.
+    # Joined fields (e.g. the English page) are only present when a counterpart was found.
     fields = Subject.model_fields
-    required_aliases = [getattr(f, "alias", name) for name, f in fields.items()]
+    required_aliases = [getattr(f, "alias", name) for name, f in fields.items() if name not in JOINED_FIELDS]
     schema["required"] = required_aliases
     json_path = out_dir / "subject.schema.json"
     json_path.write_text(json.dumps(schema, indent=2, ensure_ascii=False), encoding="utf-8")
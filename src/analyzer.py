@@ -0,0 +1,214 @@
+import hashlib
+import json
+import sqlite3
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Literal
+
+import config
+from models import JOINED_FIELDS
+
+# 差分のキー (lecture_code, year)。同じ講義コードでも年度が違えば別の科目として比べる
+Key = tuple[str, str | None]
+
+
+def _from_tabular(record: dict[str, Any]) -> dict[str, Any]:
+    """表形式の出力で JSON 文字列にした入れ子の値 (writers.tabular_record) を戻し、None を除く"""
+    return {
+        k: json.loads(v) if k in JOINED_FIELDS and isinstance(v, str) else v
+        for k, v in record.items()
+        if v is not None
+    }
+
+
+def read_records(path: Path) -> Iterator[dict[str, Any]]:
+    """出力ファイル (.json / .jsonl / .sqlite / .parquet) のレコードを dict として読む。
+
+    形式によって欠損値の表し方が違う (JSON はキーを省略、SQLite / Parquet は NULL) ので、
+    値が None のキーは取り除いて揃える。Subject の検証はしない。
+    """
+    suffix = path.suffix.lower()
+    if suffix == ".json":
+        with path.open(encoding="utf-8") as f:
+            records: Iterable[dict[str, Any]] = json.load(f)
+        yield from records
+    elif suffix == ".jsonl":
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif suffix == ".sqlite":
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            for row in conn.execute("SELECT * FROM subjects ORDER BY rowid"):
+                yield _from_tabular(dict(row))
+        finally:
+            conn.close()
+    elif suffix == ".parquet":
+        from writers import _import_pyarrow
+
+        _, pq = _import_pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches():
+            for record in batch.to_pylist():
+                yield _from_tabular(record)
+    else:
+        raise ValueError(f"Unsupported output file for analysis: {path} (expected .json, .jsonl, .sqlite or .parquet)")
+
+
+def record_hash(record: dict[str, Any]) -> bytes:
+    """レコード内容のハッシュ (キーの順序に依存しない)"""
+    data = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).digest()
+
+
+@dataclass
+class Change:
+    """1科目分の変更。added は新しいレコード全体、modified は変わったフィールドの (旧, 新) を持つ。"""
+
+    op: Literal["added", "removed", "modified"]
+    lecture_code: str
+    year: str | None = None
+    faculty: str | None = None
+    record: dict[str, Any] | None = None
+    fields: dict[str, tuple[Any, Any]] | None = None
+
+    def to_delta(self) -> dict[str, Any]:
+        """差分ファイルの1行。removed はキーだけ、modified は変わったフィールドだけを持つ。"""
+        delta: dict[str, Any] = {"op": self.op, "lecture_code": self.lecture_code}
+        if self.year is not None:
+            delta["year"] = self.year
+        if self.record is not None:
+            delta["record"] = self.record
+        if self.fields is not None:
+            delta["changes"] = {name: list(values) for name, values in self.fields.items()}
+        return delta
+
+
+@dataclass
+class DiffSummary:
+    """比較結果の件数。fields / faculties はフィールド別・開講部局別の変更件数。
+
+    unchanged は比較して同じだった新しいレコードの数。講義コードの無いレコード (skipped) と
+    同じキーの2件目以降 (duplicates) は比較しないので、新旧どちらの出力の分もそちらに数える。
+    """
+
+    added: int = 0
+    removed: int = 0
+    modified: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    duplicates: int = 0
+    fields: Counter[str] = field(default_factory=Counter)
+    faculties: Counter[str] = field(default_factory=Counter)
+
+    def add(self, change: Change) -> None:
+        setattr(self, change.op, getattr(self, change.op) + 1)
+        if change.fields is not None:
+            self.fields.update(change.fields.keys())
+        self.faculties[change.faculty or ""] += 1
+
+
+def _key(record: dict[str, Any]) -> Key | None:
+    code = record.get("lecture_code")
+    if not code:
+        return None
+    return code, record.get("year")
+
+
+def _describe(key: Key) -> str:
+    code, year = key
+    return f"{code} ({year}年度)" if year is not None else code
+
+
+def _index(
+    records: Iterable[dict[str, Any]], label: str, summary: DiffSummary
+) -> dict[Key, tuple[bytes, dict[str, Any]]]:
+    index: dict[Key, tuple[bytes, dict[str, Any]]] = {}
+    for record in records:
+        key = _key(record)
+        if key is None:
+            config.logger.warning(f"Skipping a record without lecture_code in the {label} output.")
+            summary.skipped += 1
+            continue
+        if key in index:
+            config.logger.warning(f"Duplicate lecture_code {_describe(key)} in the {label} output; the last one wins.")
+            summary.duplicates += 1
+        index[key] = (record_hash(record), record)
+    return index
+
+
+def _field_diff(old: dict[str, Any], new: dict[str, Any]) -> dict[str, tuple[Any, Any]]:
+    return {
+        name: (old.get(name), new.get(name)) for name in dict.fromkeys([*old, *new]) if old.get(name) != new.get(name)
+    }
+
+
+def diff_records(
+    old: Iterable[dict[str, Any]], new: Iterable[dict[str, Any]], summary: DiffSummary | None = None
+) -> Iterator[Change]:
+    """(lecture_code, year) をキーに2つの実行結果を比較し、変更を yield する。
+
+    旧レコードだけをハッシュ付きで索引し、新レコードはストリームで読む。ハッシュが一致する
+    レコードはフィールドを比較せずに読み飛ばす。added / modified は新しい出力の順、removed は
+    最後に古い出力の順で返す。summary を渡すと unchanged / skipped / duplicates をそこに数える
+    (変更の件数は yield された Change を DiffSummary.add で数える)。
+    """
+    summary = summary if summary is not None else DiffSummary()
+    previous = _index(old, "old", summary)
+    seen: set[Key] = set()
+    for record in new:
+        key = _key(record)
+        if key is None:
+            config.logger.warning("Skipping a record without lecture_code in the new output.")
+            summary.skipped += 1
+            continue
+        if key in seen:
+            config.logger.warning(
+                f"Duplicate lecture_code {_describe(key)} in the new output; comparing the first one only."
+            )
+            summary.duplicates += 1
+            continue
+        seen.add(key)
+        code, year = key
+        entry = previous.get(key)
+        if entry is None:
+            yield Change("added", code, year, record.get("faculty"), record=record)
+            continue
+        digest, old_record = entry
+        if digest != record_hash(record):
+            yield Change("modified", code, year, record.get("faculty"), fields=_field_diff(old_record, record))
+        else:
+            summary.unchanged += 1
+    for key, (_, old_record) in previous.items():
+        if key not in seen:
+            yield Change("removed", *key, old_record.get("faculty"))
+
+
+def analyze(old_path: Path, new_path: Path, delta_path: Path | None = None) -> DiffSummary:
+    """2つの出力ファイルを比較し、変更を delta_path (JSON Lines) に1件1行で書き出す。
+
+    下流はこの差分だけを取り込めばよい: ``{"op": "added", "lecture_code": ..., "year": ..., "record": {...}}``、
+    ``{"op": "modified", "lecture_code": ..., "year": ..., "changes": {"field": [旧, 新]}}``、
+    ``{"op": "removed", "lecture_code": ..., "year": ...}``。
+    """
+    summary = DiffSummary()
+    changes = diff_records(read_records(old_path), read_records(new_path), summary)
+    if delta_path is None:
+        for change in changes:
+            summary.add(change)
+    else:
+        delta_path.parent.mkdir(parents=True, exist_ok=True)
+        with delta_path.open("w", encoding="utf-8") as f:
+            for change in changes:
+                summary.add(change)
+                f.write(json.dumps(change.to_delta(), ensure_ascii=False))
+                f.write("\n")
+    config.logger.info(
+        f"Compared {old_path} -> {new_path}: {summary.added} added, {summary.removed} removed, "
+        f"{summary.modified} modified, {summary.unchanged} unchanged "
+        f"({summary.skipped} skipped without lecture_code, {summary.duplicates} duplicates)."
+    )
+    return summary
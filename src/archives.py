@@ -0,0 +1,70 @@
+import tarfile
+import zipfile
+from collections.abc import Iterator
+from fnmatch import fnmatchcase
+from pathlib import Path, PurePosixPath
+
+# 読み込むページ (ディレクトリでは html_dir.glob(PAGE_PATTERN) のうち is_page_name のもの)
+PAGE_PATTERN = "*.html"
+
+
+def is_archive(path: Path) -> bool:
+    """path が読み込める tar (圧縮を含む) か zip のアーカイブかどうか"""
+    if not path.is_file():
+        return False
+    return tarfile.is_tarfile(path) or zipfile.is_zipfile(path)
+
+
+def is_page_name(name: str) -> bool:
+    """ファイル名 (ディレクトリを含まない) が読み込むページかどうか。
+
+    pathlib の glob("*.html") はドットで始まる名前 (macOS の "._foo.html" のようなリソースフォークなど)
+    にも一致するので、ディレクトリとアーカイブのどちらでもここで明示的に除く。
+    """
+    return not name.startswith(".") and fnmatchcase(name, PAGE_PATTERN)
+
+
+def _page_dir(member_name: str) -> PurePosixPath | None:
+    """ページとして読むメンバーのディレクトリ (ページでなければ None)。
+
+    アーカイブの最上位か、``tar czf snap.tgz snapshot/`` のような包みのディレクトリ1つの直下だけを
+    対象にし、それより深いメンバーは読まない (html_dir.glob が再帰しないのと同じ)。
+    """
+    path = PurePosixPath(member_name.removeprefix("./"))
+    if len(path.parts) > 2 or not is_page_name(path.name):  # noqa: PLR2004
+        return None
+    return path.parent
+
+
+def iter_archive_pages(archive: Path) -> Iterator[tuple[str, bytes]]:
+    """アーカイブ内の *.html を展開せずにメンバーの格納順に読み、(メンバー名, 内容) を yield する。
+
+    tar は先頭から1回だけ順に読むストリームモード (``r|*``) で開くので、gzip などで圧縮されて
+    いてもシークせずに済む。一度にメモリに持つのは1メンバー分だけ。
+    ディレクトリの場合と同じページだけを読むよう、最初のページのディレクトリ (最上位か包みの
+    ディレクトリ) と同じディレクトリにあるページだけを対象にする (_page_dir)。
+    """
+    root: PurePosixPath | None = None
+
+    def wanted(name: str) -> bool:
+        nonlocal root
+        directory = _page_dir(name)
+        if directory is None:
+            return False
+        if root is None:
+            root = directory
+        return directory == root
+
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and wanted(info.filename):
+                    yield info.filename, zf.read(info)
+        return
+    with tarfile.open(archive, mode="r|*") as tf:
+        for member in tf:
+            if not member.isfile() or not wanted(member.name):
+                continue
+            f = tf.extractfile(member)
+            if f is not None:
+                yield member.name, f.read()
@@ -0,0 +1,142 @@
+import json
+import os
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, Any
+
+import config
+from models import Subject
+
+
+class CrawlState:
+    """ライブ取得の進捗 (チェックポイント) を記録するジャーナル。
+
+    出力ファイルの隣 (``<output>.state.jsonl``) に1行1イベントの JSON を追記していく:
+
+    - ``{"event": "start", "run": ...}``: 実行の識別情報 (base URL・対象・抽出器のバージョン)
+    - ``{"event": "listings", "urls": [...]}``: index.html から見つかった一覧ページ
+    - ``{"event": "listing_done", "url": ...}``: 詳細ページ URL をすべてキューに入れた一覧ページ
+    - ``{"event": "queued", "url": ...}``: キューに入れた詳細ページ (= クロールのフロンティア)
+    - ``{"event": "completed", "url": ..., "record": {...} | null}``: 処理済みの詳細ページと抽出結果
+
+    追記のみなので、チェックポイントのコストは件数に比例しない。``flush_every`` イベント毎
+    または ``flush_interval`` 秒毎にディスクへ書き出す (fsync)。書きかけの最終行は読み込み時に
+    無視する。取得に失敗したページは completed にしないので、再開時にもう一度取得する。
+    """
+
+    def __init__(self, path: Path, run: dict[str, Any], flush_every: int = 50, flush_interval: float = 5.0):
+        self.path = path
+        self.run = run
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.listing_urls: list[str] | None = None
+        self.listings_done: set[str] = set()
+        self.queued: dict[str, None] = {}
+        self.completed: dict[str, dict[str, Any] | None] = {}
+        self._file: IO[str] | None = None
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def path_for(output_file: Path) -> Path:
+        return output_file.with_suffix(".state.jsonl")
+
+    @classmethod
+    def open(cls, path: Path, run: dict[str, Any], resume: bool = False) -> "CrawlState":
+        """resume が真で同じ実行の記録があればそこから再開し、そうでなければ新しく記録を始める"""
+        state = cls(path, run)
+        if resume and path.is_file():
+            state._load()
+            if state.run != run:
+                config.logger.warning(f"Checkpoint {path} belongs to a different run; starting over.")
+                state = cls(path, run)
+            else:
+                config.logger.info(
+                    f"Resuming from {path}: {len(state.completed)} pages done, {len(state.frontier)} in the frontier."
+                )
+                state._file = path.open("a", encoding="utf-8")
+                return state
+        elif resume:
+            config.logger.warning(f"No checkpoint found at {path}; starting a new crawl.")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        state._file = path.open("w", encoding="utf-8")
+        state._append({"event": "start", "run": run})
+        return state
+
+    def _load(self) -> None:
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # Last line was cut off by a crash; everything before it is intact.
+                    break
+                kind = event.get("event")
+                if kind == "start":
+                    self.run = event["run"]
+                elif kind == "listings":
+                    self.listing_urls = list(event["urls"])
+                elif kind == "listing_done":
+                    self.listings_done.add(event["url"])
+                elif kind == "queued":
+                    self.queued[event["url"]] = None
+                elif kind == "completed":
+                    self.completed[event["url"]] = event["record"]
+
+    @property
+    def frontier(self) -> list[str]:
+        """キューに入れたが処理の終わっていない詳細ページ (キューに入れた順)"""
+        return [url for url in self.queued if url not in self.completed]
+
+    def records(self) -> Iterator[Subject]:
+        """前回までに抽出済みの Subject (処理した順)"""
+        for record in self.completed.values():
+            if record is not None:
+                # Dumped from a validated Subject; re-validating it is cheaper than model_construct.
+                yield Subject.model_validate(record)
+
+    def record_listings(self, urls: list[str]) -> None:
+        self.listing_urls = list(urls)
+        self._append({"event": "listings", "urls": self.listing_urls}, flush=True)
+
+    def record_listing_done(self, url: str) -> None:
+        self.listings_done.add(url)
+        self._append({"event": "listing_done", "url": url}, flush=True)
+
+    def record_queued(self, url: str) -> None:
+        self.queued[url] = None
+        self._append({"event": "queued", "url": url})
+
+    def record_completed(self, url: str, subject: Subject | None) -> None:
+        record = subject.model_dump(mode="json") if subject is not None else None
+        self.completed[url] = record
+        self._append({"event": "completed", "url": url, "record": record})
+
+    def _append(self, event: dict[str, Any], flush: bool = False) -> None:
+        if self._file is None:
+            return
+        self._file.write(json.dumps(event, ensure_ascii=False))
+        self._file.write("\n")
+        self._unflushed += 1
+        if flush or self._unflushed >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def remove(self) -> None:
+        """実行が最後まで終わったら記録を消す"""
+        self.close()
+        self.path.unlink(missing_ok=True)
@@ -1,15 +1,17 @@
 import enum
+from contextlib import closing
 from pathlib import Path
 from typing import Annotated
 
 import typer
 
 import config
-from harvester import Harvester
+from config import OutputFormat
+from metrics import METRICS
 from settings import get_settings
 
-settings = get_settings()
-harvester = Harvester(settings)
+# NOTE: Keep this module cheap to import (``--help`` should not load pandas / bs4 / pydantic models or
+# touch the filesystem). Heavy modules are imported inside the commands; see scripts/bench_import_time.py.
 
 
 # --- 実行モード定義 ---
@@ -18,6 +20,12 @@ class RunMode(str, enum.Enum):
     LOCAL_SMALL = "local-small"
     LIVE_SMALL = "live-small"
     LIVE_FULL = "live-full"
+    SNAPSHOT = "snapshot"
+
+
+class ParserBackend(str, enum.Enum):
+    HTML5LIB = "html5lib"
+    LXML = "lxml"
 
 
 # --- Typer アプリケーション定義 ---
@@ -25,14 +33,16 @@ app = typer.Typer(help="MomijiHarvester: Hiroshima University Syllabus Scraper C
 
 
 # --- メインコマンド ---
-@app.command()
+# A callback rather than a command so that ``cli --mode ...`` keeps working next to subcommands like ``analyze``.
+@app.callback(invoke_without_command=True)
 def main(
+    ctx: typer.Context,
     mode: Annotated[RunMode, typer.Option("--mode", "-m", help="Execution mode.")] = RunMode.LOCAL_SMALL,
     local_dir: Annotated[
         Path | None,
         typer.Option(
             "--local-dir",
-            help="Directory containing local HTML files (for local modes).",
+            help="Directory (or tar / tar.gz / zip archive) containing local HTML files (for local modes).",
         ),
     ] = None,
     output_file: Annotated[Path, typer.Option("--output", "-o", help="Output JSON file path.")] = Path(
@@ -42,14 +52,145 @@ def main(
         Path | None,
         typer.Option("--config", help="Path to configuration file (e.g., .env)."),
     ] = None,
+    workers: Annotated[
+        int | None,
+        typer.Option(
+            "--workers",
+            "-w",
+            min=1,
+            help="Number of worker processes for local extraction (default: 1, no process pool).",
+        ),
+    ] = None,
+    concurrency: Annotated[
+        int | None,
+        typer.Option("--concurrency", min=1, help="Maximum number of concurrent HTTP requests (for live modes)."),
+    ] = None,
+    cache_dir: Annotated[
+        Path | None,
+        typer.Option("--cache-dir", help="Directory of the on-disk HTTP cache (for live modes)."),
+    ] = None,
+    no_cache: Annotated[
+        bool,
+        typer.Option("--no-cache", help="Disable the HTTP cache and always download pages."),
+    ] = False,
+    incremental: Annotated[
+        bool,
+        typer.Option(
+            "--incremental/--no-incremental",
+            help="Reuse results for unchanged local files recorded in the manifest next to the output.",
+        ),
+    ] = True,
+    parser: Annotated[
+        ParserBackend | None,
+        typer.Option("--parser", help="HTML parser backend for detail pages (lxml is faster; needs lxml)."),
+    ] = None,
+    formats: Annotated[
+        list[OutputFormat] | None,
+        typer.Option(
+            "--format",
+            "-f",
+            help="Output format; repeat for several. 'jsonl' streams JSON Lines + CSV while extracting.",
+        ),
+    ] = None,
+    metrics: Annotated[
+        bool,
+        typer.Option(
+            "--metrics/--no-metrics",
+            help="Write per-stage timings and counters next to the output (<output>.metrics.json and <output>.prom).",
+        ),
+    ] = True,
+    timetable: Annotated[
+        bool,
+        typer.Option(
+            "--timetable/--no-timetable",
+            help="Write a timetable index of day_time_room by weekday/period and room (<output>.timetable.json).",
+        ),
+    ] = True,
+    snapshot_dir: Annotated[
+        Path | None,
+        typer.Option(
+            "--snapshot-dir",
+            help="Keep the raw HTML of every page read or fetched in this content-addressed snapshot store "
+            "(and read from it in snapshot mode).",
+        ),
+    ] = None,
+    snapshot_run: Annotated[
+        str | None,
+        typer.Option("--snapshot-run", help="Snapshot run to re-extract in snapshot mode (default: the latest)."),
+    ] = None,
+    targets: Annotated[
+        str | None,
+        typer.Option(
+            "--targets",
+            help="Years and site languages to crawl in live-full mode, e.g. '2024-2025:ja,en'. "
+            "English pages are joined onto the Japanese records by lecture code.",
+        ),
+    ] = None,
+    shard: Annotated[
+        str | None,
+        typer.Option(
+            "--shard",
+            help="Only process shard i of N (e.g. '2/4'), split by a stable hash of the lecture code; "
+            "writes <output>.shard-i-of-N.* for the merge command.",
+        ),
+    ] = None,
+    resume: Annotated[
+        bool,
+        typer.Option(
+            "--resume",
+            help="Continue an interrupted live crawl from its checkpoint (<output>.state.jsonl) "
+            "without fetching completed pages again.",
+        ),
+    ] = False,
 ):
     """
     Run the MomijiHarvester to scrape syllabus data.
     """
+    if ctx.invoked_subcommand is not None:
+        return
+    if resume and targets is not None:
+        # The per-site crawlers of --targets share no checkpoint, so the run could not be resumed.
+        raise typer.BadParameter("cannot be combined with --targets.", param_hint="'--resume'")
+    config.configure_logging()
+    # Imported here rather than at module level to keep CLI startup fast.
+    from archives import is_archive
+    from checkpoint import CrawlState
+    from harvester import Harvester, MultiWebSource, SnapshotSource, WebSource, parse_targets
+    from manifest import Manifest, extractor_version
+    from sharding import Shard, ShardError
+    from snapshots import SnapshotRun, SnapshotStore
+
+    state: CrawlState | None = None
+    snapshot: SnapshotRun | None = None
+
     try:
         # --- 設定の読み込み ---
         # settings.py の Settings クラスを使う
         app_settings = get_settings(config_file if config_file else ".env")
+        if workers is not None:
+            app_settings.workers = workers
+        if parser is not None:
+            app_settings.html_parser = parser.value
+        if concurrency is not None:
+            app_settings.max_concurrency = concurrency
+        if cache_dir is not None:
+            app_settings.http_cache_dir = cache_dir
+        if no_cache:
+            app_settings.http_cache_dir = None
+        if snapshot_dir is not None:
+            app_settings.snapshot_dir = snapshot_dir
+
+        selected_shard: Shard | None = None
+        if shard is not None:
+            try:
+                selected_shard = Shard.parse(shard)
+            except ShardError as e:
+                config.logger.error(str(e))
+                raise typer.Exit(code=1) from e
+            # Every shard writes its own partial output (and manifest / checkpoint next to it).
+            output_file = selected_shard.output_path(output_file)
+
+        METRICS.reset()
 
         # --- 出力ディレクトリ作成 ---
         output_file.parent.mkdir(parents=True, exist_ok=True)
@@ -57,39 +198,108 @@ def main(
         # --- Harvester インスタンス化 ---
         # harvester.py の Harvester クラスを使う
         harv = Harvester(app_settings)
-        subjects = []
+        source: Path | WebSource | MultiWebSource | SnapshotSource
 
         # No config flag for fractional credits; model validation enforces integer credits
         # --- ロギング開始 ---
         # config.py で定義されたロガーを使う想定
         config.logger.info(f"Starting harvester in {mode.value} mode.")
+        if selected_shard is not None:
+            config.logger.info(f"Processing shard {selected_shard}; writing to {output_file}.")
 
         # --- モードに応じた処理 ---
+        if targets is not None and mode != RunMode.LIVE_FULL:
+            config.logger.error("--targets only applies to live-full mode.")
+            raise typer.Exit(code=1)
+        manifest = None
+        if incremental and mode in (RunMode.LOCAL_FULL, RunMode.LOCAL_SMALL):
+            manifest = Manifest.load(Manifest.path_for(output_file), extractor_version(app_settings.html_parser))
         if mode == RunMode.LOCAL_FULL:
             html_dir = local_dir if local_dir else app_settings.local_html_dir_full
-            if not html_dir or not html_dir.is_dir():
-                config.logger.error(f"Local HTML directory not found or invalid: {html_dir}")
+            if not html_dir or not (html_dir.is_dir() or is_archive(html_dir)):
+                config.logger.error(f"Local HTML directory or archive not found or invalid: {html_dir}")
                 raise typer.Exit(code=1)
-            subjects = harv.harvest_from_local(html_dir)
+            source = html_dir
         elif mode == RunMode.LOCAL_SMALL:
             html_dir = local_dir if local_dir else app_settings.local_html_dir_small
-            if not html_dir or not html_dir.is_dir():
-                config.logger.error(f"Local HTML directory not found or invalid: {html_dir}")
+            if not html_dir or not (html_dir.is_dir() or is_archive(html_dir)):
+                config.logger.error(f"Local HTML directory or archive not found or invalid: {html_dir}")
                 raise typer.Exit(code=1)
-            subjects = harv.harvest_from_local(html_dir)
+            source = html_dir
         elif mode == RunMode.LIVE_SMALL:
             if not app_settings.live_small_codes:
                 config.logger.error("live_small_codes is not defined in settings.")
                 raise typer.Exit(code=1)
-            subjects = harv.harvest_from_web(target_codes=app_settings.live_small_codes)
-        elif mode == RunMode.LIVE_FULL:
-            # 全件取得ロジックは harvester 側で実装する想定
-            subjects = harv.harvest_from_web(target_codes=None)
+            source = WebSource(app_settings.live_small_codes)
+        elif mode == RunMode.SNAPSHOT:
+            if app_settings.snapshot_dir is None or not app_settings.snapshot_dir.is_dir():
+                config.logger.error(f"Snapshot directory not found (set --snapshot-dir): {app_settings.snapshot_dir}")
+                raise typer.Exit(code=1)
+            source = SnapshotSource(app_settings.snapshot_dir, snapshot_run)
+        elif targets is not None:
+            try:
+                source = MultiWebSource(parse_targets(targets))
+            except ValueError as e:
+                config.logger.error(str(e))
+                raise typer.Exit(code=1) from e
+        else:
+            source = WebSource(None)
+
+        if app_settings.snapshot_dir is not None and not isinstance(source, SnapshotSource):
+            if isinstance(source, WebSource):
+                origin = app_settings.base_url
+            elif isinstance(source, MultiWebSource):
+                origin = f"{app_settings.base_url} {targets}"
+            else:
+                origin = str(source)
+            snapshot = SnapshotStore(app_settings.snapshot_dir).begin_run(f"{mode.value} {origin}")
+
+        if isinstance(source, WebSource):
+            # Live crawls checkpoint their progress; outputs are rewritten from the checkpoint on --resume.
+            run = {
+                "base_url": app_settings.base_url,
+                "targets": source.target_codes,
+                "extractor": extractor_version(app_settings.html_parser),
+                "shard": str(selected_shard) if selected_shard is not None else None,
+            }
+            state = CrawlState.open(CrawlState.path_for(output_file), run, resume=resume)
+        elif resume:
+            config.logger.warning("--resume only applies to live modes; ignoring it.")
 
         # --- 結果の保存 ---
-        if subjects:
-            harv.save_results(subjects, output_file)
-            config.logger.info(f"Successfully harvested {len(subjects)} subjects and saved to {output_file}")
+        # Records are written as each page finishes, so memory stays bounded and writing overlaps extraction.
+        items = harv.harvest_iter(source, manifest=manifest, state=state, snapshot=snapshot, shard=selected_shard)
+        with closing(items):
+            # An empty shard still writes an (empty) output so that merge does not report it as missing.
+            count = harv.save_results(
+                items, output_file, formats or [OutputFormat.JSON], timetable, create_empty=selected_shard is not None
+            )
+        if state is not None:
+            # The crawl ran to the end; nothing is left to resume.
+            state.remove()
+
+        drift = METRICS.drift_report()
+        if len(drift) > 1:
+            config.logger.warning(
+                f"Detail pages use {len(drift)} different header layouts; the site layout may have changed."
+            )
+        for line in drift:
+            config.logger.info(line)
+
+        if harv.errors:
+            failed = ", ".join(f"{err.source} ({err.error_type})" for err in harv.errors)
+            config.logger.warning(f"{len(harv.errors)} file(s) failed to extract: {failed}")
+
+        if metrics:
+            json_path, prom_path = METRICS.write(output_file)
+            config.logger.info(f"Metrics written to {json_path} and {prom_path}")
+
+        if count:
+            config.logger.info(f"Successfully harvested {count} subjects and saved to {output_file}")
+            if manifest is not None:
+                manifest.save()
+        elif selected_shard is not None:
+            config.logger.warning(f"Shard {selected_shard} has no subjects; wrote an empty output for merge.")
         else:
             config.logger.warning("No subjects were harvested.")
 
@@ -101,6 +311,187 @@ def main(
     except Exception as e:
         config.logger.exception(f"An unexpected error occurred during harvesting: {e}")
         raise typer.Exit(code=1) from e
+    finally:
+        # Keeps the checkpoint on errors and Ctrl-C so that --resume can continue from it.
+        if state is not None:
+            state.close()
+        if snapshot is not None:
+            snapshot.close()
+        # Drains the log queue and reports how many per-page messages were sampled away.
+        config.shutdown_logging()
+
+
+# --- 実行結果の比較 ---
+@app.command()
+def analyze(
+    old_file: Annotated[Path, typer.Argument(help="Output of the previous run (.json, .jsonl, .sqlite or .parquet).")],
+    new_file: Annotated[Path, typer.Argument(help="Output of the new run.")],
+    delta_file: Annotated[
+        Path | None,
+        typer.Option("--delta", help="Where to write the changes as JSON Lines (default: <new>.delta.jsonl)."),
+    ] = None,
+):
+    """
+    Compare two harvest outputs by lecture code and year and write the added, removed and modified subjects.
+    """
+    config.configure_logging()
+    from analyzer import analyze as analyze_outputs
+
+    for path in (old_file, new_file):
+        if not path.is_file():
+            config.logger.error(f"Output file not found: {path}")
+            raise typer.Exit(code=1)
+    delta_path = delta_file if delta_file is not None else new_file.with_suffix(".delta.jsonl")
+    try:
+        summary = analyze_outputs(old_file, new_file, delta_path)
+    except Exception as e:
+        config.logger.exception(f"An unexpected error occurred during analysis: {e}")
+        raise typer.Exit(code=1) from e
+
+    typer.echo(
+        f"added: {summary.added}, removed: {summary.removed}, "
+        f"modified: {summary.modified}, unchanged: {summary.unchanged}"
+    )
+    if summary.skipped or summary.duplicates:
+        typer.echo(f"skipped (no lecture code): {summary.skipped}, duplicates: {summary.duplicates}")
+    for name, n in summary.fields.most_common():
+        typer.echo(f"  {name}: {n}")
+    typer.echo(f"Delta written to {delta_path}")
+
+
+# --- シャード出力の結合 ---
+@app.command()
+def merge(
+    shard_files: Annotated[
+        list[Path],
+        typer.Argument(help="Shard outputs (<output>.shard-i-of-N.json / .jsonl / .sqlite / .parquet)."),
+    ],
+    output_file: Annotated[Path, typer.Option("--output", "-o", help="Merged output JSON file path.")] = Path(
+        "output/syllabus_data.json"
+    ),
+    formats: Annotated[
+        list[OutputFormat] | None,
+        typer.Option("--format", "-f", help="Output format of the merged file; repeat for several."),
+    ] = None,
+    allow_missing: Annotated[
+        bool,
+        typer.Option("--allow-missing", help="Merge even if some shards are missing (with a warning)."),
+    ] = False,
+    timetable: Annotated[
+        bool,
+        typer.Option("--timetable/--no-timetable", help="Write the timetable index of the merged output."),
+    ] = True,
+):
+    """
+    Combine the outputs of --shard runs into one output ordered by lecture code.
+    """
+    config.configure_logging()
+    from sharding import ShardError, merge_shards
+
+    for path in shard_files:
+        if not path.is_file():
+            config.logger.error(f"Shard output not found: {path}")
+            raise typer.Exit(code=1)
+    try:
+        summary = merge_shards(shard_files, output_file, formats or [OutputFormat.JSON], allow_missing, timetable)
+    except ShardError as e:
+        config.logger.error(str(e))
+        raise typer.Exit(code=1) from e
+    except Exception as e:
+        config.logger.exception(f"An unexpected error occurred during merging: {e}")
+        raise typer.Exit(code=1) from e
+
+    shards = ", ".join(str(s) for s in summary.shards)
+    typer.echo(f"Merged {summary.records} subjects from shards {shards} into {output_file}")
+
+
+# --- 時間割の索引の検索 ---
+@app.command()
+def timetable(
+    index_file: Annotated[Path, typer.Argument(help="Timetable index (<output>.timetable.json).")],
+    day: Annotated[str | None, typer.Option("--day", help="Weekday (月 火 水 木 金 土 日).")] = None,
+    period: Annotated[int | None, typer.Option("--period", min=1, help="Period (時限).")] = None,
+    room: Annotated[str | None, typer.Option("--room", help="Room name as written on the syllabus.")] = None,
+    term: Annotated[
+        str | None, typer.Option("--term", help="Only slots overlapping this term (1T-4T, 前, 後).")
+    ] = None,
+    year: Annotated[str | None, typer.Option("--year", help="Only slots of this year (e.g. 2025年度).")] = None,
+    conflicts: Annotated[
+        bool,
+        typer.Option("--conflicts", help="List pairs of subjects that use the same room at the same time."),
+    ] = False,
+):
+    """
+    Look up subjects in a timetable index by weekday/period or room, or list room conflicts.
+    """
+    config.configure_logging()
+    from timetable import WEEKDAYS, TimetableIndex
+
+    if not index_file.is_file():
+        config.logger.error(f"Timetable index not found: {index_file}")
+        raise typer.Exit(code=1)
+    if day is not None and day not in WEEKDAYS:
+        config.logger.error(f"Unknown weekday {day!r} (expected one of {' '.join(WEEKDAYS)}).")
+        raise typer.Exit(code=1)
+    try:
+        index = TimetableIndex.load(index_file)
+    except Exception as e:
+        config.logger.exception(f"An unexpected error occurred while reading {index_file}: {e}")
+        raise typer.Exit(code=1) from e
+
+    if conflicts:
+        for a, b in index.conflicts():
+            typer.echo(f"{a} <-> {b}")
+        return
+    if room is not None:
+        slots = index.in_room(room, day, period, term, year)
+    elif day is not None and period is not None:
+        slots = index.at(day, period, term, year)
+    else:
+        config.logger.error("Give --room, --day with --period, or --conflicts.")
+        raise typer.Exit(code=1)
+    for slot in slots:
+        typer.echo(str(slot))
+
+
+# --- 出力の検索サービス ---
+@app.command()
+def serve(
+    output_file: Annotated[
+        Path, typer.Argument(help="Harvest output to serve (.json / .jsonl / .sqlite / .parquet).")
+    ] = Path("output/syllabus_data.json"),
+    host: Annotated[str, typer.Option("--host", help="Address to listen on.")] = "127.0.0.1",
+    port: Annotated[int, typer.Option("--port", min=0, help="Port to listen on (0 picks a free one).")] = 8080,
+    reload_interval: Annotated[
+        float,
+        typer.Option("--reload-interval", min=0.1, help="Seconds between checks for a rewritten output file."),
+    ] = 1.0,
+):
+    """
+    Serve JSON queries over a harvest output from in-memory indexes, reloading it when it is rewritten.
+    """
+    config.configure_logging()
+    from service import QueryServer, SubjectService
+
+    if not output_file.is_file():
+        config.logger.error(f"Output file not found: {output_file}")
+        raise typer.Exit(code=1)
+    try:
+        service = SubjectService(output_file, reload_interval)
+        server = QueryServer(service, host, port)
+    except Exception as e:
+        config.logger.exception(f"An unexpected error occurred while starting the service: {e}")
+        raise typer.Exit(code=1) from e
+
+    service.start()
+    config.logger.info(f"Serving {len(service.index)} subjects from {output_file} at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
 
 
 # --- スクリプトとして直接実行された場合 ---
@@ -1,13 +1,25 @@
 # src/momijiharvester/config.py
+import enum
 import logging
+import re
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 # --- 定数 ---
 BASE_URL = "https://momiji.hiroshima-u.ac.jp/syllabusHtml/"
+# 英語版サイト (日本語版の一覧・詳細ページから ../syllabusHtml_en/ でリンクされている)
+BASE_URL_EN = "https://momiji.hiroshima-u.ac.jp/syllabusHtml_en/"
+# 取得対象の言語 (ja が BASE_URL、en が BASE_URL_EN)
+SITE_LANGUAGES = ("ja", "en")
+# ライブ取得時の設定
+USER_AGENT = "MomijiHarvester/0.1 (+https://github.com/swawa-yu/MomijiHarvester)"
+SITE_ENCODING = "utf-8"
 # ローカルHTMLファイルの場所(ディレクトリ構成変更後のパス)
 LOCAL_HTML_DIR_FULL = Path("./tests/fixtures/html/full")
 LOCAL_HTML_DIR_SMALL = Path("./tests/fixtures/html/small")
 OUTPUT_DIR = Path("./output")
+# 抽出ロジックの出力が変わる変更をしたら上げる (増分抽出のマニフェストが無効になる)
+EXTRACTOR_VERSION = "1"
 
 # --- Canonical Headers ---
 # models.py の Subject モデルの alias (primary) を基準にする
@@ -54,16 +66,198 @@ CANONICAL_HEADERS = [
     "その他",
 ]
 
-# --- Logging ---
-# --- 出力ディレクトリ作成 ---
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(OUTPUT_DIR / "momijiharvester.log", encoding="utf-8"),
-        logging.StreamHandler(),
-    ],
+# --- HTML parser backends ---
+# BeautifulSoup のツリービルダー名。html5lib が基準 (寛容だが遅い)、lxml は高速 (要 lxml)。
+HTML_PARSERS = ("html5lib", "lxml")
+DEFAULT_HTML_PARSER = "html5lib"
+
+
+# --- Output formats ---
+class OutputFormat(str, enum.Enum):
+    """save_results が書き出す出力形式 (CLI の --format の選択肢なので、重い依存の無いここで定義する)"""
+
+    # JSON 配列 (indent=2) + CSV。全件をまとめて書き出す従来形式
+    JSON = "json"
+    # JSON Lines + CSV。1件ずつ追記するストリーミング形式
+    JSONL = "jsonl"
+    # Apache Parquet (列指向)。行グループ単位で追記するストリーミング形式 (要 pyarrow)
+    PARQUET = "parquet"
+    # SQLite (型付きテーブル + FTS5 全文検索インデックス)。(lecture_code, year) で upsert
+    SQLITE = "sqlite"
+
+
+# --- Page naming on the syllabus site ---
+# 開講部局別一覧 (例: 2025_AA.html) と詳細ページ (例: 2025_AA_10000100.html)。
+# 英語版サイトのページは末尾に _en が付く (例: 2025_AA_en.html, 2025_AA_10000100_en.html)。
+LISTING_PAGE_RE = re.compile(r"^(?P<year>\d{4})_(?P<faculty>[0-9A-Za-z]+)(?:_(?P<lang>en))?\.html$")
+DETAIL_PAGE_RE = re.compile(
+    r"^(?P<year>\d{4})_(?P<faculty>[0-9A-Za-z]+)_(?P<code>(?!en\.html$)[0-9A-Za-z]+)(?:_(?P<lang>en))?\.html$"
 )
+
+# --- Logging ---
+LOG_FILE_NAME = "momijiharvester.log"
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+# ページ毎に出るメッセージのうち、種類 (サンプリングキー) 毎にそのまま出力する件数と、それ以降の間引きの間隔
+LOG_SAMPLE_BURST = 5
+LOG_SAMPLE_EVERY = 100
+# LogRecord に付けるサンプリングキーの属性名 (sampled() を参照)
+_SAMPLE_ATTR = "sample_key"
+
 logger = logging.getLogger(__name__)
+
+
+def sampled(key: str) -> dict[str, str]:
+    """ページ毎に出るログメッセージに付ける ``extra``。同じ key のメッセージは LogSampler で間引かれる。
+
+    例: ``logger.info(f"[{name}] No detail table found", extra=config.sampled("no_detail_table"))``
+    """
+    return {_SAMPLE_ATTR: key}
+
+
+def _annotate(record: logging.LogRecord, note: str) -> None:
+    # QueueHandler has already merged args (and any traceback) into msg; keep the note on the first line.
+    first, sep, rest = str(record.msg).partition("\n")
+    record.msg = f"{first} ({note}){sep}{rest}"
+
+
+class LogSampler:
+    """サンプリングキー付きのメッセージを間引く。
+
+    キー毎に最初の burst 件はそのまま通し、それ以降は every 件に1件だけ (それまでの件数を添えて) 通す。
+    キーの無いメッセージは全て通す。間引いた件数は summary() で実行の最後にまとめて出力する。
+    QueueListener のスレッドだけから呼ばれるので、ワーカープロセスの分も含めて1か所で数える。
+    """
+
+    def __init__(self, burst: int = LOG_SAMPLE_BURST, every: int = LOG_SAMPLE_EVERY):
+        self.burst = burst
+        self.every = max(1, every)
+        self.seen: dict[tuple[str, str], int] = {}
+        self.suppressed: dict[tuple[str, str], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, _SAMPLE_ATTR, None)
+        if key is None:
+            return True
+        bucket = (key, record.levelname)
+        n = self.seen[bucket] = self.seen.get(bucket, 0) + 1
+        if n < self.burst:
+            return True
+        if n == self.burst:
+            _annotate(record, f"further '{key}' messages are sampled")
+            return True
+        if (n - self.burst) % self.every == 0:
+            _annotate(record, f"{n} '{key}' messages so far")
+            return True
+        self.suppressed[bucket] = self.suppressed.get(bucket, 0) + 1
+        return False
+
+    def summary(self) -> list[str]:
+        """間引いたメッセージの件数 (キー毎に1行、多い順)"""
+        return [
+            f"Log sampling: {n} of {self.seen[bucket]} '{bucket[0]}' {bucket[1]} messages suppressed."
+            for bucket, n in sorted(self.suppressed.items(), key=lambda item: -item[1])
+        ]
+
+
+if TYPE_CHECKING:
+    import multiprocessing.queues
+    from logging.handlers import QueueListener
+
+
+# configure_logging が起動したリスナーとそのキュー (ワーカープロセスに渡す)
+_log_listener: "QueueListener | None" = None
+_log_queue_handler: logging.Handler | None = None
+_log_queue: "multiprocessing.queues.Queue[logging.LogRecord] | None" = None
+_log_handlers: list[logging.Handler] = []
+_log_sampler: LogSampler | None = None
+
+
+def configure_logging(log_dir: Path | None = OUTPUT_DIR, level: int = logging.INFO) -> None:
+    """ルートロガーにコンソール出力と (log_dir を指定すれば) ログファイル出力を設定する。
+
+    import 時には何もしない (ディレクトリ作成やファイルを開くのはコマンド実行時のみ)。
+    CLI のコマンドなど、実際に処理を始める側から呼ぶ。logging.basicConfig と同じく、ルートロガーに
+    既にハンドラーがあれば (2回目以降の呼び出しやテストのキャプチャなど) 何もしない。
+
+    ルートロガーには QueueHandler だけを付け、ファイルやコンソールへの書き込みは QueueListener の
+    スレッドで行うので、抽出の処理がログの I/O で止まらない。キューは multiprocessing.Queue なので、
+    ワーカープロセスも configure_worker_logging で同じキューに送れる。サンプリングキー付きの
+    メッセージ (sampled) はリスナー側の LogSampler で間引き、shutdown_logging で件数をまとめて出す。
+    """
+    global _log_listener, _log_queue, _log_queue_handler, _log_handlers, _log_sampler
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    import atexit
+    import multiprocessing
+    from logging.handlers import QueueHandler, QueueListener
+
+    handlers: list[logging.Handler] = [logging.StreamHandler()]
+    if log_dir is not None:
+        log_dir.mkdir(parents=True, exist_ok=True)
+        handlers.insert(0, logging.FileHandler(log_dir / LOG_FILE_NAME, encoding="utf-8"))
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    sampler = LogSampler()
+
+    class SamplingQueueListener(QueueListener):
+        def handle(self, record: logging.LogRecord) -> None:
+            # Sample once per record, not once per handler.
+            if sampler.filter(record):
+                super().handle(record)
+
+    _log_queue = multiprocessing.Queue(-1)
+    _log_handlers, _log_sampler = handlers, sampler
+    _log_queue_handler = QueueHandler(_log_queue)
+    root.addHandler(_log_queue_handler)
+    root.setLevel(level)
+    _log_listener = SamplingQueueListener(_log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(shutdown_logging)
+
+
+def log_queue() -> "multiprocessing.queues.Queue[logging.LogRecord] | None":
+    """configure_logging のキュー (ワーカープロセスの initializer に渡す)。未設定なら None。"""
+    return _log_queue
+
+
+def configure_worker_logging(queue: "multiprocessing.queues.Queue[logging.LogRecord] | None", level: int) -> None:
+    """ワーカープロセスのルートロガーを、親の configure_logging のキューに送るだけの設定にする。
+
+    fork で引き継いだハンドラーは外す (spawn のワーカーにはハンドラーが無い)。queue が None なら何もしない。
+    """
+    if queue is None:
+        return
+    from logging.handlers import QueueHandler
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(queue))
+    root.setLevel(level)
+
+
+def shutdown_logging() -> None:
+    """キューに残ったメッセージを書き出してリスナーを止め、間引いたメッセージの件数を出力する。
+
+    以降のログはルートロガーから直接 (同期的に) 書き出す。何度呼んでもよい (atexit でも呼ばれる)。
+    """
+    global _log_listener, _log_queue, _log_queue_handler
+    if _log_listener is None:
+        return
+    _log_listener.stop()
+    _log_listener = None
+    root = logging.getLogger()
+    if _log_queue_handler is not None:
+        root.removeHandler(_log_queue_handler)
+        _log_queue_handler = None
+    for handler in _log_handlers:
+        root.addHandler(handler)
+    if _log_queue is not None:
+        _log_queue.close()
+        _log_queue = None
+    if _log_sampler is not None:
+        for line in _log_sampler.summary():
+            logger.info(line)
@@ -0,0 +1,284 @@
+import asyncio
+import re
+from collections.abc import AsyncIterator, Collection, Iterable, Sequence
+from contextlib import aclosing
+from dataclasses import dataclass
+from urllib.parse import urldefrag, urljoin
+
+import config
+from checkpoint import CrawlState
+from extractors import (
+    FieldPlan,
+    HeaderMismatchError,
+    classify_page_links,
+    extract_page_fields,
+    extract_subject_data,
+)
+from fetcher import AsyncFetcher
+from metrics import METRICS
+from models import HarvestError, Subject
+from sharding import Shard
+
+
+def _lecture_code(url: str) -> str | None:
+    """詳細ページの URL から講義コードを取り出す (詳細ページでなければ None)"""
+    m = config.DETAIL_PAGE_RE.match(url.rsplit("/", 1)[-1])
+    return m.group("code") if m else None
+
+
+@dataclass
+class CrawlResult:
+    """1つの詳細ページの処理結果。seq は詳細 URL がキューに入った順番。
+
+    英語版 (lang が "en") のページは Subject にせず、表の内容を translation に持つ。
+    """
+
+    seq: int
+    url: str
+    subject: Subject | None = None
+    error: HarvestError | None = None
+    lang: str = "ja"
+    translation: dict[str, str] | None = None
+
+
+class Crawler:
+    """index.html → 開講部局別一覧 → 詳細ページ の順にたどるストリーミングクローラー。
+
+    一覧ページを1つ解析するたびに、そこから見つかった詳細ページ URL をすぐに取得キューへ
+    流すため、全講義コードの列挙を待たずに最初のレコードが得られる。同じ URL は一度しか
+    取得しない。
+
+    state を渡すと進捗をチェックポイントとして記録し、記録済みの状態から再開する: 処理済みの
+    詳細ページと一覧ページは取得せず、前回のフロンティアを最初にキューへ入れる。
+
+    years を指定すると、ページ名の年度がそのいずれかの一覧・詳細ページだけをたどる。lang は
+    たどるサイトの言語で、"en" なら英語版 (``_en`` 付き) のページだけをたどり、詳細ページは
+    Subject ではなく translation として返す。shard を指定すると、一覧ページは全てたどり、
+    詳細ページはそのシャードの担当 (講義コードで決まる) のものだけを取得する。
+    """
+
+    def __init__(
+        self,
+        fetcher: AsyncFetcher,
+        base_url: str,
+        field_plan: FieldPlan,
+        parser: str | None = None,
+        state: CrawlState | None = None,
+        years: Collection[str] | None = None,
+        lang: str = "ja",
+        shard: Shard | None = None,
+    ):
+        self.fetcher = fetcher
+        self.base_url = base_url
+        self.field_plan = field_plan
+        self.parser = parser
+        self.state = state
+        self.years = frozenset(years) if years is not None else None
+        self.lang = lang
+        self.shard = shard
+        self._seen: set[str] = set(state.completed) if state is not None else set()
+        self._seq = 0
+
+    def _normalize(self, url: str) -> str:
+        return urldefrag(urljoin(self.base_url, url))[0]
+
+    def _is_target(self, page_re: re.Pattern[str], link: str) -> bool:
+        """リンク先のページ名がこのクローラーの対象 (年度と言語) かどうか"""
+        m = page_re.match(link.rsplit("/", 1)[-1])
+        if m is None or (m.group("lang") or "ja") != self.lang:
+            return False
+        return self.years is None or m.group("year") in self.years
+
+    def _enqueue(self, queue: "asyncio.Queue[tuple[int, str] | None]", url: str) -> bool:
+        url = self._normalize(url)
+        if url in self._seen or (self.shard is not None and not self.shard.owns(url)):
+            return False
+        self._seen.add(url)
+        if self.state is not None and url not in self.state.queued:
+            self.state.record_queued(url)
+        queue.put_nowait((self._seq, url))
+        self._seq += 1
+        return True
+
+    async def crawl(
+        self,
+        detail_urls: Iterable[str] = (),
+        discover: bool = True,
+        lecture_codes: Collection[str] | None = None,
+    ) -> AsyncIterator[CrawlResult]:
+        """詳細ページを取得・抽出し、終わったものから順に CrawlResult を yield する。
+
+        detail_urls は discovery を待たずに直接取得する詳細ページ。discover が真なら
+        index.html から一覧ページをたどる。lecture_codes を指定すると、その講義コードの
+        詳細ページだけを取得し、全て見つかった時点で残りの一覧ページの取得を打ち切る。
+        index.html の取得などで discovery が失敗した場合は、キューに入った詳細ページを
+        処理し終えてからその例外を送出する。
+        """
+        queue: asyncio.Queue[tuple[int, str] | None] = asyncio.Queue()
+        results: asyncio.Queue[CrawlResult | None] = asyncio.Queue()
+        if self.state is not None:
+            for url in self.state.frontier:
+                self._enqueue(queue, url)
+        for url in detail_urls:
+            self._enqueue(queue, url)
+
+        wanted = set(lecture_codes) if lecture_codes is not None else None
+        if wanted is not None and self.state is not None:
+            # Codes queued before an interruption were already found.
+            wanted -= {code for code in map(_lecture_code, self.state.queued) if code}
+        n_workers = self.fetcher.max_concurrency
+
+        async def discovery() -> None:
+            try:
+                if discover:
+                    await self._discover(queue, wanted)
+            finally:
+                for _ in range(n_workers):
+                    queue.put_nowait(None)
+
+        async def worker() -> None:
+            try:
+                while (item := await queue.get()) is not None:
+                    seq, url = item
+                    results.put_nowait(await self._process_detail(seq, url))
+            finally:
+                results.put_nowait(None)
+
+        discovery_task = asyncio.create_task(discovery())
+        tasks = [discovery_task, *(asyncio.create_task(worker()) for _ in range(n_workers))]
+        try:
+            remaining = n_workers
+            while remaining:
+                result = await results.get()
+                if result is None:
+                    remaining -= 1
+                else:
+                    yield result
+            # A failed discovery (e.g. index.html missing) must not look like an empty site:
+            # the pages already queued are yielded above, then the error is raised.
+            await asyncio.wait([discovery_task])
+            if (error := discovery_task.exception()) is not None:
+                raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _discover(self, queue: "asyncio.Queue[tuple[int, str] | None]", wanted: set[str] | None) -> None:
+        if wanted is not None and not wanted:
+            return
+        if self.state is not None and self.state.listing_urls is not None:
+            listing_urls = [u for u in self.state.listing_urls if u not in self.state.listings_done]
+            config.logger.info(f"{len(listing_urls)} listing pages left from the checkpoint.")
+        else:
+            index_url = self._normalize("index.html")
+            index_html = await self.fetcher.fetch(index_url)
+            listing_urls, _ = classify_page_links(index_html)
+            listing_urls = [u for u in listing_urls if self._is_target(config.LISTING_PAGE_RE, u)]
+            listing_urls = list(dict.fromkeys(self._normalize(u) for u in listing_urls))
+            config.logger.info(f"Discovered {len(listing_urls)} listing pages from {index_url}.")
+            if self.state is not None:
+                self.state.record_listings(listing_urls)
+
+        async def fetch_listing(url: str) -> tuple[str, str | None]:
+            try:
+                return url, await self.fetcher.fetch(url)
+            except Exception as e:
+                config.logger.error(f"Error fetching listing page {url}: {e}", extra=config.sampled("fetch_error"))
+                return url, None
+
+        pending = [asyncio.create_task(fetch_listing(u)) for u in listing_urls]
+        try:
+            for next_done in asyncio.as_completed(pending):
+                url, html = await next_done
+                if html is None:
+                    continue
+                _, detail_links = classify_page_links(html)
+                added = 0
+                for link in detail_links:
+                    if not self._is_target(config.DETAIL_PAGE_RE, link):
+                        continue
+                    if wanted is not None:
+                        code = _lecture_code(link)
+                        if not code or code not in wanted:
+                            continue
+                        wanted.discard(code)
+                    added += self._enqueue(queue, link)
+                config.logger.debug(f"{url}: queued {added} detail pages.")
+                if self.state is not None:
+                    self.state.record_listing_done(url)
+                if wanted is not None and not wanted:
+                    config.logger.info("All requested lecture codes found; stopping discovery early.")
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        if wanted:
+            config.logger.warning(f"Lecture codes not found on any listing page: {sorted(wanted)}")
+
+    async def _process_detail(self, seq: int, url: str) -> CrawlResult:
+        try:
+            with METRICS.time("fetch"):
+                html = await self.fetcher.fetch(url)
+        except Exception as e:
+            config.logger.error(f"Error fetching {url}: {e}", extra=config.sampled("fetch_error"))
+            METRICS.inc("extraction_errors")
+            return CrawlResult(seq, url, error=HarvestError.from_exception(url, e), lang=self.lang)
+        if self.lang != "ja":
+            try:
+                translation = extract_page_fields(html, url, self.parser)
+            except Exception as e:
+                config.logger.exception(f"Error parsing {url}: {e}", extra=config.sampled("extraction_error"))
+                METRICS.inc("extraction_errors")
+                return CrawlResult(seq, url, error=HarvestError.from_exception(url, e), lang=self.lang)
+            return CrawlResult(seq, url, lang=self.lang, translation=translation)
+        try:
+            subject = extract_subject_data(html, url, self.field_plan, self.parser)
+        except HeaderMismatchError as e:
+            # Reported once per header layout in the drift report.
+            config.logger.debug(f"Header mismatch in {url}: {e}")
+            METRICS.inc("extraction_errors")
+            return CrawlResult(seq, url, error=HarvestError.from_exception(url, e))
+        except Exception as e:
+            config.logger.exception(f"Error parsing {url}: {e}", extra=config.sampled("extraction_error"))
+            METRICS.inc("extraction_errors")
+            return CrawlResult(seq, url, error=HarvestError.from_exception(url, e))
+        if self.state is not None:
+            self.state.record_completed(url, subject)
+        return CrawlResult(seq, url, subject=subject)
+
+
+async def merge_crawls(streams: Sequence[AsyncIterator[CrawlResult]]) -> AsyncIterator[CrawlResult]:
+    """複数のクローラーの結果を、どれかで終わったものから順に1つの列にまとめる。
+
+    各ストリームは別タスクで進め、間のキューは上限付き (消費が遅いと全てのクローラーが待つ)。
+    いずれかのストリームで例外が起きると、それを送出して残りを打ち切る。
+    """
+    done = object()
+    results: asyncio.Queue[object] = asyncio.Queue(maxsize=max(1, len(streams)) * 4)
+
+    async def pump(stream: AsyncIterator[CrawlResult]) -> None:
+        try:
+            async with aclosing(stream):  # type: ignore[type-var]
+                async for result in stream:
+                    await results.put(result)
+        except Exception as e:
+            await results.put(e)
+        await results.put(done)
+
+    tasks = [asyncio.create_task(pump(stream)) for stream in streams]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await results.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item  # type: ignore[misc]
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,11 +1,23 @@
+import hashlib
+from collections.abc import Sequence
+from dataclasses import dataclass
 from typing import Any, get_args, get_origin
 
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup, FeatureNotFound, Tag
 from bs4.element import NavigableString
-from pydantic import AliasChoices
+from pydantic import AliasChoices, ValidationError
 
 import config
-from models import Subject
+from metrics import METRICS
+from models import JOINED_FIELDS, Subject
+from timetable import attach_slots
+
+# ヘッダー検証の基準 (ページ毎に作り直さない)
+_CANONICAL_HEADER_SET = frozenset(config.CANONICAL_HEADERS)
+
+# FieldPlan の変換の種類
+COERCE_STR = "str"
+COERCE_LIST = "list"
 
 
 class HeaderMismatchError(ValueError):
@@ -14,6 +26,17 @@ class HeaderMismatchError(ValueError):
     pass
 
 
+def make_soup(html_content: str, parser: str | None = None) -> BeautifulSoup:
+    """指定したパーサーバックエンド (config.HTML_PARSERS のいずれか) で HTML をパースする"""
+    parser = parser or config.DEFAULT_HTML_PARSER
+    if parser not in config.HTML_PARSERS:
+        raise ValueError(f"Unknown HTML parser backend: {parser!r} (choose from {', '.join(config.HTML_PARSERS)})")
+    try:
+        return BeautifulSoup(html_content, parser)
+    except FeatureNotFound as e:
+        raise ValueError(f"HTML parser backend {parser!r} is not installed (try: pip install {parser})") from e
+
+
 def extract_headers(soup: BeautifulSoup) -> list[str]:
     """HTMLスープからヘッダーテキストのリストを抽出する"""
     headers: list[str] = []
@@ -34,10 +57,9 @@ def validate_headers(actual_headers: list[str], file_identifier: str = "Unknown
     抽出されたヘッダーとCanonicalヘッダーを比較検証する。
     不一致があればログを出力し、致命的な場合は例外を送出する。
     """
-    canonical_set = set(config.CANONICAL_HEADERS)
     actual_set = set(actual_headers)
-    unexpected_headers = actual_set - canonical_set
-    missing_headers = canonical_set - actual_set
+    unexpected_headers = actual_set - _CANONICAL_HEADER_SET
+    missing_headers = _CANONICAL_HEADER_SET - actual_set
     error_occurred = False
     if unexpected_headers:
         config.logger.error(f"[{file_identifier}] Unexpected headers found: {unexpected_headers}")
@@ -51,17 +73,62 @@ def validate_headers(actual_headers: list[str], file_identifier: str = "Unknown
         config.logger.info(f"[{file_identifier}] Headers validated successfully.")
 
 
+def header_signature(headers: Sequence[str]) -> str:
+    """ヘッダー構成 (見出しの並び) のハッシュ。サイトのレイアウトが変わると値が変わる。"""
+    return hashlib.blake2b("\x1f".join(headers).encode("utf-8"), digest_size=8).hexdigest()
+
+
+# 検証済みのヘッダー構成: signature → (想定外のヘッダー, 欠けているヘッダー)
+_VALIDATED_LAYOUTS: dict[str, tuple[tuple[str, ...], tuple[str, ...]]] = {}
+
+
+def check_header_layout(actual_headers: Sequence[str], file_identifier: str = "Unknown HTML") -> str:
+    """ページのヘッダー構成を検証し、その signature を返す。
+
+    検証 (とそのログ出力) は初めて現れた signature に対してだけ行い、結果をプロセス内で
+    キャッシュする。各ページの signature は METRICS に記録され、実行の最後にドリフトレポート
+    (signature 毎のページ数) としてまとめて出力される。不一致なら毎回 HeaderMismatchError を送出する。
+    """
+    signature = header_signature(actual_headers)
+    cached = _VALIDATED_LAYOUTS.get(signature)
+    if cached is None:
+        actual_set = set(actual_headers)
+        cached = (
+            tuple(sorted(actual_set - _CANONICAL_HEADER_SET)),
+            tuple(sorted(_CANONICAL_HEADER_SET - actual_set)),
+        )
+        _VALIDATED_LAYOUTS[signature] = cached
+        try:
+            validate_headers(list(actual_headers), f"{file_identifier}, layout {signature}")
+        except HeaderMismatchError:
+            pass  # Raised below for every page with this layout.
+    METRICS.record_layout(signature, actual_headers, file_identifier, *cached)
+    unexpected, _ = cached
+    if unexpected:
+        raise HeaderMismatchError(f"Header mismatch detected in {file_identifier}. Unexpected: {set(unexpected)}")
+    return signature
+
+
 def _parse_detail_table(
     soup: BeautifulSoup,
 ) -> dict[str, str]:
     """シラバス詳細テーブルを解析し、ヘッダーとデータの辞書を作成する。rowspanを考慮する。"""
-    data_dict: dict[str, str] = {}
     table = soup.select_one("body > blockquote > table:nth-of-type(2)")
     if not table or not isinstance(table, Tag):
         # Not an error by itself — many HTML pages are index pages without the detail table.
         # Use debug log level to avoid alarming users and cluttering logs.
         config.logger.debug("Detail table not found or is not a Tag in HTML. Skipping parse.")
-        return data_dict
+        return {}
+    return _walk_detail_table(table)[0]
+
+
+def _walk_detail_table(table: Tag) -> tuple[dict[str, str], list[str]]:
+    """詳細テーブルを1回走査し、(ヘッダーとデータの辞書, ヘッダーの並び) を返す。
+
+    ヘッダーの並びは extract_headers と同じ (th.detail-head の見出しをページ上の順に)。
+    """
+    data_dict: dict[str, str] = {}
+    headers: list[str] = []
 
     # Find all rows (allow tbody wrapper added by parser)
     rows = table.find_all("tr")
@@ -105,12 +172,15 @@ def _parse_detail_table(
                     cell.name,
                     rowspan_str,
                     colspan_str,
+                    extra=config.sampled("bad_span"),
                 )
                 rowspan = 1
                 colspan = 1
 
             if cell.name == "th":
                 header = " ".join(cell.get_text(strip=True).split())
+                if "detail-head" in (cell.get("class") or ()):
+                    headers.append(header)
             elif cell.name == "td" and header:
                 for br in cell.find_all("br"):
                     try:
@@ -136,7 +206,27 @@ def _parse_detail_table(
                     data_dict[effective_header] = data
 
             current_col_idx += colspan
-    return data_dict
+    return data_dict, headers
+
+
+def classify_page_links(html_content: str) -> tuple[list[str], list[str]]:
+    """ページ内のリンクを (開講部局別一覧ページ, 詳細ページ) に分類して返す。
+
+    同じディレクトリ内へのリンクのみを対象とする (英語版 ``../syllabusHtml_en/`` などは除外)。
+    リンク探索だけなので、軽量な組み込みパーサーを使う。
+    """
+    listing_links: list[str] = []
+    detail_links: list[str] = []
+    soup = BeautifulSoup(html_content, "html.parser")
+    for a in soup.find_all("a", href=True):
+        href = str(a["href"]).strip()
+        if "/" in href:
+            continue
+        if config.DETAIL_PAGE_RE.match(href):
+            detail_links.append(href)
+        elif config.LISTING_PAGE_RE.match(href):
+            listing_links.append(href)
+    return listing_links, detail_links
 
 
 def _clean_value(value: str | None) -> str | None:
@@ -166,85 +256,183 @@ def _split_list_value(value: str | None) -> list[str] | None:
     return items if items else None
 
 
-def extract_subject_data(html_content: str, file_identifier: str) -> Subject | None:
-    """HTMLコンテンツ文字列から Subject モデルのデータを抽出する。ヘッダー検証を含む。"""
-    soup = BeautifulSoup(html_content, "html5lib")
-
-    # --- Find detail table first; if absent, skip early to avoid spurious header warnings ---
-    detail_table = soup.select_one("body > blockquote > table:nth-of-type(2)")
-    if not detail_table or not isinstance(detail_table, Tag):
-        # Index pages often do not include the detail table; this is expected.
-        # Log at INFO and gracefully skip extraction for these pages.
-        config.logger.info(f"[{file_identifier}] No detail table found; skipping subject extraction.")
-        return None
+def _is_list_annotation(annotation: Any) -> bool:
+    """Optional[List[str]] / List[str] のような list 型アノテーションかどうかを判定する"""
+    # Handle Optional[List[str]] and List[str] by checking Union/Optional
+    try:
+        if get_origin(annotation) is list:
+            return True
+        if getattr(annotation, "__origin__", None) is list:
+            # typing.List[str] fallback
+            return True
+        for arg in get_args(annotation):
+            if get_origin(arg) is list or getattr(arg, "__origin__", None) is list:
+                return True
+    except Exception:
+        return False
+    return False
+
+
+@dataclass(frozen=True)
+class FieldPlan:
+    """生ヘッダー → Subject フィールドの解決表。
+
+    lookup は <br> 変種を含む全ての生ヘッダーから (フィールド名, 変換の種類, 優先順位) への dict。
+    同じフィールドに複数の候補ヘッダーが該当した場合は優先順位の小さいもの (primary alias が 0)
+    を採用する。fields は値が無い場合の既定値を埋めるための (フィールド名, 変換の種類) の列。
+    """
 
-    # Let header mismatch and other exceptions propagate so the CLI/test
-    # harness can report and handle them. Do not swallow these errors.
-    actual_headers = extract_headers(soup)
-    validate_headers(actual_headers, file_identifier)
+    lookup: dict[str, tuple[str, str, int]]
+    fields: tuple[tuple[str, str], ...]
 
-    raw_data_dict = _parse_detail_table(soup)
 
-    # If there are no parsed values, treat HTML as invalid and stop
-    if not raw_data_dict:
-        config.logger.warning(f"No detail data parsed for {file_identifier}; skipping subject extraction.")
-        return None
+def build_field_plan() -> FieldPlan:
+    """Subject の alias 定義とアノテーションから FieldPlan を作る。
 
-    subject_data: dict[str, Any] = {}
+    ページに依存しない情報なので、モジュール読み込み時に一度だけ計算する (FIELD_PLAN)。
+    """
+    lookup: dict[str, tuple[str, str, int]] = {}
+    fields: list[tuple[str, str]] = []
     # Pylance のエラーを抑制 (型推論が難しいため)
     for field_name, field_info in Subject.model_fields.items():  # type: ignore
+        if field_name in JOINED_FIELDS:
+            continue
+        # dict keeps insertion order, so the primary alias gets the best rank
+        possible_keys: dict[str, None] = {}
         primary_alias = field_info.alias
-        possible_keys: set[str] = set()
         if primary_alias and isinstance(primary_alias, str):
-            possible_keys.add(primary_alias)
+            possible_keys[primary_alias] = None
 
         validation_alias = field_info.validation_alias
         if validation_alias and isinstance(validation_alias, AliasChoices):
-            possible_keys.update(c for c in validation_alias.choices if isinstance(c, str))
+            possible_keys.update((c, None) for c in validation_alias.choices if isinstance(c, str))
 
-        br_variants: set[str] = set()
+        br_variants: dict[str, None] = {}
         for key in possible_keys:
             if key and " " in key:
-                br_variants.add(key.replace(" ", "<br>"))
-                br_variants.add(key.replace(" ", "<BR>"))
-                br_variants.add(key.replace(" ", "<br/>"))
-                br_variants.add(key.replace(" ", "<BR/>"))
+                for br in ("<br>", "<BR>", "<br/>", "<BR/>"):
+                    br_variants[key.replace(" ", br)] = None
         possible_keys.update(br_variants)
 
-        raw_value = None
-        for key in possible_keys:
-            if key in raw_data_dict:
-                raw_value = raw_data_dict[key]
-                break
-
-        cleaned_value = _clean_value(raw_value)
-        annotation_origin = get_origin(field_info.annotation)
-        annotation_args = get_args(field_info.annotation)
-        # Handle Optional[List[str]] and List[str] by checking Union/Optional
-        is_list_type = False
-        try:
-            if annotation_origin is list:
-                is_list_type = True
-            elif getattr(field_info.annotation, "__origin__", None) is list:
-                # typing.List[str] fallback
-                is_list_type = True
-            elif annotation_args:
-                for arg in annotation_args:
-                    if get_origin(arg) is list or getattr(arg, "__origin__", None) is list:
-                        is_list_type = True
-                        break
-        except Exception:
-            is_list_type = False
-
-        if is_list_type:
+        kind = COERCE_LIST if _is_list_annotation(field_info.annotation) else COERCE_STR
+        fields.append((field_name, kind))
+        for rank, key in enumerate(possible_keys):
+            lookup.setdefault(key, (field_name, kind, rank))
+    return FieldPlan(lookup, tuple(fields))
+
+
+FIELD_PLAN = build_field_plan()
+
+
+def _map_fields(raw_data_dict: dict[str, str], field_plan: FieldPlan) -> dict[str, Any]:
+    """生ヘッダーの dict を1回走査して Subject のフィールド dict にする"""
+    lookup = field_plan.lookup
+    found: dict[str, tuple[int, str]] = {}
+    for key, raw_value in raw_data_dict.items():
+        target = lookup.get(key)
+        if target is None:
+            continue
+        field_name, _, rank = target
+        previous = found.get(field_name)
+        if previous is None or rank < previous[0]:
+            found[field_name] = (rank, raw_value)
+
+    subject_data: dict[str, Any] = {}
+    for field_name, kind in field_plan.fields:
+        hit = found.get(field_name)
+        cleaned_value = _clean_value(hit[1]) if hit is not None else None
+        if kind == COERCE_LIST:
             # Ensure lists are always represented as lists (empty list if missing)
             subject_data[field_name] = _split_list_value(cleaned_value) or []
         else:
             # For non-list string-like fields, normalize missing values to empty string
             subject_data[field_name] = cleaned_value if cleaned_value is not None else ""
+    return subject_data
+
+
+def extract_subject_data(
+    html_content: str,
+    file_identifier: str,
+    field_plan: FieldPlan | None = None,
+    parser: str | None = None,
+) -> Subject | None:
+    """HTMLコンテンツ文字列から Subject モデルのデータを抽出する。ヘッダー検証を含む。
+
+    parser は BeautifulSoup のバックエンド (省略時は config.DEFAULT_HTML_PARSER)。
+    """
+    with METRICS.time("parse_html"):
+        soup = make_soup(html_content, parser)
+
+    # --- Find detail table first; if absent, skip early to avoid spurious header warnings ---
+    detail_table = soup.select_one("body > blockquote > table:nth-of-type(2)")
+    if not detail_table or not isinstance(detail_table, Tag):
+        # Index pages often do not include the detail table; this is expected.
+        # Log at INFO and gracefully skip extraction for these pages.
+        config.logger.info(
+            f"[{file_identifier}] No detail table found; skipping subject extraction.",
+            extra=config.sampled("no_detail_table"),
+        )
+        METRICS.inc("pages_skipped")
+        return None
+
+    # Headers are collected in the same pass as the data, so the table is walked only once.
+    with METRICS.time("parse_detail_table"):
+        raw_data_dict, actual_headers = _walk_detail_table(detail_table)
+
+    # Let header mismatch and other exceptions propagate so the CLI/test
+    # harness can report and handle them. Do not swallow these errors.
+    with METRICS.time("validate_headers"):
+        try:
+            check_header_layout(actual_headers, file_identifier)
+        except HeaderMismatchError:
+            METRICS.inc("header_mismatches")
+            raise
+
+    # If there are no parsed values, treat HTML as invalid and stop
+    if not raw_data_dict:
+        config.logger.warning(
+            f"No detail data parsed for {file_identifier}; skipping subject extraction.",
+            extra=config.sampled("no_detail_data"),
+        )
+        METRICS.inc("pages_skipped")
+        return None
+
+    with METRICS.time("map_fields"):
+        subject_data = _map_fields(raw_data_dict, field_plan if field_plan is not None else FIELD_PLAN)
 
     # Construct the subject; Pydantic ValidationError should raise and be
     # handled by the caller/test harness. Avoid swallowing validation
     # exceptions so failures are explicit and visible to the operator.
-    subject = Subject(**subject_data)
+    with METRICS.time("validate_model"):
+        try:
+            subject = Subject(**subject_data)
+        except ValidationError:
+            METRICS.inc("validation_failures")
+            raise
+    # Timetable slots are parsed here, in the worker that extracted the page, not when writing.
+    with METRICS.time("parse_slots"):
+        attach_slots(subject)
+    METRICS.inc("pages_parsed")
     return subject
+
+
+def extract_page_fields(html_content: str, file_identifier: str, parser: str | None = None) -> dict[str, str] | None:
+    """詳細ページの表を (ページ上の見出し → 整形済みの値) の dict として抽出する。
+
+    英語版サイトのページ用。見出しは Subject の alias と対応しないので、ヘッダー検証や
+    Subject へのマッピングはせずにそのまま返す。詳細テーブルが無ければ None。
+    """
+    with METRICS.time("parse_html"):
+        soup = make_soup(html_content, parser)
+    detail_table = soup.select_one("body > blockquote > table:nth-of-type(2)")
+    if not detail_table or not isinstance(detail_table, Tag):
+        config.logger.info(
+            f"[{file_identifier}] No detail table found; skipping page.", extra=config.sampled("no_detail_table")
+        )
+        METRICS.inc("pages_skipped")
+        return None
+    with METRICS.time("parse_detail_table"):
+        raw_data_dict, _ = _walk_detail_table(detail_table)
+    fields = {header: _clean_value(value) or "" for header, value in raw_data_dict.items()}
+    METRICS.inc("translations_parsed")
+    return fields
@@ -0,0 +1,103 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from types import TracebackType
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+from http_cache import HttpCache
+from snapshots import SnapshotRun
+
+
+class FetchError(RuntimeError):
+    """HTTP 取得に失敗した場合に送出される例外"""
+
+    pass
+
+
+class AsyncFetcher:
+    """asyncio から使う HTTP フェッチャー。
+
+    1つの ``requests.Session`` を共有してコネクションを keep-alive で再利用し、
+    同時リクエスト数を ``max_concurrency`` に制限する。ブロッキングな I/O は専用の
+    スレッドプールで実行されるため、イベントループ側ではその間に受信済みページの
+    パースを進められる。
+
+    ``cache`` を渡すと、キャッシュ済みの URL には条件付き GET を送り、304 応答ならキャッシュの
+    本文を返す。``snapshot`` を渡すと、取得した (またはキャッシュから返した) 本文を全てスナップショット
+    ストアに保存する。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        timeout: float = 30.0,
+        retries: int = 3,
+        cache: HttpCache | None = None,
+        snapshot: SnapshotRun | None = None,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.cache = cache
+        self.snapshot = snapshot
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = config.USER_AGENT
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.max_concurrency,
+            pool_block=True,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=("GET",),
+            ),
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="fetch")
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def _get(self, url: str) -> str:
+        cache = self.cache
+        cached = cache.get(url) if cache is not None else None
+        headers = cached.conditional_headers() if cached is not None else None
+        response = self._session.get(url, timeout=self.timeout, headers=headers)
+        if response.status_code == 304 and cache is not None and cached is not None:  # noqa: PLR2004
+            cache.touch(url)
+            body = cached.body
+        elif response.status_code == 200:  # noqa: PLR2004
+            body = response.content
+            if cache is not None:
+                cache.put(url, body, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        else:
+            raise FetchError(f"GET {url} returned HTTP {response.status_code}")
+        if self.snapshot is not None:
+            self.snapshot.add(url, body)
+        # The syllabus site is UTF-8 but does not always send a charset header.
+        return body.decode(config.SITE_ENCODING, errors="replace")
+
+    async def fetch(self, url: str) -> str:
+        """URL を取得して本文を返す。非 200 応答は FetchError。"""
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._get, url)
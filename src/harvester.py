@@ -1,74 +1,738 @@
+import asyncio
+import logging
+import queue
+import threading
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Collection, Generator, Iterable, Iterator, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import aclosing
+from dataclasses import dataclass
 from pathlib import Path
-
-import pandas as pd
+from typing import TYPE_CHECKING, Any, overload
+from urllib.parse import urljoin
 
 import config
-from extractors import extract_subject_data
-from models import Subject
+from archives import PAGE_PATTERN, is_archive, is_page_name, iter_archive_pages
+from checkpoint import CrawlState
+from extractors import FIELD_PLAN, FieldPlan, HeaderMismatchError, extract_page_fields, extract_subject_data
+from manifest import Manifest, content_hash
+from metrics import METRICS
+from models import HarvestError, Subject
+from sharding import Shard
+from snapshots import SnapshotRun, SnapshotStore
+from writers import OutputFormat, streaming_writers
+
+if TYPE_CHECKING:
+    import multiprocessing.queues
+
+    from crawler import CrawlResult
+    from fetcher import AsyncFetcher
+
+# harvest_iter が yield する1件分の結果
+HarvestItem = Subject | HarvestError
+
+# ワーカープロセス毎に一度だけ設定される事前計算済みフィールド解決表とパーサー
+_worker_field_plan: FieldPlan | None = None
+_worker_parser: str | None = None
+
+
+@dataclass(frozen=True)
+class WebSource:
+    """harvest_iter の source としてライブサイトを指定する。target_codes の意味は harvest_from_web と同じ。"""
+
+    target_codes: list[str] | None = None
+
+
+@dataclass(frozen=True, order=True)
+class HarvestTarget:
+    """ライブ取得の対象の1つ (年度とサイトの言語 "ja" / "en")"""
+
+    year: int
+    lang: str = "ja"
+
+
+def parse_targets(spec: str) -> tuple[HarvestTarget, ...]:
+    """``2024-2025:ja,en`` のような指定を HarvestTarget の列にする。
+
+    ``:`` の前は年度 (``2025``)・範囲 (``2024-2025``) のカンマ区切り、後ろは言語のカンマ区切り
+    (省略時は ja)。英語版は日本語版のレコードに突き合わせて付けるので、en を指定した年度は ja も
+    必要。不正な指定は ValueError。
+    """
+    years_part, _, langs_part = spec.partition(":")
+    years: list[int] = []
+    for item in years_part.split(","):
+        first, _, last = item.strip().partition("-")
+        if not first.isdigit() or (last and not last.isdigit()):
+            raise ValueError(f"Invalid year in harvest targets: {item.strip()!r} (expected e.g. 2025 or 2024-2025)")
+        start, end = int(first), int(last or first)
+        if end < start:
+            raise ValueError(f"Invalid year range in harvest targets: {item.strip()!r}")
+        years.extend(range(start, end + 1))
+    langs = [lang.strip() for lang in langs_part.split(",")] if langs_part else ["ja"]
+    for lang in langs:
+        if lang not in config.SITE_LANGUAGES:
+            raise ValueError(f"Unknown language in harvest targets: {lang!r} (choose from {config.SITE_LANGUAGES})")
+    if "en" in langs and "ja" not in langs:
+        raise ValueError("English pages are joined onto Japanese records; add 'ja' to the harvest targets.")
+    return tuple(sorted({HarvestTarget(year, lang) for year in years for lang in langs}))
+
+
+@dataclass(frozen=True)
+class MultiWebSource:
+    """harvest_iter の source として複数の年度・言語のライブサイトを指定する (parse_targets を参照)。
+
+    全ての対象を1つの取得プール (同時リクエスト数は settings.max_concurrency) で並行してたどり、
+    英語版の詳細ページは同じ年度・講義コードの日本語版のレコードの english に付ける。
+    """
+
+    targets: tuple[HarvestTarget, ...]
+
+
+@dataclass(frozen=True)
+class SnapshotSource:
+    """harvest_iter の source としてスナップショットストアに保存した実行 (run_id 省略時は最新) を指定する。"""
+
+    root: Path
+    run_id: str | None = None
+
+
+def _batched(items: Iterator[HarvestItem], size: int) -> Generator[list[HarvestItem], None, None]:
+    batch: list[HarvestItem] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _init_worker(field_plan: FieldPlan, parser: str | None = None) -> None:
+    """ProcessPoolExecutor の initializer。親で計算したフィールド解決表をワーカーに保持させる。"""
+    global _worker_field_plan, _worker_parser
+    _worker_field_plan = field_plan
+    _worker_parser = parser
+
+
+def _init_pool_worker(
+    field_plan: FieldPlan,
+    parser: str | None = None,
+    log_queue: "multiprocessing.queues.Queue[logging.LogRecord] | None" = None,
+    log_level: int = logging.INFO,
+) -> None:
+    """ワーカープロセスの initializer。fork で引き継いだ親のメトリクスを二重に集計しないよう消してから初期化する。
+
+    ログは親の configure_logging のキューに送る (書き出しとサンプリングは親のリスナーで行う)。
+    """
+    METRICS.reset()
+    config.configure_worker_logging(log_queue, log_level)
+    _init_worker(field_plan, parser)
+
+
+def _pool_initargs(parser: str | None) -> tuple[Any, ...]:
+    return (FIELD_PLAN, parser, config.log_queue(), logging.getLogger().getEffectiveLevel())
+
+
+def _extract_file(path: Path) -> tuple[Subject | None, HarvestError | None]:
+    """1ファイルを読み込んで抽出する。例外は HarvestError として返す(プロセス境界を越えられるように)。"""
+    try:
+        with METRICS.time("read_file"):
+            html = path.read_text(encoding="utf-8")
+        METRICS.inc("pages_read")
+        return extract_subject_data(html, path.name, _worker_field_plan, _worker_parser), None
+    except HeaderMismatchError as e:
+        # Reported once per header layout in the drift report rather than with a traceback per page.
+        config.logger.debug(f"Header mismatch in {path}: {e}")
+        METRICS.inc("extraction_errors")
+        return None, HarvestError.from_exception(str(path), e)
+    except Exception as e:
+        config.logger.exception(f"Error reading/parsing {path}: {e}", extra=config.sampled("extraction_error"))
+        METRICS.inc("extraction_errors")
+        return None, HarvestError.from_exception(str(path), e)
+
+
+def _extract_file_in_worker(path: Path) -> tuple[Subject | None, HarvestError | None, dict[str, Any]]:
+    """ワーカープロセス用の _extract_file。このファイルの分のメトリクスを添えて返す(親で集計する)。"""
+    subject, error = _extract_file(path)
+    return subject, error, METRICS.drain()
+
+
+def _read_local_pages(paths: list[Path]) -> Iterator[tuple[str, bytes | HarvestError]]:
+    """ファイルを (名前, 内容) のページ列として読む。読めなかったファイルは内容の代わりに HarvestError。"""
+    for p in paths:
+        try:
+            yield p.name, p.read_bytes()
+        except OSError as e:
+            config.logger.exception(f"Error reading {p}: {e}", extra=config.sampled("read_error"))
+            METRICS.inc("extraction_errors")
+            yield p.name, HarvestError.from_exception(str(p), e)
+
+
+def _is_translation_page(name: str) -> bool:
+    """英語版サイトの詳細ページ (``..._en.html``) かどうか"""
+    m = config.DETAIL_PAGE_RE.match(name.rsplit("/", 1)[-1])
+    return m is not None and m.group("lang") is not None
+
+
+def _extract_member(
+    source: str, data: bytes, translate: bool = False
+) -> tuple[Subject | dict[str, str] | None, HarvestError | None]:
+    """アーカイブから読み込んだメンバーの内容を抽出する (読み込みは親プロセスで行う)。
+
+    translate なら英語版の詳細ページは Subject ではなく表の内容 (extract_page_fields) にする。
+    """
+    try:
+        html = data.decode("utf-8")
+        name = source.rsplit("/", 1)[-1]
+        if translate and _is_translation_page(name):
+            return extract_page_fields(html, name, _worker_parser), None
+        return extract_subject_data(html, name, _worker_field_plan, _worker_parser), None
+    except HeaderMismatchError as e:
+        config.logger.debug(f"Header mismatch in {source}: {e}")
+        METRICS.inc("extraction_errors")
+        return None, HarvestError.from_exception(source, e)
+    except Exception as e:
+        config.logger.exception(f"Error parsing {source}: {e}", extra=config.sampled("extraction_error"))
+        METRICS.inc("extraction_errors")
+        return None, HarvestError.from_exception(source, e)
+
+
+def _extract_member_in_worker(
+    source: str, data: bytes, translate: bool = False
+) -> tuple[Subject | dict[str, str] | None, HarvestError | None, dict[str, Any]]:
+    subject, error = _extract_member(source, data, translate)
+    return subject, error, METRICS.drain()
 
 
 class Harvester:
     def __init__(self, settings):
         self.settings = settings
+        # 直近の harvest で発生したファイル単位のエラー
+        self.errors: list[HarvestError] = []
+
+    def harvest_from_local(
+        self, html_dir: Path, workers: int | None = None, manifest: Manifest | None = None
+    ) -> list[Subject]:
+        return list(self.iter_local(html_dir, workers, manifest))
+
+    def iter_local(
+        self, html_dir: Path, workers: int | None = None, manifest: Manifest | None = None
+    ) -> Iterator[Subject]:
+        """html_dir 内の *.html をファイル名順に抽出し、Subject を1件ずつ yield する (エラーは self.errors へ)"""
+        for item in self.harvest_iter(html_dir, workers=workers, manifest=manifest):
+            if isinstance(item, Subject):
+                yield item
 
-    def harvest_from_local(self, html_dir: Path) -> list[Subject]:
-        subjects: list[Subject] = []
+    @overload
+    def harvest_iter(
+        self,
+        source: Path | WebSource | MultiWebSource | SnapshotSource,
+        batch_size: None = None,
+        workers: int | None = None,
+        manifest: Manifest | None = None,
+        state: CrawlState | None = None,
+        snapshot: SnapshotRun | None = None,
+        shard: Shard | None = None,
+    ) -> Generator[HarvestItem, None, None]: ...
+
+    @overload
+    def harvest_iter(
+        self,
+        source: Path | WebSource | MultiWebSource | SnapshotSource,
+        batch_size: int,
+        workers: int | None = None,
+        manifest: Manifest | None = None,
+        state: CrawlState | None = None,
+        snapshot: SnapshotRun | None = None,
+        shard: Shard | None = None,
+    ) -> Generator[list[HarvestItem], None, None]: ...
+
+    def harvest_iter(
+        self,
+        source: Path | WebSource | MultiWebSource | SnapshotSource,
+        batch_size: int | None = None,
+        workers: int | None = None,
+        manifest: Manifest | None = None,
+        state: CrawlState | None = None,
+        snapshot: SnapshotRun | None = None,
+        shard: Shard | None = None,
+    ) -> Generator[HarvestItem, None, None] | Generator[list[HarvestItem], None, None]:
+        """source のページを抽出し、1ページ終わるごとに Subject か HarvestError を yield する。
+
+        source がディレクトリならその中の *.html をファイル名順に (workers / manifest は iter_local と
+        同じ)、tar / tar.gz / zip のアーカイブなら展開せずにその中の *.html をメンバーの格納順に、
+        WebSource ならライブサイトから取得の終わった順に処理する。ディレクトリ・アーカイブ・ライブサイトの
+        いずれも全件をメモリに集めないので、save_results などの下流の処理が抽出と並行して進む。
+        batch_size を指定するとその件数ごとのリストで yield する。HarvestError は self.errors にも記録される。
+
+        MultiWebSource なら複数の年度・言語のサイトを1つの取得プールでたどり、英語版のページを日本語版の
+        レコードに突き合わせてから yield する。
+
+        WebSource で state (チェックポイント) を渡すと、前回までに抽出済みのレコードを最初に yield
+        し、処理済みのページは取得せずに続きから再開する。
+
+        snapshot を渡すと、読み込み・取得したページの生 HTML をスナップショットストアに保存する。
+        SnapshotSource を渡すと、ネットワークやディスク上の HTML の代わりに、保存済みの実行の
+        ページを保存した順に抽出し直す。
+
+        shard を渡すと、そのシャードの担当のページ (sharding.Shard.owns) だけを読み込み・取得する。
+        ライブサイトでは一覧ページは全てたどり、見つかった詳細ページを講義コードで振り分ける。
+        """
+        self.errors = []
+        items: Generator[HarvestItem, None, None]
+        if isinstance(source, WebSource):
+            items = self._iter_web_items(source.target_codes, state, snapshot, shard)
+        elif isinstance(source, MultiWebSource):
+            items = self._iter_target_items(source.targets, snapshot, shard)
+        elif isinstance(source, SnapshotSource):
+            items = self._iter_snapshot_items(source, workers, shard)
+        else:
+            items = self._iter_local_items(source, workers, manifest, snapshot, shard)
+        if batch_size is not None:
+            return _batched(items, max(1, batch_size))
+        return items
+
+    def _iter_local_items(
+        self,
+        html_dir: Path,
+        workers: int | None,
+        manifest: Manifest | None,
+        snapshot: SnapshotRun | None = None,
+        shard: Shard | None = None,
+    ) -> Generator[HarvestItem, None, None]:
+        if workers is None:
+            workers = getattr(self.settings, "workers", 1)
+        if html_dir and is_archive(html_dir):
+            pages = iter_archive_pages(html_dir)
+            if shard is not None:
+                pages = ((name, data) for name, data in pages if shard.owns(name))
+            yield from self._iter_page_items(pages, f"{html_dir}/", str(html_dir), workers, manifest, snapshot)
+            return
         if not html_dir or not html_dir.is_dir():
             config.logger.error(f"Invalid html_dir passed to harvest_from_local: {html_dir}")
-            return subjects
-        for p in sorted(html_dir.glob("*.html")):
-            try:
-                html = p.read_text(encoding="utf-8")
-                subject = extract_subject_data(html, p.name)
-                if subject:
-                    subjects.append(subject)
-            except Exception as e:
-                config.logger.exception(f"Error reading/parsing {p}: {e}")
-        return subjects
+            return
+        paths = sorted(p for p in html_dir.glob(PAGE_PATTERN) if is_page_name(p.name))
+        if shard is not None:
+            paths = [p for p in paths if shard.owns(p.name)]
+            config.logger.info(f"Shard {shard}: {len(paths)} files to read.")
+
+        if manifest is not None or snapshot is not None:
+            # Read each file once in the parent: the same bytes are hashed, stored and extracted.
+            local_pages = _read_local_pages(paths)
+            yield from self._iter_page_items(local_pages, f"{html_dir}/", str(html_dir), workers, manifest, snapshot)
+            return
+        for subject, error in self._extract_paths(paths, workers):
+            if error is not None:
+                self.errors.append(error)
+                yield error
+            elif subject:
+                yield subject
+
+    def _iter_snapshot_items(
+        self, source: SnapshotSource, workers: int | None, shard: Shard | None = None
+    ) -> Generator[HarvestItem, None, None]:
+        if workers is None:
+            workers = getattr(self.settings, "workers", 1)
+        store = SnapshotStore(source.root)
+        runs = store.runs()
+        run_id = source.run_id or (runs[-1] if runs else None)
+        if run_id is None:
+            config.logger.error(f"No snapshot runs found in {source.root}")
+            return
+        config.logger.info(f"Re-extracting snapshot run {run_id} from {source.root}.")
+        if shard is None:
+            pages = store.iter_run(run_id)
+        else:
+            # Select by URL first so that pages of other shards are never decompressed.
+            pages = ((url, store.get(digest)) for url, digest in store.run_entries(run_id) if shard.owns(url))
+        # A run with English pages (--targets ...:ja,en) is joined like the live run that stored it.
+        joined_years = {
+            m.group("year")
+            for url, _ in store.run_entries(run_id)
+            if _is_translation_page(url) and (m := config.DETAIL_PAGE_RE.match(url.rsplit("/", 1)[-1]))
+        }
+        label = f"snapshot {run_id}"
+        if not joined_years:
+            yield from self._iter_page_items(pages, "", label, workers, None)
+            return
+        results = self._iter_page_results(pages, "", label, workers, None, translate=True)
+        yield from self._join_translations(results, joined_years)
+
+    def _iter_page_items(
+        self,
+        pages: Iterator[tuple[str, bytes | HarvestError]],
+        prefix: str,
+        label: str,
+        workers: int,
+        manifest: Manifest | None,
+        snapshot: SnapshotRun | None = None,
+    ) -> Generator[HarvestItem, None, None]:
+        """(名前, 内容) のページ列 (アーカイブのメンバー、スナップショット、マニフェストやスナップショットを
+        使うときのローカルファイル) を1回の順次読み込みで抽出し、読んだ順に yield する。
+
+        読み込みは親プロセスで行い、workers > 1 なら内容をワーカープロセスへ渡して抽出する。
+        順序を保つため、先頭のページの結果が出るまで後続の結果は待たせる (同時に抽出中にする
+        のは workers * 4 件まで)。manifest のキーはページの名前、HarvestError の source は prefix + 名前。
+        """
+        for _, item in self._iter_page_results(pages, prefix, label, workers, manifest, snapshot):
+            yield item  # type: ignore[misc]
+
+    def _iter_page_results(
+        self,
+        pages: Iterator[tuple[str, bytes | HarvestError]],
+        prefix: str,
+        label: str,
+        workers: int,
+        manifest: Manifest | None,
+        snapshot: SnapshotRun | None = None,
+        translate: bool = False,
+    ) -> Generator[tuple[str, Subject | dict[str, str] | HarvestError], None, None]:
+        """_iter_page_items の本体。結果をページの名前と組にして yield する。
+
+        translate なら英語版の詳細ページは表の内容の dict になる (_join_translations で突き合わせる)。
+        """
+        parser = self.settings.html_parser
+        _init_worker(FIELD_PLAN, parser)
+        pool = None
+        if workers > 1:
+            config.logger.info(f"Extracting {label} with {workers} worker processes.")
+            pool = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_pool_worker, initargs=_pool_initargs(parser)
+            )
+        max_in_flight = max(1, workers * 4)
+        # (member name, content hash, result or pending future) in member order
+        window: deque[tuple[str, str | None, Any]] = deque()
+        reused = 0
+
+        def settle(
+            name: str, digest: str | None, result: Any
+        ) -> Iterator[tuple[str, Subject | dict[str, str] | HarvestError]]:
+            if isinstance(result, Future):
+                subject, error, worker_metrics = result.result()
+                METRICS.merge(worker_metrics)
+            else:
+                subject, error = result
+            if manifest is not None and digest is not None and error is None:
+                manifest.record(name, digest, subject)
+            if error is not None:
+                self.errors.append(error)
+                yield name, error
+            elif subject:
+                yield name, subject
+
+        try:
+            while True:
+                with METRICS.time("read_file"):
+                    page = next(pages, None)
+                if page is None:
+                    break
+                name, data = page
+                if isinstance(data, HarvestError):
+                    # A page that could not be read (local files) stays in order as its error.
+                    window.append((name, None, (None, data)))
+                    continue
+                METRICS.inc("pages_read")
+                source = f"{prefix}{name}"
+                if snapshot is not None:
+                    snapshot.add(name, data)
+                digest = content_hash(data) if manifest is not None else None
+                if manifest is not None and digest is not None and manifest.is_unchanged(name, digest):
+                    METRICS.inc("pages_reused")
+                    reused += 1
+                    window.append((name, None, (manifest.reuse(name), None)))
+                elif pool is not None:
+                    window.append((name, digest, pool.submit(_extract_member_in_worker, source, data, translate)))
+                else:
+                    window.append((name, digest, _extract_member(source, data, translate)))
+                while window and (
+                    len(window) > max_in_flight or not isinstance(window[0][2], Future) or window[0][2].done()
+                ):
+                    yield from settle(*window.popleft())
+            while window:
+                yield from settle(*window.popleft())
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        if manifest is not None:
+            config.logger.info(f"Manifest: {reused} unchanged pages reused from {label}.")
+
+    def _extract_paths(self, paths: list[Path], workers: int) -> Iterator[tuple[Subject | None, HarvestError | None]]:
+        parser = self.settings.html_parser
+        if workers > 1 and len(paths) > 1:
+            config.logger.info(f"Extracting {len(paths)} files with {workers} worker processes.")
+            # Keep several tasks per worker in flight while amortizing IPC overhead.
+            chunksize = max(1, len(paths) // (workers * 4))
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_pool_worker, initargs=_pool_initargs(parser)
+            ) as pool:
+                # map() yields results in submission order, so output follows the sorted file order.
+                for subject, error, worker_metrics in pool.map(_extract_file_in_worker, paths, chunksize=chunksize):
+                    METRICS.merge(worker_metrics)
+                    yield subject, error
+            return
+        _init_worker(FIELD_PLAN, parser)
+        for p in paths:
+            yield _extract_file(p)
 
     def harvest_from_web(self, target_codes: list[str] | None = None) -> list[Subject]:
-        # Placeholder: Implement web scraping for the live site. For now return empty.
-        config.logger.info("harvest_from_web is not implemented; returning empty results.")
-        return []
-
-    def save_results(self, subjects: list[Subject], output_file: Path) -> None:
-        # Write JSON and CSV files
-        # model_dump returns serialized dictionaries for Pydantic v2 models
-        # Ensure final JSON preserves historical data formats: cast credits to integer
-        # when they represent whole numbers, to maintain compatibility with existing
-        # downstream consumers that expect integers.
-        serialized = []
-        for s in subjects:
-            d = s.model_dump()
-            if "credits" in d and d.get("credits") is not None:
+        """ライブサイトから詳細ページを取得して抽出する。
+
+        target_codes が None の場合は index.html から全ての詳細ページをたどる。各要素は
+        詳細ページ名 (例: ``2025_AA_10000100``)・完全な URL・講義コード (例: ``10000100``)
+        のいずれか。講義コードは一覧ページをたどって該当する詳細ページを探す。
+        結果は詳細ページが見つかった順序で返す。
+        """
+        self.errors = []
+        results = list(self._iter_web(target_codes))
+        # Pages complete out of order; restore the order in which they were discovered.
+        results.sort(key=lambda r: r.seq)
+        self.errors = [r.error for r in results if r.error is not None]
+        return [r.subject for r in results if r.subject]
+
+    def _iter_web_items(
+        self,
+        target_codes: list[str] | None,
+        state: CrawlState | None = None,
+        snapshot: SnapshotRun | None = None,
+        shard: Shard | None = None,
+    ) -> Generator[HarvestItem, None, None]:
+        if state is not None:
+            # Records emitted before the interruption; their pages will not be fetched again.
+            yield from state.records()
+        for result in self._iter_web(target_codes, state, snapshot, shard):
+            if result.error is not None:
+                self.errors.append(result.error)
+                yield result.error
+            elif result.subject:
+                yield result.subject
+
+    def _detail_url(self, target: str) -> str:
+        if target.startswith(("http://", "https://")):
+            return target
+        page = target if target.endswith(".html") else f"{target}.html"
+        return urljoin(self.settings.base_url, page)
+
+    def _iter_web(
+        self,
+        target_codes: list[str] | None,
+        state: CrawlState | None = None,
+        snapshot: SnapshotRun | None = None,
+        shard: Shard | None = None,
+    ) -> Iterator["CrawlResult"]:
+        """クローラーを別スレッドのイベントループで動かし、CrawlResult を終わった順に yield する。
+
+        スレッド間のキューは上限付きで、呼び出し側の消費が遅いとクローラーのイベントループが
+        そこで待つ (取得も止まる) ので、メモリ使用量は呼び出し側の速度に関わらず一定に保たれる。
+        途中で yield を打ち切ると、クローラーを止めてスレッドの終了を待つ。
+        """
+        detail_urls: list[str] = []
+        lecture_codes: list[str] = []
+        for target in target_codes or []:
+            if target.startswith(("http://", "https://")) or "_" in target or target.endswith(".html"):
+                detail_urls.append(self._detail_url(target))
+            else:
+                lecture_codes.append(target)
+        discover = target_codes is None or bool(lecture_codes)
+        yield from self._bridge(
+            lambda: self._crawl_web(detail_urls, discover, lecture_codes or None, state, snapshot, shard)
+        )
+
+    def _bridge(self, make_stream: Callable[[], AsyncIterator["CrawlResult"]]) -> Iterator["CrawlResult"]:
+        """make_stream() の非同期イテレーターを別スレッドのイベントループで動かし、結果を yield する。
+
+        スレッド間のキューは上限付きで、呼び出し側の消費が遅いとイベントループがそこで待つ。
+        途中で yield を打ち切ると、ストリームを閉じてスレッドの終了を待つ。
+        """
+        done = object()
+        results: queue.Queue[Any] = queue.Queue(maxsize=self.settings.max_concurrency * 2)
+        stop = threading.Event()
+
+        def put(item: Any) -> bool:
+            while not stop.is_set():
                 try:
-                    v = d["credits"]
-                    # For backward compatibility with historical JSON, keep credits
-                    # as string formatted with one decimal place ("2.0", "3.5", etc.).
-                    try:
-                        fv = float(v)
-                        # If fractional (not integer), keep float; otherwise cast to int
-                        if abs(fv - round(fv)) > 1e-8:
-                            # Fractional credits; store as float (consistent typed JSON)
-                            d["credits"] = float(fv)
-                        else:
-                            # Whole number: store as int to match strict-typed JSON
-                            d["credits"] = int(round(fv))
-                    except Exception:
-                        # If it's not a number, leave original value as-is
-                        d["credits"] = v
-                except Exception:
-                    # If anything unexpected happens, leave it as-is
-                    pass
-            # Remove keys that are None only (keep empty strings; required fields
-            # must exist as empty strings if no value was present).
-            cleaned = {k: v for k, v in d.items() if v is not None}
-            serialized.append(cleaned)
-        df = pd.DataFrame(serialized)
-        # At this point, models enforce integer credits; serialized values should be int for credits
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        df.to_json(output_file, orient="records", force_ascii=False, indent=2)
-        csv_path = output_file.with_suffix(".csv")
-        # Use to_csv for CSV; all fields are strings or ints now
-        df2 = df.copy()
-        df2.to_csv(csv_path, index=False)
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        async def crawl() -> None:
+            crawl_results = make_stream()
+            async with aclosing(crawl_results):  # type: ignore[type-var]
+                async for result in crawl_results:
+                    # Blocks the event loop while the queue is full: this is the backpressure.
+                    if not put(result):
+                        break
+
+        def run() -> None:
+            try:
+                asyncio.run(crawl())
+            except BaseException as e:
+                put(e)
+            finally:
+                put(done)
+
+        thread = threading.Thread(target=run, name="crawler", daemon=True)
+        thread.start()
+        try:
+            while (item := results.get()) is not done:
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            thread.join()
+
+    def _open_fetcher(self, snapshot: SnapshotRun | None = None) -> "AsyncFetcher":
+        # The HTTP stack (requests, sqlite cache) is only needed for live modes.
+        from fetcher import AsyncFetcher
+        from http_cache import HttpCache
+
+        cache = None
+        if self.settings.http_cache_dir is not None:
+            cache = HttpCache(self.settings.http_cache_dir, self.settings.http_cache_max_bytes)
+        return AsyncFetcher(
+            self.settings.max_concurrency, self.settings.request_timeout, cache=cache, snapshot=snapshot
+        )
+
+    async def _crawl_web(
+        self,
+        detail_urls: list[str],
+        discover: bool,
+        lecture_codes: list[str] | None,
+        state: CrawlState | None,
+        snapshot: SnapshotRun | None = None,
+        shard: Shard | None = None,
+    ) -> AsyncIterator["CrawlResult"]:
+        from crawler import Crawler
+
+        async with self._open_fetcher(snapshot) as fetcher:
+            crawler = Crawler(
+                fetcher, self.settings.base_url, FIELD_PLAN, self.settings.html_parser, state, shard=shard
+            )
+            first = True
+            async for result in crawler.crawl(detail_urls, discover=discover, lecture_codes=lecture_codes):
+                if first and result.subject:
+                    config.logger.info(f"First subject harvested from {result.url}.")
+                    first = False
+                yield result
+
+    def _target_base_url(self, target: HarvestTarget) -> str:
+        """対象の言語のサイトの base URL (``{year}`` を含めば対象の年度で埋める)"""
+        root = self.settings.base_url_en if target.lang == "en" else self.settings.base_url
+        return root.format(year=target.year) if "{year}" in root else root
+
+    async def _crawl_targets(
+        self, targets: Sequence[HarvestTarget], snapshot: SnapshotRun | None = None, shard: Shard | None = None
+    ) -> AsyncIterator["CrawlResult"]:
+        from crawler import Crawler, merge_crawls
+
+        # One crawler per site; a site without a {year} placeholder serves all years and is walked once.
+        sites: dict[tuple[str, str], set[str]] = {}
+        for target in targets:
+            sites.setdefault((self._target_base_url(target), target.lang), set()).add(str(target.year))
+        async with self._open_fetcher(snapshot) as fetcher:
+            crawlers = [
+                Crawler(fetcher, base_url, FIELD_PLAN, self.settings.html_parser, years=years, lang=lang, shard=shard)
+                for (base_url, lang), years in sites.items()
+            ]
+            for (base_url, lang), years in sites.items():
+                config.logger.info(f"Crawling {base_url} ({lang}) for {', '.join(sorted(years))}.")
+            async for result in merge_crawls([crawler.crawl() for crawler in crawlers]):
+                yield result
+
+    def _iter_target_items(
+        self, targets: Sequence[HarvestTarget], snapshot: SnapshotRun | None = None, shard: Shard | None = None
+    ) -> Generator[HarvestItem, None, None]:
+        """全ての対象を1回のクロールでたどり、英語版のページを日本語版のレコードに突き合わせる。
+
+        突き合わせのキーは URL のページ名の (年度, 講義コード)。片方だけ届いたページは相手が届く
+        まで持っておき、揃った時点で yield する (英語版を取得しない年度のレコードはすぐに yield)。
+        最後まで相手の見つからなかった日本語版はそのまま yield し、英語版は件数を警告する。
+        """
+        joined_years = {str(t.year) for t in targets if t.lang == "en"}
+
+        def results() -> Iterator[tuple[str, Subject | dict[str, str] | HarvestError]]:
+            for result in self._bridge(lambda: self._crawl_targets(targets, snapshot, shard)):
+                if result.error is not None:
+                    self.errors.append(result.error)
+                    yield result.url, result.error
+                elif result.translation is not None:
+                    yield result.url, result.translation
+                elif result.subject:
+                    yield result.url, result.subject
+
+        yield from self._join_translations(results(), joined_years)
+
+    def _join_translations(
+        self,
+        results: Iterable[tuple[str, Subject | dict[str, str] | HarvestError]],
+        joined_years: Collection[str],
+    ) -> Generator[HarvestItem, None, None]:
+        """(URL またはページ名, 結果) の列の英語版ページ (dict) を、同じ年度・講義コードの日本語版の
+        レコードの english に付けて yield する。
+
+        joined_years 以外の年度のレコードはすぐに yield する。HarvestError はそのまま流す
+        (self.errors への記録は results の側で行う)。
+        """
+        waiting_ja: dict[tuple[str, str], Subject] = {}
+        waiting_en: dict[tuple[str, str], dict[str, str]] = {}
+        joined = 0
+        for url, item in results:
+            if isinstance(item, HarvestError):
+                yield item
+                continue
+            m = config.DETAIL_PAGE_RE.match(url.rsplit("/", 1)[-1])
+            key = (m.group("year"), m.group("code")) if m else None
+            if isinstance(item, dict):
+                if key is None:
+                    continue
+                subject = waiting_ja.pop(key, None)
+                if subject is None:
+                    waiting_en[key] = item
+                else:
+                    joined += 1
+                    yield subject.model_copy(update={"english": item})
+            elif key is None or key[0] not in joined_years:
+                yield item
+            elif key in waiting_en:
+                joined += 1
+                yield item.model_copy(update={"english": waiting_en.pop(key)})
+            else:
+                waiting_ja[key] = item
+        # Subjects without an English page (not every course has one).
+        yield from waiting_ja.values()
+        if joined_years:
+            config.logger.info(f"Joined {joined} English pages; {len(waiting_ja)} subjects have no English page.")
+        if waiting_en:
+            unmatched = ", ".join(f"{year}_{code}" for year, code in sorted(waiting_en))
+            config.logger.warning(f"{len(waiting_en)} English pages have no Japanese counterpart: {unmatched}")
+
+    def save_results(
+        self,
+        subjects: Iterable[Subject | HarvestError],
+        output_file: Path,
+        formats: Sequence[OutputFormat] = (OutputFormat.JSON,),
+        timetable: bool = False,
+        create_empty: bool = False,
+    ) -> int:
+        """subjects を指定された形式で書き出し、書き出した件数を返す。
+
+        どの形式もレコードを受け取るたびに (PARQUET は行グループ単位で) 追記するので、subjects に
+        harvest_iter / iter_local を渡せば抽出と書き出しが並行し、メモリ使用量も一定になる。
+        HarvestError は書き出さずに読み飛ばす (harvest_iter が self.errors に記録している)。
+        timetable なら時間割の索引 (``<output>.timetable.json``) も書き出す。create_empty なら
+        1件も無くても空の出力を作る (--shard の担当ページが無い場合に merge が欠けと区別できるように)。
+        途中で例外 (中断を含む) が起きれば書きかけの出力を捨て、前回の出力はそのまま残す。
+        """
+        count = 0
+        with streaming_writers(output_file, formats, timetable, create_empty) as writers:
+            for subject in subjects:
+                if not isinstance(subject, Subject):
+                    continue
+                with METRICS.time("write_records"):
+                    for writer in writers:
+                        writer.write(subject)
+                count += 1
+        METRICS.inc("records_written", count)
+        return count
@@ -0,0 +1,124 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import config
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    body: bytes
+    etag: str | None
+    last_modified: str | None
+
+    def conditional_headers(self) -> dict[str, str]:
+        """条件付き GET 用のリクエストヘッダー (If-None-Match / If-Modified-Since)"""
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """URL をキーにした永続 HTTP レスポンスキャッシュ。
+
+    本文は ``bodies/`` 以下に URL のハッシュ名で保存し、ETag / Last-Modified と最終アクセス
+    時刻は SQLite のインデックスに持つ。合計サイズが ``max_bytes`` を超えると、最終アクセスが
+    古いものから削除する (LRU)。フェッチャーのスレッドから呼ばれるため、操作はロックで直列化する。
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 1024**3):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._bodies = self.cache_dir / "bodies"
+        self._bodies.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.cache_dir / "index.sqlite", check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, url TEXT NOT NULL, etag TEXT, last_modified TEXT,"
+            " size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._db.commit()
+        self._total_bytes: int = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _body_path(self, key: str) -> Path:
+        return self._bodies / key[:2] / key
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def get(self, url: str) -> CacheEntry | None:
+        key = self._key(url)
+        with self._lock:
+            row = self._db.execute("SELECT etag, last_modified FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            try:
+                body = self._body_path(key).read_bytes()
+            except OSError:
+                # Index and body out of sync (e.g. body removed by hand); forget the entry.
+                self._delete(key)
+                self._db.commit()
+                return None
+        return CacheEntry(url, body, row[0], row[1])
+
+    def touch(self, url: str) -> None:
+        """304 で再検証できたエントリの最終アクセス時刻を更新する"""
+        with self._lock:
+            self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), self._key(url)))
+            self._db.commit()
+
+    def put(self, url: str, body: bytes, etag: str | None, last_modified: str | None) -> None:
+        if not etag and not last_modified:
+            # Without a validator the entry could never be revalidated.
+            return
+        key = self._key(url)
+        path = self._body_path(key)
+        with self._lock:
+            self._delete(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(body)
+            self._db.execute(
+                "INSERT INTO entries (key, url, etag, last_modified, size, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, etag, last_modified, len(body), time.time()),
+            )
+            self._total_bytes += len(body)
+            self._evict()
+            self._db.commit()
+
+    def _delete(self, key: str) -> None:
+        row = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return
+        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._body_path(key).unlink(missing_ok=True)
+        self._total_bytes -= row[0]
+
+    def _evict(self) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key FROM entries ORDER BY last_access ASC").fetchall()
+        evicted = 0
+        for (key,) in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._delete(key)
+            evicted += 1
+        config.logger.debug(f"HTTP cache evicted {evicted} entries ({self._total_bytes} bytes kept).")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,86 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any
+
+import config
+from models import Subject
+
+
+def extractor_version(parser: str | None = None) -> str:
+    """抽出器とモデルのバージョン文字列。
+
+    ``config.EXTRACTOR_VERSION`` に Subject の JSON スキーマのハッシュとパーサー名を加えたもので、
+    抽出ロジック・モデル定義・パーサーのいずれかが変わるとマニフェスト全体が無効になる。
+    """
+    schema = json.dumps(Subject.model_json_schema(), sort_keys=True, ensure_ascii=False)
+    schema_hash = hashlib.sha256(schema.encode("utf-8")).hexdigest()[:12]
+    return f"{config.EXTRACTOR_VERSION}+{schema_hash}+{parser or config.DEFAULT_HTML_PARSER}"
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class Manifest:
+    """入力ファイル毎の内容ハッシュと抽出結果を記録するマニフェスト。
+
+    出力ファイルの隣 (``<output>.manifest.json``) に保存し、次回の実行では内容ハッシュが
+    一致するファイルのパースを省略して、記録済みの Subject を再利用する。詳細テーブルの
+    無いページ (index など) も「結果なし」として記録する。抽出に失敗したファイルは記録しない
+    ので、次回また抽出される。
+    """
+
+    def __init__(self, path: Path, version: str | None = None):
+        self.path = path
+        self.version = version if version is not None else extractor_version()
+        self._previous: dict[str, dict[str, Any]] = {}
+        self._current: dict[str, dict[str, Any]] = {}
+
+    @staticmethod
+    def path_for(output_file: Path) -> Path:
+        return output_file.with_suffix(".manifest.json")
+
+    @classmethod
+    def load(cls, path: Path, version: str | None = None) -> "Manifest":
+        manifest = cls(path, version)
+        if not path.is_file():
+            return manifest
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            config.logger.warning(f"Ignoring unreadable manifest {path}: {e}")
+            return manifest
+        if data.get("version") != manifest.version:
+            config.logger.info(
+                f"Manifest version changed ({data.get('version')} -> {manifest.version}); re-extracting all files."
+            )
+            return manifest
+        manifest._previous = data.get("files", {})
+        return manifest
+
+    def is_unchanged(self, name: str, digest: str) -> bool:
+        entry = self._previous.get(name)
+        return entry is not None and entry.get("sha256") == digest
+
+    def reuse(self, name: str) -> Subject | None:
+        """前回の結果を今回のマニフェストに引き継ぎ、記録済みの Subject を返す (is_unchanged の確認後に呼ぶ)"""
+        entry = self._previous[name]
+        self._current[name] = entry
+        record = entry.get("record")
+        # The validators are idempotent on dumped records, and model_validate beats model_construct on speed.
+        return Subject.model_validate(record) if record is not None else None
+
+    def record(self, name: str, digest: str, subject: Subject | None) -> None:
+        self._current[name] = {
+            "sha256": digest,
+            "record": subject.model_dump(mode="json") if subject is not None else None,
+        }
+
+    def save(self) -> None:
+        # Entries for files that no longer exist are dropped: only this run's files are written.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        payload = {"version": self.version, "files": dict(sorted(self._current.items()))}
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(self.path)
@@ -0,0 +1,239 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+# ステージ所要時間のヒストグラムのバケット上限 (秒)。Prometheus の histogram と同じく累積で出力する
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Prometheus のメトリクス名の接頭辞
+METRIC_PREFIX = "momiji"
+
+# カウンター名と説明
+COUNTERS = {
+    "pages_read": "Input files read from disk.",
+    "pages_parsed": "Pages extracted to a Subject.",
+    "pages_skipped": "Pages skipped because they have no detail table (or no data in it).",
+    "pages_reused": "Unchanged pages whose result was reused from the manifest.",
+    "header_mismatches": "Pages rejected because their headers do not match CANONICAL_HEADERS.",
+    "validation_failures": "Pages whose extracted data failed Subject validation.",
+    "extraction_errors": "Pages that failed to read or extract for any reason.",
+    "records_written": "Records passed to save_results.",
+}
+# ドリフトレポートでヘッダー構成毎に残すページ名の数
+LAYOUT_EXAMPLES = 3
+
+
+class Histogram:
+    """固定バケットのヒストグラム。バケット毎の件数 (非累積)・合計・件数を持つ。"""
+
+    def __init__(self, buckets: tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        # First bucket whose upper bound is >= value (len(buckets) is +Inf)
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts, strict=True)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Histogram":
+        hist = cls(tuple(data["buckets"]))
+        hist.counts = list(data["counts"])
+        hist.sum = data["sum"]
+        hist.count = data["count"]
+        return hist
+
+
+class Metrics:
+    """ステージ毎の所要時間ヒストグラム・カウンター・ヘッダー構成 (layout) 毎のページ数の集合。
+
+    ワーカープロセスでは各自の Metrics に記録し、``drain()`` で取り出した差分を親で ``merge()``
+    する (差分は dict なのでプロセス境界を越えられる)。ライブモードではクロールのスレッドと
+    抽出・書き出しのスレッドが同じ Metrics を更新するので、更新と読み出しはロックの中で行う。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self.durations: dict[str, Histogram] = {}
+        self.counters: dict[str, int] = {}
+        # header signature → {"headers", "pages", "examples", "unexpected", "missing"}
+        self.layouts: dict[str, dict[str, Any]] = {}
+
+    def _after_fork(self) -> None:
+        # A thread of the parent may have held the lock when a worker process was forked.
+        self._lock = threading.RLock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            hist = self.durations.get(stage)
+            if hist is None:
+                hist = self.durations[stage] = Histogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """with ブロックの所要時間を stage のヒストグラムに記録する (例外で抜けた場合も記録する)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_layout(
+        self,
+        signature: str,
+        headers: Sequence[str],
+        page: str,
+        unexpected: Sequence[str] = (),
+        missing: Sequence[str] = (),
+    ) -> None:
+        """ページのヘッダー構成 (signature) を記録する。ページ名は最初の LAYOUT_EXAMPLES 件だけ残す。"""
+        self._add_layout(
+            signature,
+            {
+                "headers": list(headers),
+                "pages": 1,
+                "examples": [page],
+                "unexpected": list(unexpected),
+                "missing": list(missing),
+            },
+        )
+
+    def _add_layout(self, signature: str, data: dict[str, Any]) -> None:
+        with self._lock:
+            layout = self.layouts.get(signature)
+            if layout is None:
+                self.layouts[signature] = {**data, "examples": list(data["examples"][:LAYOUT_EXAMPLES])}
+                return
+            layout["pages"] += data["pages"]
+            layout["examples"].extend(data["examples"][: LAYOUT_EXAMPLES - len(layout["examples"])])
+
+    def drift_report(self) -> list[str]:
+        """ヘッダー構成毎に1行のサマリー (ページ数の多い順)。サイトのレイアウト変更は新しい行として現れる。"""
+        lines = []
+        for signature, layout in sorted(self.layouts.items(), key=lambda item: -item[1]["pages"]):
+            if layout["unexpected"]:
+                status = f"MISMATCH, unexpected {layout['unexpected']}"
+            elif layout["missing"]:
+                status = f"missing {layout['missing']}"
+            else:
+                status = "canonical"
+            examples = ", ".join(layout["examples"])
+            lines.append(
+                f"Header layout {signature}: {layout['pages']} pages, "
+                f"{len(layout['headers'])} headers, {status} (e.g. {examples})"
+            )
+        return lines
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "durations": {stage: hist.to_dict() for stage, hist in sorted(self.durations.items())},
+                "header_layouts": {
+                    signature: {**layout, "examples": list(layout["examples"])}
+                    for signature, layout in sorted(self.layouts.items())
+                },
+            }
+
+    def merge(self, data: dict[str, Any]) -> None:
+        """to_dict() / drain() の結果を加算する"""
+        with self._lock:
+            for name, value in data.get("counters", {}).items():
+                self.inc(name, value)
+            for stage, hist_data in data.get("durations", {}).items():
+                hist = Histogram.from_dict(hist_data)
+                if stage in self.durations:
+                    self.durations[stage].merge(hist)
+                else:
+                    self.durations[stage] = hist
+            for signature, layout in data.get("header_layouts", {}).items():
+                self._add_layout(signature, layout)
+
+    def drain(self) -> dict[str, Any]:
+        """現在の値を dict で返し、自身をリセットする"""
+        with self._lock:
+            data = self.to_dict()
+            self.reset()
+        return data
+
+    def reset(self) -> None:
+        with self._lock:
+            self.durations.clear()
+            self.counters.clear()
+            self.layouts.clear()
+
+    def to_prometheus(self) -> str:
+        """Prometheus の text exposition format (node_exporter の textfile collector 用)"""
+        with self._lock:
+            return self._prometheus_text()
+
+    def _prometheus_text(self) -> str:
+        lines: list[str] = []
+        for name in sorted(set(COUNTERS) | set(self.counters)):
+            metric = f"{METRIC_PREFIX}_{name}_total"
+            lines.append(f"# HELP {metric} {COUNTERS.get(name, name)}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {self.counters.get(name, 0)}")
+        metric = f"{METRIC_PREFIX}_stage_duration_seconds"
+        lines.append(f"# HELP {metric} Time spent in each harvest stage.")
+        lines.append(f"# TYPE {metric} histogram")
+        for stage, hist in sorted(self.durations.items()):
+            cumulative = 0
+            for bound, count in zip((*hist.buckets, "+Inf"), hist.counts, strict=True):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {hist.sum:.6f}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {hist.count}')
+        metric = f"{METRIC_PREFIX}_header_layout_pages"
+        lines.append(
+            f"# HELP {metric} Pages per header layout signature; a new signature means the site layout drifted."
+        )
+        lines.append(f"# TYPE {metric} gauge")
+        for signature, layout in sorted(self.layouts.items()):
+            canonical = "false" if layout["unexpected"] or layout["missing"] else "true"
+            lines.append(f'{metric}{{signature="{signature}",canonical="{canonical}"}} {layout["pages"]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, output_file: Path) -> tuple[Path, Path]:
+        """``<output>.metrics.json`` と ``<output>.prom`` に書き出し、そのパスを返す。
+
+        textfile collector が書きかけのファイルを読まないよう、一時ファイルに書いてから置き換える。
+        """
+        json_path = output_file.with_suffix(".metrics.json")
+        prom_path = output_file.with_suffix(".prom")
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        for path, text in (
+            (json_path, json.dumps(self.to_dict(), indent=2)),
+            (prom_path, self.to_prometheus()),
+        ):
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            tmp_path.write_text(text, encoding="utf-8")
+            tmp_path.replace(path)
+        return json_path, prom_path
+
+
+# プロセス全体で共有する Metrics (ワーカープロセスではそのプロセス内のもの)
+METRICS = Metrics()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=METRICS._after_fork)
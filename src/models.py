@@ -1,6 +1,8 @@
 import re
+from collections.abc import Iterable, Mapping
+from typing import Any
 
-from pydantic import AliasChoices, BaseModel, Field, field_validator, model_validator
+from pydantic import AliasChoices, BaseModel, Field, PrivateAttr, TypeAdapter, field_validator, model_validator
 
 
 class Subject(BaseModel):
@@ -95,6 +97,12 @@ class Subject(BaseModel):
     message: str = Field(..., alias="メッセージ")
     other: str = Field(..., alias="その他")
 
+    # 英語版サイトの同じ講義コードのページ (英語の見出し → 値)。日本語版と突き合わせて付ける
+    english: dict[str, str] | None = Field(None, alias="英語版")
+
+    # 抽出時に day_time_room を分解したコマ (timetable.Slot のリスト)。出力には含めない
+    _slots: list[Any] | None = PrivateAttr(default=None)
+
     # Pydantic v2 configuration
     model_config = {
         "populate_by_name": True,
@@ -171,6 +179,40 @@ class Subject(BaseModel):
         return values
 
 
+# 詳細ページの表からではなく、取得後に別のページと突き合わせて埋めるフィールド
+JOINED_FIELDS = frozenset({"english"})
+
+
+# list[Subject] の検証器。スキーマの構築は一度だけ行う
+_SUBJECT_LIST_ADAPTER: TypeAdapter[list[Subject]] = TypeAdapter(list[Subject])
+
+
+def validate_subjects(records: Iterable[Mapping[str, Any]]) -> list[Subject]:
+    """生の dict (alias またはフィールド名がキー) の列をまとめて Subject に検証する。
+
+    1件ずつ ``Subject(**d)`` を呼ぶのと同じ検証 (before-validator を含む) を行うが、
+    pydantic-core の1回の呼び出しで済むため、レコード毎の Python 側のオーバーヘッドが減る。
+    いずれかのレコードが不正なら ValidationError (エラー位置はリストのインデックス付き)。
+    """
+    return _SUBJECT_LIST_ADAPTER.validate_python(list(records))
+
+
+class HarvestError(BaseModel):
+    """1ファイル(1ページ)の抽出失敗を表す構造化エラー。
+
+    ワーカープロセスからもそのまま親プロセスへ返せるよう、例外オブジェクトではなく
+    文字列のみを保持する。
+    """
+
+    source: str
+    error_type: str
+    message: str
+
+    @classmethod
+    def from_exception(cls, source: str, exc: BaseException) -> "HarvestError":
+        return cls(source=source, error_type=type(exc).__name__, message=str(exc))
+
+
 # End of models.py
 
 # from typing import TypedDict
@@ -0,0 +1,60 @@
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from extractors import extract_subject_data
+from models import Subject
+from writers import serialize_subject
+
+
+@dataclass
+class ParityDifference:
+    """2つのパーサーバックエンドで抽出結果が異なった箇所。
+
+    field は Subject のフィールド名。ページ単位の違い (片方だけ None / 例外) は ``<record>``。
+    """
+
+    source: str
+    field: str
+    baseline: object
+    candidate: object
+
+
+def _extract(html: str, source: str, parser: str) -> Subject | None | Exception:
+    try:
+        return extract_subject_data(html, source, parser=parser)
+    except Exception as e:
+        return e
+
+
+def _describe(result: Subject | None | Exception) -> object:
+    if isinstance(result, Exception):
+        return f"{type(result).__name__}: {result}"
+    return None if result is None else "Subject"
+
+
+def compare_parsers(
+    pages: Iterable[tuple[str, str]], baseline: str = "html5lib", candidate: str = "lxml"
+) -> Iterator[ParityDifference]:
+    """(ページ名, HTML) の列を2つのバックエンドで抽出し、出力レコードの違いをフィールド単位で返す。
+
+    比較は serialize_subject 後の値 (= 出力ファイルに書かれる値) で行うため、違いが1つも
+    無ければ出力は同一になる。
+    """
+    for source, html in pages:
+        a = _extract(html, source, baseline)
+        b = _extract(html, source, candidate)
+        if not isinstance(a, Subject) or not isinstance(b, Subject):
+            if _describe(a) != _describe(b) or (isinstance(a, Exception) and str(a) != str(b)):
+                yield ParityDifference(source, "<record>", _describe(a), _describe(b))
+            continue
+        rec_a, rec_b = serialize_subject(a), serialize_subject(b)
+        for field in Subject.model_fields:
+            if rec_a.get(field) != rec_b.get(field):
+                yield ParityDifference(source, field, rec_a.get(field), rec_b.get(field))
+
+
+def iter_html_dir(html_dir: Path) -> Iterator[tuple[str, str]]:
+    """harvest_from_local と同じ順序で (ファイル名, HTML) を返す"""
+    for p in sorted(html_dir.glob("*.html")):
+        yield p.name, p.read_text(encoding="utf-8")
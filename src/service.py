@@ -0,0 +1,297 @@
+import json
+import re
+import threading
+import time
+from array import array
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import config
+from metrics import Histogram
+
+# 検索に使えるフィールド (完全一致。複数指定は AND、1つのフィールドに値のリストを渡すと OR)
+INDEXED_FIELDS = ("lecture_code", "year", "faculty", "instructor_name", "term", "campus", "language")
+DEFAULT_LIMIT = 100
+# 担当教員名は複数の教員が区切られて入っているので、教員ごとに索引に入れる
+_INSTRUCTOR_SPLIT_RE = re.compile(r"\s*[,、，]\s*")
+# クエリの所要時間のヒストグラムのバケット上限 (秒)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+class QueryError(ValueError):
+    """クエリが不正 (索引の無いフィールド、limit が数値でないなど) の場合に送出される例外"""
+
+    pass
+
+
+def _index_values(name: str, value: Any) -> list[str]:
+    if value is None:
+        return []
+    text = str(value).strip()
+    if name == "instructor_name":
+        return [v for v in _INSTRUCTOR_SPLIT_RE.split(text) if v]
+    return [text]
+
+
+class SubjectIndex:
+    """出力ファイルを1回読み込んで作るメモリ上の索引。
+
+    レコードは応答にそのまま埋め込めるよう JSON 文字列で持ち、INDEXED_FIELDS の各値から
+    レコード番号の配列 (array('I')) を引く。検索は配列の積集合で、全件の走査やパースはしない。
+    """
+
+    def __init__(self, records: Iterator[dict[str, Any]] | list[dict[str, Any]], source: Path | None = None):
+        self.source = source
+        self.loaded_at = time.time()
+        self.records: list[str] = []
+        self.postings: dict[str, dict[str, array]] = {name: {} for name in INDEXED_FIELDS}
+        for record in records:
+            i = len(self.records)
+            self.records.append(json.dumps(record, ensure_ascii=False))
+            for name, postings in self.postings.items():
+                for value in _index_values(name, record.get(name)):
+                    postings.setdefault(value, array("I")).append(i)
+
+    @classmethod
+    def load(cls, path: Path) -> "SubjectIndex":
+        """出力 (.json / .jsonl / .sqlite / .parquet) を読み込む。Subject の検証はしない。"""
+        from analyzer import read_records
+
+        return cls(read_records(path), path)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def values(self, name: str) -> list[str]:
+        """フィールドの値の一覧 (ソート済み)"""
+        if name not in self.postings:
+            raise QueryError(f"Unknown field {name!r} (indexed: {', '.join(INDEXED_FIELDS)})")
+        return sorted(self.postings[name])
+
+    def search(self, filters: Mapping[str, str | list[str]]) -> list[int]:
+        """filters に一致するレコード番号 (出力の順)。filters が空なら全件。"""
+        selected: set[int] | None = None
+        # Start from the shortest posting list so the intersection stays small.
+        terms = []
+        for name, wanted in filters.items():
+            if name not in self.postings:
+                raise QueryError(f"Unknown field {name!r} (indexed: {', '.join(INDEXED_FIELDS)})")
+            values = [wanted] if isinstance(wanted, str) else list(wanted)
+            ids = [self.postings[name].get(v.strip(), ()) for v in values]
+            terms.append((sum(len(p) for p in ids), ids))
+        for _, ids in sorted(terms, key=lambda t: t[0]):
+            matched = {i for p in ids for i in p}
+            selected = matched if selected is None else selected & matched
+            if not selected:
+                return []
+        return sorted(selected) if selected is not None else list(range(len(self.records)))
+
+
+@dataclass
+class QueryResult:
+    """検索結果。body は応答の JSON (レコードは読み込み時に作った文字列をそのまま連結する)。"""
+
+    total: int
+    count: int
+    took_ms: float
+    body: bytes
+
+
+def _parse_query(params: Mapping[str, Any]) -> tuple[dict[str, list[str]], int, int]:
+    filters: dict[str, list[str]] = {}
+    limit, offset = DEFAULT_LIMIT, 0
+    for name, value in params.items():
+        if name in ("limit", "offset"):
+            raw = value[-1] if isinstance(value, list) else value
+            try:
+                number = int(raw)
+            except (TypeError, ValueError) as e:
+                raise QueryError(f"{name} must be an integer, not {raw!r}") from e
+            if number < 0:
+                raise QueryError(f"{name} must not be negative")
+            if name == "limit":
+                limit = number
+            else:
+                offset = number
+        elif isinstance(value, list):
+            filters[name] = [str(v) for v in value]
+        else:
+            filters[name] = [str(value)]
+    return filters, limit, offset
+
+
+class SubjectService:
+    """SubjectIndex を保持し、出力ファイルが書き換えられたら読み込み直す。
+
+    出力ファイルの (mtime, サイズ) を reload_interval 秒ごとに確認し、変わった後 1 回分の間隔
+    変化が無ければ (書き込みが終わったとみなして) 新しい索引を作ってから差し替える。読み込みに
+    失敗したら前の索引のまま使い続ける。クエリ毎の所要時間は latency に記録する。
+    """
+
+    def __init__(self, path: Path, reload_interval: float = 1.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.reloads = 0
+        self.latency = Histogram(QUERY_BUCKETS)
+        self._latency_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._signature = self._stat()
+        self._pending: tuple[int, int] | None = None
+        self.index = SubjectIndex.load(path)
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def check_reload(self) -> bool:
+        """1回分の確認。索引を差し替えたら True。"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            self._pending = None
+            return False
+        if signature != self._pending:
+            # Changed since the last check; wait until the writer has finished.
+            self._pending = signature
+            return False
+        self._signature, self._pending = signature, None
+        try:
+            index = SubjectIndex.load(self.path)
+        except Exception as e:
+            config.logger.warning(f"Could not reload {self.path}; keeping the previous index: {e}")
+            return False
+        self.index = index
+        self.reloads += 1
+        config.logger.info(f"Reloaded {len(index)} subjects from {self.path}.")
+        return True
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.reload_interval):
+            self.check_reload()
+
+    def start(self) -> None:
+        """出力ファイルの監視スレッドを開始する"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="subject-reload", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _observe(self, seconds: float) -> None:
+        with self._latency_lock:
+            self.latency.observe(seconds)
+
+    def query(self, params: Mapping[str, Any]) -> QueryResult:
+        """params (フィールド → 値または値のリスト、limit / offset) で検索する。不正なら QueryError。"""
+        start = time.perf_counter()
+        index = self.index  # One snapshot per query, even if a reload swaps it meanwhile.
+        filters, limit, offset = _parse_query(params)
+        ids = index.search(filters)
+        page = ids[offset : offset + limit]
+        results = ",".join(index.records[i] for i in page)
+        took = time.perf_counter() - start
+        self._observe(took)
+        took_ms = round(took * 1000, 3)
+        body = f'{{"total":{len(ids)},"count":{len(page)},"took_ms":{took_ms},"results":[{results}]}}'
+        return QueryResult(len(ids), len(page), took_ms, body.encode("utf-8"))
+
+    def stats(self) -> dict[str, Any]:
+        with self._latency_lock:
+            latency = self.latency.to_dict()
+        index = self.index
+        return {
+            "source": str(self.path),
+            "subjects": len(index),
+            "loaded_at": index.loaded_at,
+            "reloads": self.reloads,
+            "indexed_fields": list(INDEXED_FIELDS),
+            "queries": latency["count"],
+            "mean_query_ms": round(latency["sum"] / latency["count"] * 1000, 3) if latency["count"] else None,
+            "query_latency_seconds": latency,
+        }
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    """``GET /query?faculty=...`` / ``POST /query`` (JSON) / ``GET /subjects/<code>`` / ``GET /stats``"""
+
+    server: "QueryServer"
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: HTTPStatus, body: bytes, took_ms: float | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if took_ms is not None:
+            self.send_header("X-Query-Time-Ms", str(took_ms))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: HTTPStatus, data: Any) -> None:
+        self._send(status, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def _answer(self, params: Mapping[str, Any]) -> None:
+        try:
+            result = self.server.service.query(params)
+        except QueryError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+        config.logger.debug(f"{self.command} {self.path}: {result.total} subjects in {result.took_ms} ms")
+        self._send(HTTPStatus.OK, result.body, result.took_ms)
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/query":
+            self._answer(parse_qs(url.query))
+        elif url.path.startswith("/subjects/"):
+            self._answer({"lecture_code": unquote(url.path.removeprefix("/subjects/"))})
+        elif url.path == "/stats":
+            self._send_json(HTTPStatus.OK, self.server.service.stats())
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {url.path}"})
+
+    def do_POST(self) -> None:
+        if urlsplit(self.path).path != "/query":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {self.path}"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": f"Invalid JSON: {e}"})
+            return
+        if not isinstance(params, dict):
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": "The query must be a JSON object"})
+            return
+        self._answer(params)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        config.logger.debug(f"{self.address_string()} {format % args}")
+
+
+class QueryServer(ThreadingHTTPServer):
+    """SubjectService を HTTP で公開するサーバー (リクエスト毎にスレッド)"""
+
+    daemon_threads = True
+
+    def __init__(self, service: SubjectService, host: str = "127.0.0.1", port: int = 8080):
+        super().__init__((host, port), _QueryHandler)
+        self.service = service
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode()
+        return f"http://{host}:{port}/"
@@ -15,6 +15,21 @@ class Settings:
         self.local_html_dir_full: Path = Path(config.LOCAL_HTML_DIR_FULL)
         self.local_html_dir_small: Path = Path(config.LOCAL_HTML_DIR_SMALL)
         self.live_small_codes: list[str] | None = None
+        # Number of worker processes used for local extraction (1 = in-process, no pool).
+        self.workers: int = 1
+        # BeautifulSoup parser backend used for detail pages (see config.HTML_PARSERS).
+        self.html_parser: str = config.DEFAULT_HTML_PARSER
+        # Live harvesting: base URLs of the syllabus site (Japanese / English) and HTTP client limits.
+        # A "{year}" placeholder in a base URL is filled in per harvest target year.
+        self.base_url: str = config.BASE_URL
+        self.base_url_en: str = config.BASE_URL_EN
+        self.max_concurrency: int = 8
+        self.request_timeout: float = 30.0
+        # On-disk HTTP cache for live modes (None disables it) and its size bound.
+        self.http_cache_dir: Path | None = Path(config.OUTPUT_DIR) / "http_cache"
+        self.http_cache_max_bytes: int = 1024**3
+        # Content-addressed store of the raw HTML of every page read or fetched (None disables it).
+        self.snapshot_dir: Path | None = None
         # (No additional settings for fractional credits; model validation enforces integer credits.)
 
 
@@ -0,0 +1,146 @@
+import hashlib
+import re
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import config
+from config import OutputFormat
+
+# シャードの出力ファイル名に付けるタグ (例: syllabus_data.shard-2-of-4.json)
+_SHARD_TAG_RE = re.compile(r"\.shard-(?P<index>\d+)-of-(?P<count>\d+)$")
+
+
+class ShardError(ValueError):
+    """シャードの指定が不正、またはシャード出力の欠けや重複を検出した場合に送出される例外"""
+
+    pass
+
+
+def shard_key(page: str) -> str:
+    """ページ (ファイル名・アーカイブのメンバー名・URL) をシャードに割り当てるキー。
+
+    詳細ページは講義コード、それ以外はページ名そのもの。ローカルのファイルとライブの URL で
+    同じ講義が同じシャードに入り、出力のレコードの lecture_code からも検証できる。
+    """
+    name = page.rsplit("/", 1)[-1]
+    m = config.DETAIL_PAGE_RE.match(name)
+    return m.group("code") if m else name
+
+
+def shard_of(key: str, count: int) -> int:
+    """key の属するシャード番号 (1 始まり)。プロセスやマシンによらず同じ値になる安定なハッシュを使う。"""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count + 1
+
+
+@dataclass(frozen=True)
+class Shard:
+    """N 個に分けた入力のうち index 番目 (1 始まり) を表す。"""
+
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, spec: str) -> "Shard":
+        """``i/N`` (例: ``2/4``) を Shard にする。不正な指定は ShardError。"""
+        index, sep, count = spec.partition("/")
+        if not sep or not index.strip().isdigit() or not count.strip().isdigit():
+            raise ShardError(f"Invalid shard {spec!r} (expected i/N, e.g. 2/4)")
+        shard = cls(int(index), int(count))
+        if not 1 <= shard.index <= shard.count:
+            raise ShardError(f"Invalid shard {spec!r} (i must be between 1 and N)")
+        return shard
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def owns(self, page: str) -> bool:
+        """ページがこのシャードの担当かどうか"""
+        return shard_of(shard_key(page), self.count) == self.index
+
+    def output_path(self, output_file: Path) -> Path:
+        """シャード毎の出力先 (例: ``syllabus_data.json`` → ``syllabus_data.shard-2-of-4.json``)"""
+        return output_file.with_name(f"{output_file.stem}.shard-{self.index}-of-{self.count}{output_file.suffix}")
+
+    @classmethod
+    def from_output(cls, path: Path) -> "Shard | None":
+        """output_path で付けたタグからシャードを読み取る (タグが無ければ None)"""
+        m = _SHARD_TAG_RE.search(path.stem)
+        return cls(int(m.group("index")), int(m.group("count"))) if m else None
+
+
+@dataclass
+class MergeSummary:
+    """merge_shards の結果。missing は欠けていたシャードの番号 (allow_missing のときのみ空でない)。"""
+
+    records: int = 0
+    shards: list[Shard] = field(default_factory=list)
+    missing: list[int] = field(default_factory=list)
+
+
+def _check_shards(inputs: Sequence[Path], allow_missing: bool) -> tuple[list[Shard], list[int]]:
+    shards: list[Shard] = []
+    for path in inputs:
+        shard = Shard.from_output(path)
+        if shard is None:
+            raise ShardError(f"{path} is not a shard output (expected a name like <output>.shard-1-of-4.json)")
+        shards.append(shard)
+    counts = sorted({s.count for s in shards})
+    if len(counts) > 1:
+        raise ShardError(f"Shard outputs come from different splits (N = {', '.join(map(str, counts))})")
+    seen: dict[int, Path] = {}
+    for path, shard in zip(inputs, shards, strict=True):
+        if shard.index in seen:
+            raise ShardError(f"Overlapping shards: {seen[shard.index]} and {path} are both shard {shard}")
+        seen[shard.index] = path
+    missing = [i for i in range(1, counts[0] + 1) if i not in seen] if counts else []
+    if missing and not allow_missing:
+        raise ShardError(f"Missing shards: {', '.join(f'{i}/{counts[0]}' for i in missing)}")
+    return shards, missing
+
+
+def merge_shards(
+    inputs: Sequence[Path],
+    output_file: Path,
+    formats: Iterable[OutputFormat] = (OutputFormat.JSON,),
+    allow_missing: bool = False,
+    timetable: bool = False,
+) -> MergeSummary:
+    """シャード出力 (.json / .jsonl / .sqlite / .parquet) を1つの正規の出力にまとめる。
+
+    シャードの欠け (allow_missing なら警告のみ)・同じシャードの重複・分割数の不一致と、
+    同じ (講義コード, 年度) のレコードが複数のシャードにある場合 (別の分割や入力で作った
+    シャードの混在) は ShardError。担当ページの無いシャードは空の出力で欠けとは区別する。レコードは検証し直してから
+    (講義コード, 年度) の順に並べ、CSV の列は CANONICAL_HEADERS の順で書き出す。
+    並べ替えのため全レコードをメモリに持つ。timetable なら時間割の索引も書き出す。
+    """
+    # Imported here: the analyzer / writers pull in pydantic models.
+    from analyzer import read_records
+    from models import Subject
+    from writers import streaming_writers
+
+    if not inputs:
+        raise ShardError("No shard outputs to merge")
+    shards, missing = _check_shards(inputs, allow_missing)
+    owner: dict[tuple[str, str], Path] = {}
+    subjects: list[Subject] = []
+    for path in inputs:
+        for record in read_records(path):
+            subject = Subject.model_validate(record)
+            key = (subject.lecture_code, subject.year)
+            # Pages are assigned by page name (the lecture code only for detail-page names), which a record
+            # does not carry, so ownership cannot be re-checked here; a record in two shards is an error.
+            if key in owner:
+                raise ShardError(f"Lecture code {subject.lecture_code} ({subject.year}) is in {owner[key]} and {path}")
+            owner[key] = path
+            subjects.append(subject)
+    subjects.sort(key=lambda s: (s.lecture_code, s.year))
+
+    with streaming_writers(output_file, formats, timetable) as writers:
+        for subject in subjects:
+            for writer in writers:
+                writer.write(subject)
+    if missing:
+        config.logger.warning(f"Merged without shards {', '.join(map(str, missing))} of {shards[0].count}.")
+    return MergeSummary(len(subjects), sorted(shards, key=lambda s: s.index), missing)
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import IO
+
+import config
+
+# zlib のプリセット辞書として使える最大長 (LZ77 の窓の大きさ)
+MAX_DICT_SIZE = 32 * 1024
+# 辞書を使わずに圧縮したオブジェクトのヘッダー
+_NO_DICT = b"0" * 16
+
+
+def train_dictionary(samples: Iterable[bytes], size: int = MAX_DICT_SIZE) -> bytes:
+    """ページのサンプルから zlib のプリセット辞書を作る。
+
+    半数以上のサンプルに現れる行 (シラバスのテンプレート部分) を集め、出現数の少ない順に並べる。
+    zlib は辞書の末尾に近いほど短い距離で参照できるので、最もよく現れる行を末尾に置き、
+    size を超える分は先頭から捨てる。
+    """
+    samples = list(samples)
+    counts: Counter[bytes] = Counter()
+    for sample in samples:
+        counts.update({line for line in sample.splitlines(keepends=True) if line.strip()})
+    threshold = max(2, (len(samples) + 1) // 2)
+    common = [line for line, n in sorted(counts.items(), key=lambda item: (item[1], item[0])) if n >= threshold]
+    return b"".join(common)[-size:]
+
+
+class SnapshotStore:
+    """取得・読み込みした生 HTML を内容ハッシュで重複なく保存するスナップショットストア。
+
+    構成 (root 以下):
+
+    - ``objects/<sha256 の先頭2文字>/<sha256>``: zlib で圧縮したページ本文。先頭16バイトは圧縮に使った
+      辞書の ID (辞書なしなら ``0`` の並び)。同じ内容のページは実行や年度をまたいで1つだけ保存される。
+    - ``dicts/<id>``: 最初の ``train_after`` ページから作ったプリセット辞書 (train_dictionary)。
+      辞書ができるまでのページは辞書なしで圧縮する。
+    - ``runs/<run_id>.jsonl``: 実行毎の索引。1行目が実行の情報、以降は ``{"url", "sha256"}`` を保存した順に。
+
+    ライブ取得ではフェッチャーのスレッドから呼ばれるため、書き込みはロックで直列化する。
+    """
+
+    def __init__(self, root: Path, train_after: int = 32, level: int = 9):
+        self.root = Path(root)
+        self.train_after = train_after
+        self.level = level
+        self._objects = self.root / "objects"
+        self._dicts = self.root / "dicts"
+        self._runs = self.root / "runs"
+        self._lock = threading.Lock()
+        self._dict_cache: dict[bytes, bytes] = {}
+        self._samples: list[bytes] = []
+        self._dict_id: bytes | None = None
+        self._zdict = b""
+        if self._dicts.is_dir():
+            # A store has a single dictionary; it is trained once and then kept for all later runs.
+            for path in sorted(self._dicts.iterdir()):
+                self._dict_id = path.name.encode("ascii")
+                self._zdict = path.read_bytes()
+                break
+
+    def _object_path(self, digest: str) -> Path:
+        return self._objects / digest[:2] / digest
+
+    def _load_dict(self, dict_id: bytes) -> bytes:
+        zdict = self._dict_cache.get(dict_id)
+        if zdict is None:
+            zdict = self._dict_cache[dict_id] = (self._dicts / dict_id.decode("ascii")).read_bytes()
+        return zdict
+
+    def _compress(self, data: bytes) -> bytes:
+        if self._dict_id is None:
+            compressor = zlib.compressobj(self.level)
+            return _NO_DICT + compressor.compress(data) + compressor.flush()
+        compressor = zlib.compressobj(self.level, zdict=self._zdict)
+        return self._dict_id + compressor.compress(data) + compressor.flush()
+
+    def _train(self) -> None:
+        zdict = train_dictionary(self._samples)
+        self._samples = []
+        if not zdict:
+            return
+        dict_id = hashlib.sha256(zdict).hexdigest()[:16]
+        self._dicts.mkdir(parents=True, exist_ok=True)
+        (self._dicts / dict_id).write_bytes(zdict)
+        self._dict_id, self._zdict = dict_id.encode("ascii"), zdict
+        config.logger.info(f"Snapshot store trained a {len(zdict)} byte compression dictionary ({dict_id}).")
+
+    def put(self, data: bytes) -> tuple[str, int]:
+        """ページ本文を保存し、(sha256, 新たに書き込んだバイト数) を返す。既にあれば書き込まない。"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        with self._lock:
+            if path.exists():
+                return digest, 0
+            if self._dict_id is None and self.train_after > 0:
+                self._samples.append(data)
+                if len(self._samples) >= self.train_after:
+                    self._train()
+            blob = self._compress(data)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(blob)
+            tmp_path.replace(path)
+        return digest, len(blob)
+
+    def get(self, digest: str) -> bytes:
+        blob = self._object_path(digest).read_bytes()
+        dict_id, body = blob[:16], blob[16:]
+        if dict_id == _NO_DICT:
+            return zlib.decompress(body)
+        decompressor = zlib.decompressobj(zdict=self._load_dict(dict_id))
+        return decompressor.decompress(body) + decompressor.flush()
+
+    def begin_run(self, source: str) -> "SnapshotRun":
+        """新しい実行の索引を作る (run_id は開始時刻)"""
+        run_id = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        return SnapshotRun(self, run_id, source)
+
+    def runs(self) -> list[str]:
+        """保存されている実行の ID (古い順)"""
+        if not self._runs.is_dir():
+            return []
+        return sorted(p.stem for p in self._runs.glob("*.jsonl"))
+
+    def run_entries(self, run_id: str) -> Iterator[tuple[str, str]]:
+        """実行の索引の (url, sha256) を保存した順に yield する"""
+        with (self._runs / f"{run_id}.jsonl").open(encoding="utf-8") as f:
+            next(f, None)  # run header
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Last line cut off by a crash.
+                    break
+                yield entry["url"], entry["sha256"]
+
+    def iter_run(self, run_id: str | None = None) -> Iterator[tuple[str, bytes]]:
+        """実行 (省略時は最新) で保存したページを (url, 本文) として保存した順に yield する"""
+        if run_id is None:
+            runs = self.runs()
+            if not runs:
+                raise FileNotFoundError(f"No snapshot runs found in {self.root}")
+            run_id = runs[-1]
+        for url, digest in self.run_entries(run_id):
+            yield url, self.get(digest)
+
+
+class SnapshotRun:
+    """1回の実行で保存したページの索引 (URL またはファイル名 → 内容ハッシュ)"""
+
+    def __init__(self, store: SnapshotStore, run_id: str, source: str):
+        self.store = store
+        self.run_id = run_id
+        self.pages = 0
+        self.new_objects = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self._seen: set[str] = set()
+        self._lock = threading.Lock()
+        path = store._runs / f"{run_id}.jsonl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file: IO[str] | None = path.open("w", encoding="utf-8")
+        header = {"run": run_id, "source": source, "created": datetime.now().isoformat(timespec="seconds")}
+        self._write(header)
+
+    def _write(self, entry: dict[str, str]) -> None:
+        assert self._file is not None
+        self._file.write(json.dumps(entry, ensure_ascii=False))
+        self._file.write("\n")
+
+    def add(self, url: str, data: bytes) -> str:
+        """ページを保存して索引に加え、sha256 を返す (同じ URL は1回だけ記録する)"""
+        digest, written = self.store.put(data)
+        with self._lock:
+            if url in self._seen or self._file is None:
+                return digest
+            self._seen.add(url)
+            self._write({"url": url, "sha256": digest})
+            self.pages += 1
+            self.raw_bytes += len(data)
+            if written:
+                self.new_objects += 1
+                self.stored_bytes += written
+        return digest
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+        config.logger.info(
+            f"Snapshot run {self.run_id}: {self.pages} pages, {self.new_objects} new objects "
+            f"({self.stored_bytes} bytes stored for {self.raw_bytes} bytes of HTML)."
+        )
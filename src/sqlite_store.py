@@ -0,0 +1,151 @@
+import sqlite3
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+from models import Subject
+from writers import CSV_COLUMNS, serialize_subject, tabular_record
+
+# 全文検索の対象にする長文フィールド
+FTS_COLUMNS = ("overview", "plan", "keywords", "learning_outcomes")
+# 絞り込みに使う列 (セカンダリインデックス)
+INDEXED_COLUMNS = ("faculty", "term", "instructor_name")
+# trigram トークナイザーで MATCH できる最短のクエリ長
+_MIN_MATCH_LENGTH = 3
+
+
+def _schema_sql() -> list[str]:
+    columns = []
+    for name in CSV_COLUMNS:
+        info = Subject.model_fields[name]
+        sql_type = "INTEGER" if info.annotation is int else "TEXT"
+        not_null = " NOT NULL" if info.is_required() else ""
+        columns.append(f"{name} {sql_type}{not_null}")
+    fts_cols = ", ".join(FTS_COLUMNS)
+    new_cols = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+    old_cols = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+    statements = [
+        f"CREATE TABLE IF NOT EXISTS subjects ({', '.join(columns)}, PRIMARY KEY (lecture_code, year))",
+        *(f"CREATE INDEX IF NOT EXISTS subjects_{c} ON subjects ({c})" for c in INDEXED_COLUMNS),
+        # External-content FTS table kept in sync by triggers. The trigram tokenizer needs no word
+        # boundaries, so it works for Japanese text (queries must be at least 3 characters).
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS subjects_fts USING fts5({fts_cols},"
+        " content='subjects', content_rowid='rowid', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS subjects_ai AFTER INSERT ON subjects BEGIN"
+        f" INSERT INTO subjects_fts (rowid, {fts_cols}) VALUES (new.rowid, {new_cols}); END",
+        "CREATE TRIGGER IF NOT EXISTS subjects_ad AFTER DELETE ON subjects BEGIN"
+        f" INSERT INTO subjects_fts (subjects_fts, rowid, {fts_cols}) VALUES ('delete', old.rowid, {old_cols}); END",
+        "CREATE TRIGGER IF NOT EXISTS subjects_au AFTER UPDATE ON subjects BEGIN"
+        f" INSERT INTO subjects_fts (subjects_fts, rowid, {fts_cols}) VALUES ('delete', old.rowid, {old_cols});"
+        f" INSERT INTO subjects_fts (rowid, {fts_cols}) VALUES (new.rowid, {new_cols}); END",
+    ]
+    return statements
+
+
+def _upsert_sql() -> str:
+    placeholders = ", ".join("?" for _ in CSV_COLUMNS)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in CSV_COLUMNS if c not in ("lecture_code", "year"))
+    return (
+        f"INSERT INTO subjects ({', '.join(CSV_COLUMNS)}) VALUES ({placeholders})"
+        f" ON CONFLICT (lecture_code, year) DO UPDATE SET {updates}"
+    )
+
+
+class SqliteWriter:
+    """レコードを SQLite データベース (``<output>.sqlite``) に書き出す。
+
+    subjects テーブルは Subject の各フィールドを型付きの列に持ち、(lecture_code, year) で upsert
+    する。faculty / term / instructor_name にインデックス、長文フィールドに FTS5 全文検索
+    インデックス (subjects_fts) を張る。既存のデータベースに追記できるので、複数回の実行結果を
+    1つにまとめられる。``commit_every`` 件ごとにコミットする。``create_empty=True`` なら1件も無くても
+    テーブルだけのデータベースを作る。
+    """
+
+    def __init__(self, output_file: Path, commit_every: int = 1000, create_empty: bool = False):
+        self.path = output_file.with_suffix(".sqlite")
+        self.commit_every = commit_every
+        self.create_empty = create_empty
+        self.count = 0
+        self._conn: sqlite3.Connection | None = None
+        self._upsert = _upsert_sql()
+
+    def __enter__(self) -> "SqliteWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def _open(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        for statement in _schema_sql():
+            conn.execute(statement)
+        # Databases written before a field was added to Subject lack its column.
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(subjects)")}
+        for name in CSV_COLUMNS:
+            if name not in existing:
+                sql_type = "INTEGER" if Subject.model_fields[name].annotation is int else "TEXT"
+                conn.execute(f"ALTER TABLE subjects ADD COLUMN {name} {sql_type}")
+        conn.commit()
+        return conn
+
+    def write(self, subject: Subject) -> None:
+        if self._conn is None:
+            self._conn = self._open()
+        record = tabular_record(serialize_subject(subject))
+        self._conn.execute(self._upsert, [record.get(c) for c in CSV_COLUMNS])
+        self.count += 1
+        if self.count % self.commit_every == 0:
+            self._conn.commit()
+
+    def close(self) -> None:
+        if self._conn is None and self.create_empty and not self.count:
+            self._conn = self._open()
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def abort(self) -> None:
+        """最後のコミット以降の書き込みを取り消して閉じる (upsert で追記するので一時ファイルは使わない)"""
+        if self._conn is not None:
+            self._conn.rollback()
+            self._conn.close()
+            self._conn = None
+
+
+def search(db_path: Path, query: str, limit: int = 20) -> list[dict[str, Any]]:
+    """長文フィールドをキーワード検索し、一致した科目を関連度順に返す。
+
+    3文字以上は FTS5 の MATCH (フレーズ検索)、それより短いクエリは trigram で扱えないため
+    FTS テーブル上の LIKE による走査にフォールバックする。
+    """
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        if len(query) >= _MIN_MATCH_LENGTH:
+            phrase = '"' + query.replace('"', '""') + '"'
+            rows = conn.execute(
+                "SELECT s.lecture_code, s.year, s.subject_name, s.faculty FROM subjects_fts"
+                " JOIN subjects AS s ON s.rowid = subjects_fts.rowid"
+                " WHERE subjects_fts MATCH ? ORDER BY rank LIMIT ?",
+                (phrase, limit),
+            ).fetchall()
+        else:
+            pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            where = " OR ".join(f"f.{c} LIKE ? ESCAPE '\\'" for c in FTS_COLUMNS)
+            rows = conn.execute(
+                "SELECT s.lecture_code, s.year, s.subject_name, s.faculty FROM subjects_fts AS f"
+                f" JOIN subjects AS s ON s.rowid = f.rowid WHERE {where} LIMIT ?",
+                (*([pattern] * len(FTS_COLUMNS)), limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
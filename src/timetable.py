@@ -0,0 +1,272 @@
+import json
+import re
+import unicodedata
+from collections.abc import Iterable, Iterator
+from dataclasses import astuple, dataclass
+from pathlib import Path
+from typing import Any
+
+from models import Subject
+
+INDEX_VERSION = 1
+WEEKDAYS = "月火水木金土日"
+
+# 先頭の開設期 (例: "(1T)", "(1・2T)", "(3T-4T)", "(前)", "(通年)")。"(東広島開講)" のような講義室側の括弧とは区別する
+_TERM_RE = re.compile(r"\((?P<term>\d+(?:T?\s*[・,\-]\s*\d+)*T|前期?|後期?|通年|集中|その他)\)")
+# 開設期のターム (例: "1・2T" の 1 と 2、"1T-3T" の 1〜3)
+_QUARTER_RE = re.compile(r"(\d)T?(?:\s*-\s*(\d))?")
+# 曜日と時限 (例: "水1-4", "月5")
+_DAY_PERIOD_RE = re.compile(rf"(?P<day>[{WEEKDAYS}])\s*(?P<start>\d{{1,2}})(?:\s*[-~〜]\s*(?P<end>\d{{1,2}}))?")
+_ROOM_SPLIT_RE = re.compile(r"\s*[,、]\s*")
+# Subject.term (例: "1年次生 前期 １ターム") から開設期を読み取る
+_QUARTER_IN_TEXT_RE = re.compile(r"(\d)ターム")
+_HALF_IN_TEXT_RE = re.compile(r"(前|後)期|(通年)")
+_ALL_QUARTERS = frozenset({1, 2, 3, 4})
+
+
+def term_quarters(term: str) -> frozenset[int]:
+    """開設期が占めるターム (1〜4)。"1T" → {1}、"1・2T" → {1, 2}、"1T-3T" → {1, 2, 3}、"前" → {1, 2}、
+    "後" → {3, 4}。不明なものは通年扱い。
+    """
+    if "T" in term:
+        found: set[int] = set()
+        for m in _QUARTER_RE.finditer(term):
+            first = int(m.group(1))
+            found.update(range(first, int(m.group(2) or first) + 1))
+        return frozenset(found & _ALL_QUARTERS) or _ALL_QUARTERS
+    if term.startswith("前"):
+        return frozenset({1, 2})
+    if term.startswith("後"):
+        return frozenset({3, 4})
+    return _ALL_QUARTERS
+
+
+def _default_term(subject_term: str) -> str:
+    # "前期 １ターム" はタームの方が細かいので優先する
+    text = unicodedata.normalize("NFKC", subject_term)
+    if m := _QUARTER_IN_TEXT_RE.search(text):
+        return f"{m.group(1)}T"
+    if m := _HALF_IN_TEXT_RE.search(text):
+        return m.group(1) or m.group(2)
+    return ""
+
+
+@dataclass(frozen=True)
+class Slot:
+    """1つの授業の1つのコマ (開設期・曜日・時限の範囲・講義室)"""
+
+    lecture_code: str
+    year: str
+    term: str
+    weekday: str
+    start: int
+    end: int
+    room: str
+
+    @property
+    def periods(self) -> range:
+        return range(self.start, self.end + 1)
+
+    def overlaps(self, other: "Slot") -> bool:
+        """同じ年度・曜日で時限が重なり、開設期のタームも重なるかどうか (講義室は見ない)"""
+        return (
+            self.year == other.year
+            and self.weekday == other.weekday
+            and self.start <= other.end
+            and other.start <= self.end
+            and bool(term_quarters(self.term) & term_quarters(other.term))
+        )
+
+    def __str__(self) -> str:
+        periods = str(self.start) if self.start == self.end else f"{self.start}-{self.end}"
+        term = f"({self.term}) " if self.term else ""
+        return f"{self.year} {self.lecture_code} {term}{self.weekday}{periods} {self.room}".rstrip()
+
+
+def parse_day_time_room(text: str, lecture_code: str = "", year: str = "", default_term: str = "") -> list[Slot]:
+    """「曜日・時限・講義室」の文字列をコマに分解する。
+
+    例: ``"(1T) 水1-4：詳細はもみじ教養HP参照(東広島開講)"`` → 1T・水曜・1〜4限のコマ1つ。
+    ``"(前) 月5-6,木5-6:工220"`` のように曜日が複数あればそれぞれ、``(2T) ...`` が続けば開設期ごとに分ける。
+    講義室が複数 (``,`` / ``、`` 区切り) なら曜日ごとに全ての講義室のコマを作る。
+    開設期の書かれていない部分は default_term を使う。集中講義など曜日の無いものはコマにならない。
+    """
+    text = unicodedata.normalize("NFKC", text)
+    terms = list(_TERM_RE.finditer(text))
+    chunks = []
+    head = text[: terms[0].start()] if terms else text
+    if head.strip():
+        chunks.append((default_term, head))
+    for i, m in enumerate(terms):
+        end = terms[i + 1].start() if i + 1 < len(terms) else len(text)
+        chunks.append((m.group("term"), text[m.end() : end]))
+
+    slots: list[Slot] = []
+    for term, chunk in chunks:
+        days, _, rooms_text = chunk.partition(":")
+        rooms = [r for r in _ROOM_SPLIT_RE.split(rooms_text.strip()) if r] or [""]
+        for m in _DAY_PERIOD_RE.finditer(days):
+            start = int(m.group("start"))
+            end = max(start, int(m.group("end") or start))
+            slots.extend(Slot(lecture_code, year, term, m.group("day"), start, end, room) for room in rooms)
+    return slots
+
+
+def parse_subject_slots(subject: Subject) -> list[Slot]:
+    """Subject の day_time_room をコマに分解する。開設期が書かれていなければ Subject.term から補う。"""
+    return parse_day_time_room(subject.day_time_room, subject.lecture_code, subject.year, _default_term(subject.term))
+
+
+def attach_slots(subject: Subject) -> None:
+    """抽出時に呼び、分解したコマを Subject に持たせる (ワーカープロセスで分解して親へ渡せる)"""
+    subject._slots = parse_subject_slots(subject)
+
+
+def subject_slots(subject: Subject) -> list[Slot]:
+    """Subject のコマ。抽出時に分解したものがあればそれを、無ければ (マニフェストやチェックポイントから
+    再利用したレコードなど) ここで分解する。
+    """
+    slots = subject._slots
+    return slots if slots is not None else parse_subject_slots(subject)
+
+
+def _has_room_number(room: str) -> bool:
+    # "詳細はもみじ教養HP参照" / "オンライン" / "未定" のような案内文は実際の講義室ではない
+    return any(c.isdigit() for c in room)
+
+
+class TimetableIndex:
+    """コマを曜日・時限と講義室で引けるようにした索引。
+
+    by_time は ``"水3"`` のような曜日+時限 (範囲の各時限) から、by_room は講義室から slots の
+    位置へのリスト。ファイルには索引ごと保存するので、読み込んだ後の検索は全件を走査しない。
+    unscheduled は曜日・時限を読み取れなかった授業 (集中講義など) の講義コード。
+    """
+
+    def __init__(self) -> None:
+        self.slots: list[Slot] = []
+        self.by_time: dict[str, list[int]] = {}
+        self.by_room: dict[str, list[int]] = {}
+        self.unscheduled: list[str] = []
+        self.subjects = 0
+
+    def add(self, subject: Subject) -> None:
+        self.subjects += 1
+        slots = subject_slots(subject)
+        if not slots:
+            self.unscheduled.append(subject.lecture_code)
+        for slot in slots:
+            self._insert(slot)
+
+    def _insert(self, slot: Slot) -> None:
+        i = len(self.slots)
+        self.slots.append(slot)
+        for period in slot.periods:
+            self.by_time.setdefault(f"{slot.weekday}{period}", []).append(i)
+        if slot.room:
+            self.by_room.setdefault(slot.room, []).append(i)
+
+    def _select(
+        self, ids: Iterable[int], term: str | None, year: str | None, weekday: str | None, period: int | None
+    ) -> list[Slot]:
+        quarters = term_quarters(term) if term else None
+        selected = []
+        for i in ids:
+            slot = self.slots[i]
+            if year is not None and slot.year != year:
+                continue
+            if weekday is not None and slot.weekday != weekday:
+                continue
+            if period is not None and period not in slot.periods:
+                continue
+            if quarters is not None and not quarters & term_quarters(slot.term):
+                continue
+            selected.append(slot)
+        return selected
+
+    def at(self, weekday: str, period: int, term: str | None = None, year: str | None = None) -> list[Slot]:
+        """その曜日・時限に行われる授業のコマ (term を指定すればタームが重なるものだけ)"""
+        return self._select(self.by_time.get(f"{weekday}{period}", ()), term, year, None, None)
+
+    def in_room(
+        self,
+        room: str,
+        weekday: str | None = None,
+        period: int | None = None,
+        term: str | None = None,
+        year: str | None = None,
+    ) -> list[Slot]:
+        """その講義室のコマ (曜日・時限・開設期・年度で絞り込める)"""
+        return self._select(self.by_room.get(room, ()), term, year, weekday, period)
+
+    def conflicts(self) -> Iterator[tuple[Slot, Slot]]:
+        """同じ講義室で、年度・曜日・時限・タームが重なる別の授業のコマの組。
+
+        講義室名に数字を含まないもの (案内文など) は対象にしない。
+        """
+        for room, ids in self.by_room.items():
+            if not _has_room_number(room):
+                continue
+            slots = sorted((self.slots[i] for i in ids), key=lambda s: (s.year, s.weekday, s.start))
+            for i, slot in enumerate(slots):
+                for other in slots[i + 1 :]:
+                    if (other.year, other.weekday) != (slot.year, slot.weekday) or other.start > slot.end:
+                        break
+                    if other.lecture_code != slot.lecture_code and slot.overlaps(other):
+                        yield slot, other
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "subjects": self.subjects,
+            "slots": [list(astuple(s)) for s in self.slots],
+            "by_time": self.by_time,
+            "by_room": self.by_room,
+            "unscheduled": self.unscheduled,
+        }
+
+    def write(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self.to_dict(), ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "TimetableIndex":
+        """write で書いた索引を読み込む (索引は作り直さない)。版が違えば ValueError。"""
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"{path} is not a timetable index (version {INDEX_VERSION})")
+        index = cls()
+        index.subjects = data["subjects"]
+        index.slots = [Slot(*s) for s in data["slots"]]
+        index.by_time = data["by_time"]
+        index.by_room = data["by_room"]
+        index.unscheduled = data["unscheduled"]
+        return index
+
+
+def timetable_path(output_file: Path) -> Path:
+    """出力の隣の索引ファイル (例: ``syllabus_data.json`` → ``syllabus_data.timetable.json``)"""
+    return output_file.with_suffix(".timetable.json")
+
+
+class TimetableWriter:
+    """レコードを受け取るたびに day_time_room をコマに分解し、close() で ``<output>.timetable.json`` に書き出す。
+
+    メモリに持つのはコマ (数個の短い値) だけ。1件も無ければ何も作らない。
+    """
+
+    def __init__(self, output_file: Path):
+        self.path = timetable_path(output_file)
+        self.index = TimetableIndex()
+
+    def write(self, subject: Subject) -> None:
+        self.index.add(subject)
+
+    def close(self) -> None:
+        if self.index.subjects:
+            self.index.write(self.path)
+
+    def abort(self) -> None:
+        pass
@@ -0,0 +1,407 @@
+import csv
+import json
+import textwrap
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from types import TracebackType
+from typing import IO, TYPE_CHECKING, Any, Protocol
+
+import config
+from config import OutputFormat
+from models import Subject
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+
+def _csv_columns() -> list[str]:
+    """CSV の列 (モデルのフィールド名) を config.CANONICAL_HEADERS の順に並べる"""
+    by_alias = {info.alias or name: name for name, info in Subject.model_fields.items()}
+    columns = [by_alias[h] for h in config.CANONICAL_HEADERS if h in by_alias]
+    # Fields without a canonical header (if any) go last in model order.
+    columns += [name for name in Subject.model_fields if name not in columns]
+    return columns
+
+
+CSV_COLUMNS = _csv_columns()
+
+
+class RecordWriter(Protocol):
+    """1件ずつレコードを受け取るストリーミング出力。
+
+    close() で出力を確定し、abort() (途中で失敗したとき) は書きかけの出力を捨てて前回の出力を残す。
+    """
+
+    def write(self, subject: Subject) -> None: ...
+
+    def close(self) -> None: ...
+
+    def abort(self) -> None: ...
+
+
+def temporary_path(path: Path) -> Path:
+    """書きかけの出力の置き場所 (同じディレクトリなので os.replace で置き換えられる)"""
+    return path.with_name(path.name + ".tmp")
+
+
+class _AtomicFile:
+    """``<path>.tmp`` に書き、commit() で path に置き換える。discard() なら一時ファイルを消す。
+
+    途中で中断された実行が、前回の完全な出力を途中までの (それでも形式としては正しい) 出力で
+    上書きしないようにする。
+    """
+
+    def __init__(self, path: Path, newline: str | None = None):
+        self.path = path
+        self.tmp_path = temporary_path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.file: IO[str] = self.tmp_path.open("w", encoding="utf-8", newline=newline)
+
+    def commit(self) -> None:
+        self.file.close()
+        self.tmp_path.replace(self.path)
+
+    def discard(self) -> None:
+        self.file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def serialize_subject(subject: Subject) -> dict[str, Any]:
+    """Subject を出力用の dict にする。
+
+    既存の下流の利用者との互換性のため、credits は整数値なら int、小数なら float にする。
+    値が None のキーは取り除く (空文字列は残す。必須フィールドは値が無くても空文字列で存在させる)。
+    """
+    d = subject.model_dump()
+    if "credits" in d and d.get("credits") is not None:
+        v = d["credits"]
+        try:
+            fv = float(v)
+            # If fractional (not integer), keep float; otherwise cast to int
+            if abs(fv - round(fv)) > 1e-8:  # noqa: PLR2004
+                d["credits"] = float(fv)
+            else:
+                d["credits"] = int(round(fv))
+        except Exception:
+            # If it's not a number, leave original value as-is
+            d["credits"] = v
+    return {k: v for k, v in d.items() if v is not None}
+
+
+def tabular_record(record: dict[str, Any]) -> dict[str, Any]:
+    """serialize_subject の結果を表形式 (CSV / SQLite / Parquet) の1行にする。
+
+    入れ子の値 (英語版ページの dict など) は1つのセルに入るよう JSON 文字列にする。
+    """
+    return {k: json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else v for k, v in record.items()}
+
+
+class _CsvFile:
+    """``<output>.csv`` (列は CSV_COLUMNS) を最初の行を書くときに開く"""
+
+    def __init__(self, output_file: Path):
+        self.path = output_file.with_suffix(".csv")
+        self._file: _AtomicFile | None = None
+        self._writer: csv.DictWriter[str] | None = None
+
+    def open(self) -> "csv.DictWriter[str]":
+        if self._writer is None:
+            self._file = _AtomicFile(self.path, newline="")
+            self._writer = csv.DictWriter(self._file.file, fieldnames=CSV_COLUMNS, lineterminator="\n")
+            self._writer.writeheader()
+        return self._writer
+
+    def writerow(self, record: dict[str, Any]) -> None:
+        self.open().writerow(tabular_record(record))
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.commit()
+        self._file = None
+        self._writer = None
+
+    def abort(self) -> None:
+        if self._file is not None:
+            self._file.discard()
+        self._file = None
+        self._writer = None
+
+
+class JsonlCsvWriter:
+    """レコードを1件ずつ JSON Lines (``<output>.jsonl``) と CSV (``<output>.csv``) に書き出す。
+
+    全件をメモリに持たないので、コーパスの大きさに関わらずメモリ使用量は一定。ファイルは最初の
+    レコードを書くときに開くため、1件も無ければ何も作られない (``create_empty=True`` なら空のファイルと
+    ヘッダーだけの CSV を作る)。``write_csv=False`` なら CSV は書かない。
+    書き込みは ``*.tmp`` に行い、close() で出力に置き換える (abort() なら一時ファイルを消す)。
+    """
+
+    def __init__(self, output_file: Path, write_csv: bool = True, create_empty: bool = False):
+        self.jsonl_path = output_file.with_suffix(".jsonl")
+        self.csv_path = output_file.with_suffix(".csv")
+        self.create_empty = create_empty
+        self.count = 0
+        self._jsonl: _AtomicFile | None = None
+        self._csv = _CsvFile(output_file) if write_csv else None
+
+    def __enter__(self) -> "JsonlCsvWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def write(self, subject: Subject) -> None:
+        if self._jsonl is None:
+            self._jsonl = _AtomicFile(self.jsonl_path)
+        record = serialize_subject(subject)
+        self._jsonl.file.write(json.dumps(record, ensure_ascii=False))
+        self._jsonl.file.write("\n")
+        if self._csv is not None:
+            self._csv.writerow(record)
+        self.count += 1
+
+    def close(self) -> None:
+        if self._jsonl is None and self.create_empty and not self.count:
+            self._jsonl = _AtomicFile(self.jsonl_path)
+            if self._csv is not None:
+                self._csv.open()
+        if self._jsonl is not None:
+            self._jsonl.commit()
+        self._jsonl = None
+        if self._csv is not None:
+            self._csv.close()
+
+    def abort(self) -> None:
+        if self._jsonl is not None:
+            self._jsonl.discard()
+        self._jsonl = None
+        if self._csv is not None:
+            self._csv.abort()
+
+
+class JsonCsvWriter:
+    """レコードを1件ずつ JSON 配列 (``<output>``, indent=2) と CSV (``<output>.csv``) に書き出す。
+
+    配列の括弧と区切りを自分で書くので、全件を集めずに従来と同じ形の JSON を作れる。close() で
+    配列を閉じる。1件も無ければ何も作らない (``create_empty=True`` なら ``[]`` とヘッダーだけの CSV を作る)。
+    ``write_csv=False`` なら CSV は書かない。JsonlCsvWriter と同じく ``*.tmp`` に書いてから置き換える。
+    """
+
+    def __init__(self, output_file: Path, write_csv: bool = True, create_empty: bool = False):
+        self.path = output_file
+        self.create_empty = create_empty
+        self.count = 0
+        self._json: _AtomicFile | None = None
+        self._csv = _CsvFile(output_file) if write_csv else None
+
+    def __enter__(self) -> "JsonCsvWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def write(self, subject: Subject) -> None:
+        if self._json is None:
+            self._json = _AtomicFile(self.path)
+            self._json.file.write("[\n")
+        else:
+            self._json.file.write(",\n")
+        record = serialize_subject(subject)
+        # Indent each record one level so the file reads like json.dump(records, indent=2).
+        self._json.file.write(textwrap.indent(json.dumps(record, ensure_ascii=False, indent=2), "  "))
+        if self._csv is not None:
+            self._csv.writerow(record)
+        self.count += 1
+
+    def close(self) -> None:
+        if self._json is None and self.create_empty and not self.count:
+            self._json = _AtomicFile(self.path)
+            self._json.file.write("[]\n")
+            if self._csv is not None:
+                self._csv.open()
+        elif self._json is not None:
+            self._json.file.write("\n]\n")
+        if self._json is not None:
+            self._json.commit()
+        self._json = None
+        if self._csv is not None:
+            self._csv.close()
+
+    def abort(self) -> None:
+        if self._json is not None:
+            self._json.discard()
+        self._json = None
+        if self._csv is not None:
+            self._csv.abort()
+
+
+# 値の種類が少なく、辞書エンコードが効く列
+DICTIONARY_COLUMNS = ("faculty", "campus", "term", "language")
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet output requires pyarrow (pip install -e .[parquet])") from e
+    return pa, pq
+
+
+def arrow_schema() -> "pa.Schema":
+    """Subject から Arrow スキーマを作る。
+
+    int のフィールドは int64、それ以外は string (DICTIONARY_COLUMNS は dictionary<int32, string>、
+    入れ子の値は tabular_record で JSON 文字列)。
+    必須でないフィールドのみ nullable。各列のメタデータに元の日本語ヘッダー (alias) を持たせる。
+    """
+    pa, _ = _import_pyarrow()
+    fields = []
+    for name in CSV_COLUMNS:
+        info = Subject.model_fields[name]
+        if info.annotation is int:
+            arrow_type = pa.int64()
+        elif name in DICTIONARY_COLUMNS:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        else:
+            arrow_type = pa.string()
+        metadata = {"alias": info.alias} if info.alias else None
+        fields.append(pa.field(name, arrow_type, nullable=not info.is_required(), metadata=metadata))
+    return pa.schema(fields)
+
+
+class ParquetWriter:
+    """レコードを ``<output>.parquet`` に書き出す。
+
+    ``row_group_size`` 件たまるごとに1つの行グループとして書き出すので、メモリに持つのは
+    高々1行グループ分。下流では必要な列だけを読めば、長い自由記述の列をパースせずに済む。
+    ``create_empty=True`` なら1件も無くてもスキーマだけのファイルを作る。``*.tmp`` に書き、close() で
+    フッターを書いてから出力に置き換える。
+    """
+
+    def __init__(self, output_file: Path, row_group_size: int = 10_000, create_empty: bool = False):
+        self.path = output_file.with_suffix(".parquet")
+        self.row_group_size = row_group_size
+        self.create_empty = create_empty
+        self.count = 0
+        self._pa, self._pq = _import_pyarrow()
+        self._schema = arrow_schema()
+        self._columns: dict[str, list[Any]] = {name: [] for name in self._schema.names}
+        self._buffered = 0
+        self._writer: Any = None
+
+    def __enter__(self) -> "ParquetWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def write(self, subject: Subject) -> None:
+        record = tabular_record(serialize_subject(subject))
+        for name, values in self._columns.items():
+            values.append(record.get(name))
+        self._buffered += 1
+        self.count += 1
+        if self._buffered >= self.row_group_size:
+            self._flush()
+
+    def _open(self) -> Any:
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = self._pq.ParquetWriter(temporary_path(self.path), self._schema, compression="zstd")
+        return self._writer
+
+    def _flush(self) -> None:
+        if not self._buffered:
+            return
+        self._open()
+        table = self._pa.Table.from_pydict(self._columns, schema=self._schema)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        for values in self._columns.values():
+            values.clear()
+        self._buffered = 0
+
+    def close(self) -> None:
+        self._flush()
+        if self.create_empty and not self.count:
+            self._open()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            temporary_path(self.path).replace(self.path)
+
+    def abort(self) -> None:
+        for values in self._columns.values():
+            values.clear()
+        self._buffered = 0
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            temporary_path(self.path).unlink(missing_ok=True)
+
+
+def open_streaming_writers(
+    output_file: Path, formats: Iterable[OutputFormat], timetable: bool = False, create_empty: bool = False
+) -> list[RecordWriter]:
+    """formats の各形式の writer を作る (JSON と JSONL の両方を指定しても CSV は1つだけ書く)。
+
+    timetable なら時間割の索引 (``<output>.timetable.json``) も書き出す。create_empty なら
+    レコードが1件も無くても各形式の空の出力を作る (担当ページの無いシャードなど)。
+    """
+    formats = list(dict.fromkeys(formats))
+    writers: list[RecordWriter] = []
+    for fmt in formats:
+        if fmt == OutputFormat.JSON:
+            writers.append(JsonCsvWriter(output_file, create_empty=create_empty))
+        elif fmt == OutputFormat.JSONL:
+            writers.append(
+                JsonlCsvWriter(output_file, write_csv=OutputFormat.JSON not in formats, create_empty=create_empty)
+            )
+        elif fmt == OutputFormat.PARQUET:
+            writers.append(ParquetWriter(output_file, create_empty=create_empty))
+        elif fmt == OutputFormat.SQLITE:
+            # Imported here: sqlite_store depends on this module.
+            from sqlite_store import SqliteWriter
+
+            writers.append(SqliteWriter(output_file, create_empty=create_empty))
+    if timetable:
+        from timetable import TimetableWriter
+
+        writers.append(TimetableWriter(output_file))
+    return writers
+
+
+@contextmanager
+def streaming_writers(
+    output_file: Path, formats: Iterable[OutputFormat], timetable: bool = False, create_empty: bool = False
+) -> Iterator[list[RecordWriter]]:
+    """open_streaming_writers の writer を with ブロックの間開いておく。
+
+    ブロックを正常に抜ければ全て close() して出力を確定し、例外 (KeyboardInterrupt を含む) なら
+    abort() して書きかけの一時ファイルを消す (前回の出力はそのまま残る)。
+    """
+    writers = open_streaming_writers(output_file, formats, timetable, create_empty)
+    try:
+        yield writers
+        for writer in writers:
+            writer.close()
+    except BaseException:
+        for writer in writers:
+            writer.abort()
+        raise
@@ -1,4 +1,9 @@
 # tests/conftest.py
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack, contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 import pytest
@@ -57,6 +62,73 @@ def sample_soup_aa10000100(sample_html_content_aa10000100: str) -> BeautifulSoup
     return BeautifulSoup(sample_html_content_aa10000100, "html5lib")
 
 
+# --- ライブ取得用のローカル HTTP サーバー ---
+class _FixtureRequestHandler(SimpleHTTPRequestHandler):
+    """Serves fixture pages over keep-alive HTTP/1.1 and counts accepted connections."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        server = self.server
+        with server.stats_lock:  # type: ignore[attr-defined]
+            server.connections += 1  # type: ignore[attr-defined]
+
+    def log_request(self, code: int | str = "-", size: int | str = "-") -> None:
+        server = self.server
+        with server.stats_lock:  # type: ignore[attr-defined]
+            server.requests.append((self.path, int(code)))  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        pass
+
+
+@contextmanager
+def _serve_directory(directory: Path) -> Iterator[ThreadingHTTPServer]:
+    handler = partial(_FixtureRequestHandler, directory=str(directory))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.connections = 0  # type: ignore[attr-defined]
+    server.requests = []  # type: ignore[attr-defined]
+    server.stats_lock = threading.Lock()  # type: ignore[attr-defined]
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/"  # type: ignore[attr-defined]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def fixture_http_server() -> Iterator[ThreadingHTTPServer]:
+    """A local stand-in for the syllabus site serving tests/fixtures/html/small.
+
+    The base URL is available as ``server.base_url``; ``server.requests`` records (path, status).
+    """
+    with _serve_directory(HTML_DIR_SMALL) as server:
+        yield server
+
+
+@pytest.fixture
+def serve_directory() -> Iterator[Callable[[Path], ThreadingHTTPServer]]:
+    """Factory serving an arbitrary directory like fixture_http_server (e.g. a site built under tmp_path)."""
+    with ExitStack() as stack:
+        yield lambda directory: stack.enter_context(_serve_directory(directory))
+
+
+@pytest.fixture
+def live_settings(fixture_http_server: ThreadingHTTPServer, tmp_path: Path):
+    """Settings pointing live modes at the local fixture server, with the HTTP cache under tmp_path."""
+    from settings import get_settings
+
+    settings = get_settings(None)
+    settings.base_url = fixture_http_server.base_url  # type: ignore[attr-defined]
+    settings.http_cache_dir = tmp_path / "http_cache"
+    return settings
+
+
 # --- ヘッダー検証用のフィクスチャ ---
 @pytest.fixture
 def valid_headers() -> list[str]:
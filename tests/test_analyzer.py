@@ -0,0 +1,84 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from analyzer import DiffSummary, analyze, diff_records, read_records, record_hash
+from harvester import Harvester
+from models import Subject
+from settings import get_settings
+from writers import OutputFormat
+
+
+def _record(code: str, **changes) -> dict:
+    return {"lecture_code": code, "faculty": "総合科学部", "subject_name": f"科目{code}", **changes}
+
+
+def test_record_hash_ignores_key_order():
+    assert record_hash({"a": 1, "b": "x"}) == record_hash({"b": "x", "a": 1})
+    assert record_hash({"a": 1}) != record_hash({"a": 2})
+
+
+def test_diff_records_reports_added_removed_and_modified_fields():
+    old = [_record("1"), _record("2"), _record("3", plan="旧")]
+    new = [_record("3", plan="新", keywords="追加"), _record("1"), _record("4")]
+    changes = list(diff_records(old, new))
+    assert [(c.op, c.lecture_code) for c in changes] == [("modified", "3"), ("added", "4"), ("removed", "2")]
+    assert changes[0].fields == {"plan": ("旧", "新"), "keywords": (None, "追加")}
+    assert changes[1].record == _record("4")
+    assert changes[2].to_delta() == {"op": "removed", "lecture_code": "2"}
+
+
+def test_diff_records_keys_by_lecture_code_and_year():
+    old = [_record("1", year="2024"), _record("1", year="2025", plan="旧")]
+    new = [_record("1", year="2025", plan="新"), _record("1", year="2026")]
+    changes = list(diff_records(old, new))
+    assert [(c.op, c.lecture_code, c.year) for c in changes] == [
+        ("modified", "1", "2025"),
+        ("added", "1", "2026"),
+        ("removed", "1", "2024"),
+    ]
+    assert changes[2].to_delta() == {"op": "removed", "lecture_code": "1", "year": "2024"}
+
+
+def test_diff_records_counts_skipped_and_duplicate_records_apart_from_unchanged():
+    old = [_record("1"), _record("2"), _record("2"), {"faculty": "総合科学部"}]
+    new = [_record("1"), _record("2"), _record("2", plan="後"), {"faculty": "総合科学部"}]
+    summary = DiffSummary()
+    for change in diff_records(old, new, summary):
+        summary.add(change)
+    assert (summary.added, summary.removed, summary.modified, summary.unchanged) == (0, 0, 0, 2)
+    assert (summary.skipped, summary.duplicates) == (2, 2)
+
+
+def _write_outputs(tmp_path: Path, name: str, subjects: list[Subject]) -> Path:
+    out = tmp_path / f"{name}.json"
+    Harvester(get_settings(None)).save_results(iter(subjects), out, [OutputFormat.JSON, OutputFormat.SQLITE])
+    return out
+
+
+def test_analyze_writes_delta_across_formats(tmp_path: Path, minimal_subject_data: dict):
+    base = [Subject(**{**minimal_subject_data, "講義コード": code}) for code in ("10000100", "10000101")]
+    changed = Subject(**{**minimal_subject_data, "講義コード": "10000101", "授業計画": "新しい計画"})
+    old = _write_outputs(tmp_path, "old", base)
+    new = _write_outputs(tmp_path, "new", [changed, Subject(**{**minimal_subject_data, "講義コード": "10000102"})])
+    assert len(list(read_records(new.with_suffix(".sqlite")))) == 2
+
+    delta = tmp_path / "delta.jsonl"
+    summary = analyze(old, new.with_suffix(".sqlite"), delta)
+    assert (summary.added, summary.removed, summary.modified, summary.unchanged) == (1, 1, 1, 0)
+    assert summary.fields == {"plan": 1}
+    lines = [json.loads(line) for line in delta.read_text(encoding="utf-8").splitlines()]
+    assert [(d["op"], d["lecture_code"]) for d in lines] == [
+        ("modified", "10000101"),
+        ("added", "10000102"),
+        ("removed", "10000100"),
+    ]
+    assert lines[0]["changes"]["plan"][1] == "新しい計画"
+
+    assert analyze(old, old.with_suffix(".sqlite")).unchanged == 2
+
+
+def test_read_records_rejects_unknown_format(tmp_path: Path):
+    with pytest.raises(ValueError, match="Unsupported"):
+        list(read_records(tmp_path / "out.csv"))
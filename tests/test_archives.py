@@ -0,0 +1,117 @@
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from archives import is_archive, iter_archive_pages
+from harvester import Harvester
+from manifest import Manifest
+from metrics import METRICS
+from settings import get_settings
+
+
+def _make_tar(path: Path, html_dir: Path, names: list[str], extra: dict[str, bytes] | None = None) -> Path:
+    with tarfile.open(path, "w:gz") as tf:
+        for name in names:
+            tf.add(html_dir / name, arcname=f"snapshot/{name}")
+        for name, data in (extra or {}).items():
+            src = path.parent / "extra.tmp"
+            src.write_bytes(data)
+            tf.add(src, arcname=name)
+    return path
+
+
+def _make_zip(path: Path, html_dir: Path, names: list[str]) -> Path:
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("snapshot/", "")
+        for name in names:
+            zf.write(html_dir / name, arcname=f"snapshot/{name}")
+    return path
+
+
+def test_iter_archive_pages_filters_like_glob(tmp_path: Path, sample_html_small_dir: Path):
+    names = ["index.html", "2025_AA_10000100.html", "2025_AA.html"]
+    extra = {"snapshot/style.css": b"", "snapshot/._2025_AA.html": b"\0"}
+    tar = _make_tar(tmp_path / "snap.tar.gz", sample_html_small_dir, names, extra)
+    assert is_archive(tar)
+    assert not is_archive(sample_html_small_dir)
+    pages = list(iter_archive_pages(tar))
+    # Member order, not sorted order.
+    assert [name for name, _ in pages] == [f"snapshot/{n}" for n in names]
+    assert pages[1][1] == (sample_html_small_dir / "2025_AA_10000100.html").read_bytes()
+
+    zip_path = _make_zip(tmp_path / "snap.zip", sample_html_small_dir, names)
+    assert [name for name, _ in iter_archive_pages(zip_path)] == [f"snapshot/{n}" for n in names]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_harvest_from_archive_matches_directory(
+    tmp_path: Path, sample_html_small_dir: Path, sample_html_content_aa10000100: str, workers: int
+):
+    html_dir = tmp_path / "html"
+    html_dir.mkdir()
+    for p in sample_html_small_dir.glob("*.html"):
+        (html_dir / p.name).write_bytes(p.read_bytes())
+    (html_dir / "2025_AA_90000001.html").write_text(
+        sample_html_content_aa10000100.replace("10000100", "90000001"), encoding="utf-8"
+    )
+    (html_dir / "2025_AA_90000002.html").write_text(
+        sample_html_content_aa10000100.replace(">単位</TH>", ">未知の見出し</TH>"), encoding="utf-8"
+    )
+    names = sorted(p.name for p in html_dir.glob("*.html"))
+    archive = _make_tar(tmp_path / "snap.tar.gz", html_dir, names)
+
+    harv = Harvester(get_settings(None))
+    expected = [s.model_dump() for s in harv.iter_local(html_dir, workers=workers)]
+    METRICS.reset()
+    got = [s.model_dump() for s in harv.iter_local(archive, workers=workers)]
+    assert got == expected
+    assert [s["lecture_code"] for s in got] == ["10000100", "90000001"]
+    assert [e.source for e in harv.errors] == [f"{archive}/snapshot/2025_AA_90000002.html"]
+    assert METRICS.counters["pages_read"] == len(names)
+    METRICS.reset()
+
+
+def test_archive_manifest_reuses_unchanged_members(tmp_path: Path, sample_html_small_dir: Path):
+    names = sorted(p.name for p in sample_html_small_dir.glob("*.html"))
+    archive = _make_zip(tmp_path / "snap.zip", sample_html_small_dir, names)
+    harv = Harvester(get_settings(None))
+    manifest = Manifest(tmp_path / "out.manifest.json")
+    first = list(harv.iter_local(archive, manifest=manifest))
+    manifest.save()
+
+    METRICS.reset()
+    manifest = Manifest.load(tmp_path / "out.manifest.json", manifest.version)
+    again = list(harv.iter_local(archive, manifest=manifest))
+    assert [s.model_dump() for s in again] == [s.model_dump() for s in first]
+    assert METRICS.counters.get("pages_reused") == len(names)
+    assert "pages_parsed" not in METRICS.counters
+    METRICS.reset()
+
+
+def test_archive_and_directory_select_the_same_pages(tmp_path: Path, sample_html_small_dir: Path):
+    html_dir = tmp_path / "snapshot"
+    (html_dir / "sub").mkdir(parents=True)
+    names = sorted(p.name for p in sample_html_small_dir.glob("*.html"))
+    for name in names:
+        (html_dir / name).write_bytes((sample_html_small_dir / name).read_bytes())
+    (html_dir / "._2025_AA.html").write_bytes(b"\0")
+    (html_dir / "sub" / "2025_AA_10000100.html").write_bytes((html_dir / "2025_AA_10000100.html").read_bytes())
+
+    tar = tmp_path / "snap.tar.gz"
+    with tarfile.open(tar, "w:gz") as tf:
+        tf.add(html_dir, arcname="./snapshot")
+    zip_path = tmp_path / "snap.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for p in sorted(html_dir.rglob("*")):
+            zf.write(p, arcname=p.relative_to(html_dir).as_posix())
+
+    harv = Harvester(get_settings(None))
+    directory = sorted(s.lecture_code for s in harv.iter_local(html_dir))
+    assert directory == ["10000100"]
+    assert not harv.errors
+    for archive in (tar, zip_path):
+        pages = sorted(name.rsplit("/", 1)[-1] for name, _ in iter_archive_pages(archive))
+        assert pages == names
+        assert sorted(s.lecture_code for s in harv.iter_local(archive)) == directory
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+from checkpoint import CrawlState
+from harvester import Harvester, WebSource
+from models import HarvestError, Subject
+
+RUN = {"base_url": "http://example.invalid/", "targets": None, "extractor": "test"}
+
+
+def test_state_round_trip_and_frontier(tmp_path: Path, minimal_subject_data: dict):
+    path = tmp_path / "out.state.jsonl"
+    state = CrawlState.open(path, RUN)
+    state.record_listings(["a.html", "b.html"])
+    state.record_listing_done("a.html")
+    for url in ("1.html", "2.html", "3.html"):
+        state.record_queued(url)
+    state.record_completed("1.html", Subject(**minimal_subject_data))
+    state.record_completed("2.html", None)
+    state.close()
+    # A crash can leave a half-written last line behind.
+    with path.open("a", encoding="utf-8") as f:
+        f.write('{"event": "completed", "url": "3.ht')
+
+    resumed = CrawlState.open(path, RUN, resume=True)
+    assert resumed.listing_urls == ["a.html", "b.html"]
+    assert resumed.listings_done == {"a.html"}
+    assert resumed.frontier == ["3.html"]
+    assert [s.model_dump() for s in resumed.records()] == [Subject(**minimal_subject_data).model_dump()]
+    resumed.close()
+
+
+def test_state_from_another_run_is_discarded(tmp_path: Path):
+    path = tmp_path / "out.state.jsonl"
+    state = CrawlState.open(path, RUN)
+    state.record_queued("1.html")
+    state.close()
+    other = CrawlState.open(path, {**RUN, "extractor": "changed"}, resume=True)
+    assert other.queued == {}
+    other.close()
+    assert CrawlState.open(path, RUN, resume=True).queued == {}
+
+
+def test_resume_skips_completed_pages_without_duplicates(live_settings, fixture_http_server, tmp_path: Path):
+    live_settings.max_concurrency = 1
+    path = tmp_path / "out.state.jsonl"
+    state = CrawlState.open(path, RUN)
+    items = Harvester(live_settings).harvest_iter(WebSource(None), state=state)
+    first = next(i for i in items if isinstance(i, Subject))
+    items.close()  # interrupted after the first record
+    state.close()
+    assert first.lecture_code == "10000100"
+
+    fixture_http_server.requests.clear()
+    resumed = CrawlState.open(path, RUN, resume=True)
+    harv = Harvester(live_settings)
+    items = list(harv.harvest_iter(WebSource(None), state=resumed))
+    resumed.close()
+    assert [i.lecture_code for i in items if isinstance(i, Subject)] == ["10000100"]
+    assert len([i for i in items if isinstance(i, HarvestError)]) == 5
+    fetched = {p for p, _ in fixture_http_server.requests}
+    assert "/index.html" not in fetched
+    assert "/2025_AA_10000100.html" not in fetched
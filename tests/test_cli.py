@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+
+def _run(args: list[str], cwd: Path) -> subprocess.CompletedProcess[str]:
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    return subprocess.run([sys.executable, *args], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+
+
+def test_import_cli_is_lazy_and_has_no_side_effects(tmp_path: Path):
+    code = "import sys, cli; print(','.join(m for m in ('pandas', 'bs4', 'requests', 'models') if m in sys.modules))"
+    assert _run(["-c", code], tmp_path).stdout.strip() == ""
+    assert [p.name for p in tmp_path.iterdir() if p.name != "__pycache__"] == []
+
+
+def test_help_does_not_touch_filesystem(tmp_path: Path):
+    result = _run(["-m", "cli", "--help"], tmp_path)
+    assert "--mode" in result.stdout
+    assert [p.name for p in tmp_path.iterdir() if p.name != "__pycache__"] == []
+
+
+def test_run_configures_logging_to_output_dir(tmp_path: Path, sample_html_small_dir: Path):
+    _run(["-m", "cli", "--local-dir", str(sample_html_small_dir), "-o", "out/subjects.json"], tmp_path)
+    assert (tmp_path / "out" / "subjects.json").is_file()
+    log = (tmp_path / "output" / "momijiharvester.log").read_text(encoding="utf-8")
+    assert "Harvester finished." in log
+
+
+def test_worker_logs_are_sampled_through_the_parent(tmp_path: Path, sample_html_content_index: str):
+    html_dir = tmp_path / "html"
+    html_dir.mkdir()
+    # Pages without a detail table log one INFO message each, from the worker processes.
+    for i in range(30):
+        (html_dir / f"2025_AA_9000{i:04d}.html").write_text(sample_html_content_index, encoding="utf-8")
+    _run(["-m", "cli", "--local-dir", str(html_dir), "-o", "out/subjects.json", "--workers", "2"], tmp_path)
+    log = (tmp_path / "output" / "momijiharvester.log").read_text(encoding="utf-8")
+    assert log.count("No detail table found") == 5
+    assert "Log sampling: 25 of 30 'no_detail_table' INFO messages suppressed." in log
+    assert log.index("Harvester finished.") < log.index("Log sampling:")
+
+
+def test_resume_with_targets_is_a_usage_error(tmp_path: Path):
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    args = [sys.executable, "-m", "cli", "--mode", "live-full", "--targets", "2025:ja,en", "--resume"]
+    result = subprocess.run(args, cwd=tmp_path, env=env, capture_output=True, text=True, check=False)
+    assert result.returncode == 2
+    assert "cannot be combined with --targets" in result.stderr
+    assert [p.name for p in tmp_path.iterdir() if p.name != "__pycache__"] == []
+
+
+def test_shard_runs_merge_into_one_output(tmp_path: Path, sample_html_small_dir: Path):
+    from sharding import Shard
+
+    for spec in ("1/2", "2/2"):
+        _run(["-m", "cli", "--local-dir", str(sample_html_small_dir), "-o", "out/s.json", "--shard", spec], tmp_path)
+    # The small fixtures hold a single detail page; the other shard writes an empty output.
+    shards = [Shard(1, 2), Shard(2, 2)]
+    outputs = sorted(p.name for p in (tmp_path / "out").glob("s.shard-*-of-2.json"))
+    assert outputs == [s.output_path(Path("s.json")).name for s in shards]
+
+    args = ["-m", "cli", "merge", "-o", "out/s.json"]
+    with pytest.raises(subprocess.CalledProcessError):
+        _run([*args, str(shards[0].output_path(Path("out/s.json")))], tmp_path)
+    result = _run([*args, *(str(s.output_path(Path("out/s.json"))) for s in shards)], tmp_path)
+    assert "Merged 1 subjects" in result.stdout
+    assert (tmp_path / "out" / "s.csv").is_file()
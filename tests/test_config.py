@@ -0,0 +1,26 @@
+import logging
+
+import config
+
+
+def _record(msg: str, key: str | None = None, level: int = logging.INFO) -> logging.LogRecord:
+    record = logging.LogRecord("config", level, __file__, 0, msg, None, None)
+    if key is not None:
+        record.__dict__.update(config.sampled(key))
+    return record
+
+
+def test_log_sampler_passes_a_burst_then_samples_per_key():
+    sampler = config.LogSampler(burst=3, every=10)
+    records = [_record(f"page {i}\ntraceback", "no_table") for i in range(1, 26)]
+    passed = [r.getMessage() for r in records if sampler.filter(r)]
+    assert passed[:2] == ["page 1\ntraceback", "page 2\ntraceback"]
+    assert passed[2] == "page 3 (further 'no_table' messages are sampled)\ntraceback"
+    assert passed[3:] == [
+        "page 13 (13 'no_table' messages so far)\ntraceback",
+        "page 23 (23 'no_table' messages so far)\ntraceback",
+    ]
+    # Messages without a key and other keys / levels are counted separately.
+    assert sampler.filter(_record("plain"))
+    assert sampler.filter(_record("fetch", "fetch_error", logging.ERROR))
+    assert sampler.summary() == ["Log sampling: 20 of 25 'no_table' INFO messages suppressed."]
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+import pytest
+
+from fetcher import FetchError
+from harvester import Harvester, HarvestTarget, MultiWebSource, WebSource
+
+
+def test_harvest_from_web_discovers_detail_pages(live_settings):
+    harv = Harvester(live_settings)
+    subjects = harv.harvest_from_web(None)
+    assert [s.lecture_code for s in subjects] == ["10000100"]
+    # 2025_AA.html links six detail pages; only one of them exists in the fixtures
+    assert len(harv.errors) == 5
+    assert all(e.error_type == "FetchError" for e in harv.errors)
+
+
+def test_crawler_skips_duplicate_urls(live_settings):
+    harv = Harvester(live_settings)
+    subjects = harv.harvest_from_web(["2025_AA_10000100", "2025_AA_10000100.html", "10000100"])
+    assert [s.lecture_code for s in subjects] == ["10000100"]
+    assert harv.errors == []
+
+
+def test_missing_index_is_an_error_not_an_empty_site(live_settings, serve_directory, tmp_path: Path):
+    site = tmp_path / "site"
+    site.mkdir()
+    live_settings.base_url = serve_directory(site).base_url
+    harv = Harvester(live_settings)
+    with pytest.raises(FetchError, match="index.html"):
+        list(harv.harvest_iter(WebSource(None)))
+    # merge_crawls passes the error on as well.
+    with pytest.raises(FetchError, match="index.html"):
+        list(harv.harvest_iter(MultiWebSource([HarvestTarget(2025)])))
@@ -4,8 +4,17 @@ import logging
 import pytest
 from bs4 import BeautifulSoup
 
-from extractors import HeaderMismatchError, extract_headers, extract_subject_data, validate_headers
-from models import Subject
+import extractors
+from extractors import (
+    HeaderMismatchError,
+    check_header_layout,
+    extract_headers,
+    extract_subject_data,
+    header_signature,
+    validate_headers,
+)
+from metrics import METRICS
+from models import JOINED_FIELDS, Subject
 
 # --- Test extract_headers ---
 
@@ -50,6 +59,27 @@ def test_validate_headers_missing(headers_with_missing: list[str], caplog):
     assert "WARNING" in caplog.text
 
 
+def test_check_header_layout_validates_each_signature_once(valid_headers: list[str], caplog, monkeypatch):
+    monkeypatch.setattr(extractors, "_VALIDATED_LAYOUTS", {})
+    METRICS.reset()
+    caplog.set_level(logging.INFO)
+    signature = check_header_layout(valid_headers, "a.html")
+    assert check_header_layout(valid_headers, "b.html") == signature == header_signature(valid_headers)
+    assert caplog.text.count("Headers validated successfully") == 1
+    assert METRICS.layouts[signature]["pages"] == 2
+    assert METRICS.layouts[signature]["examples"] == ["a.html", "b.html"]
+    METRICS.reset()
+
+
+def test_check_header_layout_raises_for_every_mismatched_page(headers_with_unexpected: list[str], caplog, monkeypatch):
+    monkeypatch.setattr(extractors, "_VALIDATED_LAYOUTS", {})
+    for name in ("a.html", "b.html"):
+        with pytest.raises(HeaderMismatchError, match=name):
+            check_header_layout(headers_with_unexpected, name)
+    assert caplog.text.count("Unexpected headers found") == 1
+    METRICS.reset()
+
+
 # def test_validate_headers_order_mismatch(headers_with_order_mismatch: list[str], caplog):
 #     """Test header validation with order mismatch (if order validation is enabled)."""
 #     # If order mismatch should raise error or warning, adjust the test accordingly.
@@ -138,3 +168,26 @@ def test_extract_subject_data_header_mismatch(sample_html_content_aa10000100: st
 
     with pytest.raises(HeaderMismatchError):
         extract_subject_data(temp_html, "header_mismatch_test")
+
+
+# --- Test FIELD_PLAN ---
+
+
+def test_field_plan_resolves_header_variants():
+    from extractors import COERCE_STR, FIELD_PLAN
+
+    assert FIELD_PLAN.lookup["年度"] == ("year", COERCE_STR, 0)
+    # AliasChoices and <br> variants resolve to the same field
+    assert FIELD_PLAN.lookup["履修上の注意<BR> 受講条件等"][0] == "enrollment_notes"
+    assert FIELD_PLAN.lookup["授業の方法<br><BR><br>【詳細情報】"][0] == "lecture_type_detail_1"
+    # Joined fields (e.g. the English page) are not read from the detail table.
+    assert [name for name, _ in FIELD_PLAN.fields] == [n for n in Subject.model_fields if n not in JOINED_FIELDS]
+    assert "英語版" not in FIELD_PLAN.lookup
+
+
+def test_field_plan_prefers_primary_alias(minimal_subject_data: dict):
+    from extractors import FIELD_PLAN, _map_fields
+
+    raw = {"授業で使用する メディア・機器等": "secondary", "授業で使用するメディア・機器等": "primary"}
+    assert _map_fields(raw, FIELD_PLAN)["media_equipment"] == "primary"
+    assert _map_fields({}, FIELD_PLAN)["overview"] == ""
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from fetcher import AsyncFetcher, FetchError
+from harvester import Harvester
+
+
+def test_fetcher_reuses_connections(fixture_http_server):
+    base = fixture_http_server.base_url
+
+    async def run() -> list[str]:
+        async with AsyncFetcher(max_concurrency=1) as fetcher:
+            return [await fetcher.fetch(f"{base}2025_AA_10000100.html") for _ in range(3)]
+
+    bodies = asyncio.run(run())
+    assert all("講義コード" in b for b in bodies)
+    # All three requests should have gone over a single keep-alive connection
+    assert fixture_http_server.connections == 1
+
+
+def test_fetcher_raises_on_missing_page(fixture_http_server):
+    async def run() -> str:
+        async with AsyncFetcher(max_concurrency=2, retries=0) as fetcher:
+            return await fetcher.fetch(f"{fixture_http_server.base_url}missing.html")
+
+    with pytest.raises(FetchError, match="404"):
+        asyncio.run(run())
+
+
+def test_harvest_from_web_against_local_server(live_settings):
+    harv = Harvester(live_settings)
+    subjects = harv.harvest_from_web(["2025_AA_10000100", "index", "2025_AA_99999999"])
+    assert [s.lecture_code for s in subjects] == ["10000100"]
+    # index has no detail table (skipped); the missing page is reported as a structured error
+    assert len(harv.errors) == 1
+    assert harv.errors[0].source.endswith("2025_AA_99999999.html")
+    assert harv.errors[0].error_type == "FetchError"
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+from extractors import classify_page_links, extract_headers, make_soup, validate_headers
+from harvester import Harvester
+from scripts.benchmark import run_once
+from scripts.generate_corpus import FACULTIES, generate_corpus
+from settings import get_settings
+
+
+def test_generated_pages_extract_to_distinct_subjects(tmp_path: Path):
+    written = generate_corpus(tmp_path, 20, seed=3)
+    subjects = Harvester(get_settings(None)).harvest_from_local(tmp_path)
+    assert len(subjects) == len(written) == 20
+    assert sorted(s.lecture_code for s in subjects) == [f"{20000000 + i:08d}" for i in range(20)]
+    assert len({len(s.overview) for s in subjects}) > 1
+    for path in written:
+        validate_headers(extract_headers(make_soup(path.read_text(encoding="utf-8"))), path.name)
+
+
+def test_generated_listing_pages_link_every_detail_page(tmp_path: Path):
+    written = generate_corpus(tmp_path, 12)
+    listing_links, _ = classify_page_links((tmp_path / "index.html").read_text(encoding="utf-8"))
+    assert len(listing_links) == len(FACULTIES)
+    detail_links = []
+    for page in listing_links:
+        detail_links += classify_page_links((tmp_path / page).read_text(encoding="utf-8"))[1]
+    assert sorted(detail_links) == sorted(p.name for p in written)
+
+
+def test_generate_corpus_is_deterministic(tmp_path: Path):
+    first = [p.read_bytes() for p in generate_corpus(tmp_path / "a", 5, seed=7)]
+    second = [p.read_bytes() for p in generate_corpus(tmp_path / "b", 5, seed=7)]
+    assert first == second
+
+
+def test_benchmark_run_once_reports_both_stages(tmp_path: Path):
+    generate_corpus(tmp_path, 4)
+    harvest, save = run_once(tmp_path, workers=1, parser="html5lib", formats=["jsonl"])
+    assert (harvest["stage"], harvest["records"]) == ("harvest_from_local", 4)
+    assert (save["stage"], save["records"]) == ("save_results", 4)
+    assert harvest["p50_ms"] <= harvest["p99_ms"]
+    assert save["peak_rss_mb"] > 0
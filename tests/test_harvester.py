@@ -1,10 +1,15 @@
 import json
 from pathlib import Path
 
-from harvester import Harvester
-from models import Subject
+import pytest
+
+from analyzer import read_records
+from harvester import Harvester, HarvestTarget, MultiWebSource, SnapshotSource, WebSource, parse_targets
+from models import HarvestError, Subject
 from scripts.validate_json_no_nulls import has_null
 from settings import get_settings
+from snapshots import SnapshotStore
+from writers import OutputFormat
 
 
 def test_save_results_credits_integer(tmp_path: Path, minimal_subject_data: dict):
@@ -49,3 +54,187 @@ def test_harvest_skips_invalid_subjects(tmp_path: Path, minimal_subject_data: di
     # Ensure output JSON does not contain nulls (empty strings are allowed)
     data = json.loads(out.read_text(encoding="utf-8"))
     assert all(not has_null(rec) for rec in data)
+
+
+def test_harvest_from_local_workers_matches_serial(sample_html_small_dir: Path):
+    harv = Harvester(get_settings(None))
+    serial = harv.harvest_from_local(sample_html_small_dir, workers=1)
+    parallel = harv.harvest_from_local(sample_html_small_dir, workers=2)
+    assert [s.lecture_code for s in serial] == ["10000100"]
+    assert [s.model_dump() for s in parallel] == [s.model_dump() for s in serial]
+    assert harv.errors == []
+
+
+def test_harvest_from_local_collects_structured_errors(tmp_path: Path, sample_html_content_aa10000100: str):
+    # a.html is broken (header mismatch); b.html is valid and must still be harvested in order
+    broken = sample_html_content_aa10000100.replace(
+        '<TH class="detail-head" align="center" width="150">年度</TH>',
+        '<TH class="detail-head" align="center" width="150">間違った年度</TH>',
+    )
+    (tmp_path / "a.html").write_text(broken, encoding="utf-8")
+    (tmp_path / "b.html").write_text(sample_html_content_aa10000100, encoding="utf-8")
+    harv = Harvester(get_settings(None))
+    subjects = harv.harvest_from_local(tmp_path, workers=2)
+    assert [s.lecture_code for s in subjects] == ["10000100"]
+    assert len(harv.errors) == 1
+    assert harv.errors[0].source.endswith("a.html")
+    assert harv.errors[0].error_type == "HeaderMismatchError"
+
+
+def test_harvest_iter_yields_subjects_and_errors_in_file_order(tmp_path: Path, sample_html_content_aa10000100: str):
+    broken = sample_html_content_aa10000100.replace(">単位</TH>", ">未知の見出し</TH>")
+    (tmp_path / "a.html").write_text(sample_html_content_aa10000100, encoding="utf-8")
+    (tmp_path / "b.html").write_text(broken, encoding="utf-8")
+    (tmp_path / "c.html").write_text(sample_html_content_aa10000100, encoding="utf-8")
+    harv = Harvester(get_settings(None))
+    items = list(harv.harvest_iter(tmp_path))
+    assert [type(i) for i in items] == [Subject, HarvestError, Subject]
+    assert harv.errors == [items[1]]
+    batches = list(harv.harvest_iter(tmp_path, batch_size=2))
+    assert [len(b) for b in batches] == [2, 1]
+
+
+def test_harvest_iter_web_streams_results(live_settings):
+    harv = Harvester(live_settings)
+    items = list(harv.harvest_iter(WebSource(None)))
+    assert [i.lecture_code for i in items if isinstance(i, Subject)] == ["10000100"]
+    assert len([i for i in items if isinstance(i, HarvestError)]) == len(harv.errors) == 5
+
+
+def test_harvest_iter_web_can_stop_early(live_settings):
+    live_settings.max_concurrency = 1
+    harv = Harvester(live_settings)
+    items = harv.harvest_iter(WebSource(None))
+    first = next(items)
+    items.close()  # stops the crawler thread
+    assert isinstance(first, Subject | HarvestError)
+
+
+def test_save_results_streams_json_like_json_dump(tmp_path: Path, minimal_subject_data: dict):
+    subjects = []
+    for code in ("10000100", "10000101"):
+        data = minimal_subject_data.copy()
+        data["講義コード"] = code
+        subjects.append(Subject(**data))
+    out = tmp_path / "out.json"
+    error = HarvestError(source="x.html", error_type="ValueError", message="boom")
+    assert Harvester(get_settings(None)).save_results(iter([subjects[0], error, subjects[1]]), out) == 2
+    records = json.loads(out.read_text(encoding="utf-8"))
+    assert out.read_text(encoding="utf-8") == json.dumps(records, ensure_ascii=False, indent=2) + "\n"
+    assert [r["lecture_code"] for r in records] == ["10000100", "10000101"]
+    assert out.with_suffix(".csv").read_text(encoding="utf-8").count("\n") == 3
+
+
+@pytest.mark.parametrize("fmt", [OutputFormat.JSON, OutputFormat.JSONL, OutputFormat.PARQUET, OutputFormat.SQLITE])
+def test_interrupted_save_keeps_the_previous_output(tmp_path: Path, minimal_subject_data: dict, fmt: OutputFormat):
+    if fmt == OutputFormat.PARQUET:
+        pytest.importorskip("pyarrow")
+    subjects = [Subject(**{**minimal_subject_data, "講義コード": f"1000010{i}"}) for i in range(3)]
+    out = tmp_path / "out.json"
+    harvester = Harvester(get_settings(None))
+    harvester.save_results(iter(subjects), out, [fmt], timetable=True)
+    before = {p.name: p.read_bytes() for p in tmp_path.iterdir()}
+
+    def interrupted():
+        yield subjects[0]
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        harvester.save_results(interrupted(), out, [fmt], timetable=True)
+    after = {p.name: p.read_bytes() for p in tmp_path.iterdir()}
+    assert after.keys() == before.keys()
+    assert not [name for name in after if name.endswith(".tmp")]
+    if fmt != OutputFormat.SQLITE:  # SQLite upserts in place; its WAL may differ but the data must not.
+        assert after == before
+    assert len(list(read_records(out.with_suffix(f".{fmt.value}")))) == 3
+
+
+def test_parse_targets():
+    assert parse_targets("2025") == (HarvestTarget(2025, "ja"),)
+    assert parse_targets("2024-2025:ja,en") == (
+        HarvestTarget(2024, "en"),
+        HarvestTarget(2024, "ja"),
+        HarvestTarget(2025, "en"),
+        HarvestTarget(2025, "ja"),
+    )
+    for spec in ("2025:en", "2025:fr", "20x5", "2025-2024"):
+        with pytest.raises(ValueError):
+            parse_targets(spec)
+
+
+def _links(*hrefs: str) -> str:
+    return "<html><body>" + "".join(f'<a href="{h}">{h}</a>' for h in hrefs) + "</body></html>"
+
+
+def _build_site(root: Path, detail_html: str) -> None:
+    ja, en = root / "syllabusHtml", root / "syllabusHtml_en"
+    ja.mkdir(parents=True)
+    en.mkdir()
+    (ja / "index.html").write_text(
+        _links("../syllabusHtml_en/index.html", "2023_AA.html", "2024_AA.html", "2025_AA.html"), encoding="utf-8"
+    )
+    (ja / "2023_AA.html").write_text(_links("2023_AA_10000100.html"), encoding="utf-8")
+    (ja / "2024_AA.html").write_text(_links("2024_AA_10000100.html"), encoding="utf-8")
+    (ja / "2025_AA.html").write_text(
+        _links("../syllabusHtml_en/2025_AA_en.html", "2025_AA_10000100.html", "2025_AA_10000101.html"),
+        encoding="utf-8",
+    )
+    (ja / "2024_AA_10000100.html").write_text(detail_html.replace("2025年度", "2024年度"), encoding="utf-8")
+    (ja / "2025_AA_10000100.html").write_text(detail_html, encoding="utf-8")
+    (ja / "2025_AA_10000101.html").write_text(detail_html.replace("10000100", "10000101"), encoding="utf-8")
+    (en / "index.html").write_text(_links("2025_AA_en.html"), encoding="utf-8")
+    (en / "2025_AA_en.html").write_text(_links("2025_AA_10000100_en.html"), encoding="utf-8")
+    english = detail_html.replace(">年度</TH>", ">Academic Year</TH>").replace(">講義コード</TH>", ">Course Code</TH>")
+    (en / "2025_AA_10000100_en.html").write_text(english, encoding="utf-8")
+
+
+def _site_settings(server):
+    settings = get_settings(None)
+    settings.base_url = f"{server.base_url}syllabusHtml/"
+    settings.base_url_en = f"{server.base_url}syllabusHtml_en/"
+    settings.http_cache_dir = None
+    settings.max_concurrency = 2
+    return settings
+
+
+def test_harvest_targets_join_english_pages(tmp_path: Path, serve_directory, sample_html_content_aa10000100: str):
+    _build_site(tmp_path / "site", sample_html_content_aa10000100)
+    server = serve_directory(tmp_path / "site")
+    settings = _site_settings(server)
+    harv = Harvester(settings)
+
+    items = list(harv.harvest_iter(MultiWebSource(parse_targets("2024-2025:ja,en"))))
+    assert harv.errors == []
+    subjects = sorted(items, key=lambda s: (s.year, s.lecture_code))
+    assert [(s.year, s.lecture_code) for s in subjects] == [
+        ("2024年度", "10000100"),
+        ("2025年度", "10000100"),
+        ("2025年度", "10000101"),
+    ]
+    assert subjects[0].english is None
+    assert subjects[1].english is not None
+    assert subjects[1].english["Academic Year"] == "2025年度"
+    assert subjects[1].english["Course Code"] == "10000100"
+    assert subjects[2].english is None
+    # Years outside the targets are not fetched.
+    assert not [path for path, _ in server.requests if "2023" in path]
+    # Both sites share one fetch pool (keep-alive connections bounded by max_concurrency).
+    assert server.connections <= settings.max_concurrency
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_snapshot_replay_of_targets_joins_english_pages(
+    tmp_path: Path, serve_directory, sample_html_content_aa10000100: str, workers: int
+):
+    _build_site(tmp_path / "site", sample_html_content_aa10000100)
+    harv = Harvester(_site_settings(serve_directory(tmp_path / "site")))
+    run = SnapshotStore(tmp_path / "snap").begin_run("targets")
+    live = list(harv.harvest_iter(MultiWebSource(parse_targets("2024-2025:ja,en")), snapshot=run))
+    run.close()
+
+    replayed = list(harv.harvest_iter(SnapshotSource(tmp_path / "snap", run.run_id), workers=workers))
+    assert harv.errors == []
+    assert sorted(replayed, key=lambda s: (s.year, s.lecture_code)) == sorted(
+        live, key=lambda s: (s.year, s.lecture_code)
+    )
+    assert [(s.year, s.lecture_code) for s in replayed if s.english is not None] == [("2025年度", "10000100")]
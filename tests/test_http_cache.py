@@ -0,0 +1,60 @@
+import asyncio
+from pathlib import Path
+
+from fetcher import AsyncFetcher
+from harvester import Harvester
+from http_cache import HttpCache
+
+
+def test_cache_roundtrip_and_conditional_headers(tmp_path: Path):
+    cache = HttpCache(tmp_path)
+    cache.put("http://example.test/a.html", b"body", '"v1"', "Wed, 01 Oct 2025 00:00:00 GMT")
+    entry = cache.get("http://example.test/a.html")
+    assert entry is not None
+    assert entry.body == b"body"
+    assert entry.conditional_headers() == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Wed, 01 Oct 2025 00:00:00 GMT",
+    }
+    cache.close()
+    # Entries persist across instances
+    reopened = HttpCache(tmp_path)
+    assert reopened.get("http://example.test/a.html") is not None
+    assert reopened.get("http://example.test/b.html") is None
+
+
+def test_cache_skips_responses_without_validators(tmp_path: Path):
+    cache = HttpCache(tmp_path)
+    cache.put("http://example.test/a.html", b"body", None, None)
+    assert cache.get("http://example.test/a.html") is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path):
+    cache = HttpCache(tmp_path, max_bytes=25)
+    for name in ("a", "b"):
+        cache.put(f"http://example.test/{name}", b"x" * 10, f'"{name}"', None)
+    cache.touch("http://example.test/a")
+    cache.put("http://example.test/c", b"x" * 10, '"c"', None)
+    assert cache.get("http://example.test/b") is None
+    assert cache.get("http://example.test/a") is not None
+    assert cache.get("http://example.test/c") is not None
+    assert cache.total_bytes == 20
+
+
+def test_fetcher_revalidates_with_conditional_get(fixture_http_server, tmp_path: Path):
+    url = f"{fixture_http_server.base_url}2025_AA_10000100.html"
+
+    async def run() -> list[str]:
+        async with AsyncFetcher(max_concurrency=1, cache=HttpCache(tmp_path)) as fetcher:
+            return [await fetcher.fetch(url) for _ in range(2)]
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert [status for _, status in fixture_http_server.requests] == [200, 304]
+
+
+def test_second_live_run_is_served_from_cache(live_settings, fixture_http_server):
+    first = Harvester(live_settings).harvest_from_web(["2025_AA_10000100"])
+    second = Harvester(live_settings).harvest_from_web(["2025_AA_10000100"])
+    assert [s.model_dump() for s in second] == [s.model_dump() for s in first]
+    assert [status for _, status in fixture_http_server.requests] == [200, 304]
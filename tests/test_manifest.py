@@ -0,0 +1,90 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+import harvester as harvester_module
+from harvester import Harvester
+from manifest import Manifest, content_hash
+from settings import get_settings
+
+
+@pytest.fixture
+def html_dir(tmp_path: Path, sample_html_small_dir: Path) -> Path:
+    target = tmp_path / "html"
+    shutil.copytree(sample_html_small_dir, target)
+    return target
+
+
+def _harvest(html_dir: Path, manifest_path: Path, version: str = "test") -> tuple[list, Manifest]:
+    manifest = Manifest.load(manifest_path, version=version)
+    subjects = Harvester(get_settings(None)).harvest_from_local(html_dir, manifest=manifest)
+    manifest.save()
+    return subjects, manifest
+
+
+def _fail_extraction(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("extract_subject_data should not be called for unchanged files")
+
+    monkeypatch.setattr(harvester_module, "extract_subject_data", fail)
+
+
+def test_unchanged_files_reuse_manifest_records(html_dir: Path, tmp_path: Path, monkeypatch):
+    manifest_path = Manifest.path_for(tmp_path / "out.json")
+    first, _ = _harvest(html_dir, manifest_path)
+    _fail_extraction(monkeypatch)
+    second, _ = _harvest(html_dir, manifest_path)
+    assert [s.model_dump() for s in second] == [s.model_dump() for s in first]
+
+
+def test_changed_file_is_reextracted(html_dir: Path, tmp_path: Path, monkeypatch):
+    manifest_path = Manifest.path_for(tmp_path / "out.json")
+    _harvest(html_dir, manifest_path)
+    detail = html_dir / "2025_AA_10000100.html"
+    detail.write_text(detail.read_text(encoding="utf-8").replace("林　光緒", "林　太郎"), encoding="utf-8")
+    calls: list[str] = []
+    original = harvester_module.extract_subject_data
+
+    def counting(html, ident, *args, **kwargs):
+        calls.append(ident)
+        return original(html, ident, *args, **kwargs)
+
+    monkeypatch.setattr(harvester_module, "extract_subject_data", counting)
+    subjects, _ = _harvest(html_dir, manifest_path)
+    assert calls == ["2025_AA_10000100.html"]
+    assert subjects[0].instructor_name == "林 太郎"
+
+
+def test_version_bump_invalidates_manifest(html_dir: Path, tmp_path: Path):
+    manifest_path = Manifest.path_for(tmp_path / "out.json")
+    _harvest(html_dir, manifest_path, version="1")
+    manifest = Manifest.load(manifest_path, version="2")
+    assert not manifest.is_unchanged("2025_AA_10000100.html", "anything")
+    assert Manifest.load(manifest_path, version="1")._previous.keys() == {
+        "2025_AA.html",
+        "2025_AA_10000100.html",
+        "index.html",
+    }
+
+
+def test_each_file_is_read_once_with_a_manifest(html_dir: Path, tmp_path: Path, monkeypatch):
+    reads: list[str] = []
+    read_bytes, read_text = Path.read_bytes, Path.read_text
+
+    def counting_bytes(self):
+        reads.append(self.name)
+        return read_bytes(self)
+
+    def counting_text(self, *args, **kwargs):
+        reads.append(self.name)
+        return read_text(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "read_bytes", counting_bytes)
+    monkeypatch.setattr(Path, "read_text", counting_text)
+    subjects, manifest = _harvest(html_dir, Manifest.path_for(tmp_path / "out.json"))
+    html_files = sorted(p.name for p in html_dir.glob("*.html"))
+    assert sorted(r for r in reads if r.endswith(".html")) == html_files
+    assert [s.lecture_code for s in subjects] == ["10000100"]
+    detail = html_dir / "2025_AA_10000100.html"
+    assert manifest._current[detail.name]["sha256"] == content_hash(read_bytes(detail))
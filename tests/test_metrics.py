@@ -0,0 +1,126 @@
+import json
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from harvester import Harvester
+from metrics import METRICS, Histogram, Metrics
+from settings import get_settings
+from writers import OutputFormat
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    METRICS.reset()
+    yield
+    METRICS.reset()
+
+
+def test_histogram_buckets_are_upper_bounds():
+    hist = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        hist.observe(value)
+    assert hist.counts == [2, 1, 1]
+    assert hist.count == 4
+    assert hist.sum == pytest.approx(3.65)
+
+
+def test_drain_and_merge_round_trip():
+    worker = Metrics()
+    worker.inc("pages_parsed", 2)
+    worker.observe("parse_html", 0.01)
+    parent = Metrics()
+    parent.inc("pages_parsed")
+    parent.merge(worker.drain())
+    parent.merge(json.loads(json.dumps(parent.to_dict())))
+    assert worker.to_dict() == {"counters": {}, "durations": {}, "header_layouts": {}}
+    assert parent.counters == {"pages_parsed": 6}
+    assert parent.durations["parse_html"].count == 2
+
+
+def test_updates_from_several_threads_are_not_lost():
+    # Switch threads as often as possible so unlocked read-modify-write updates would interleave.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    m = Metrics()
+
+    def work():
+        for _ in range(5000):
+            m.inc("pages_read")
+            m.observe("read_file", 0.001)
+        m.merge({"counters": {"pages_read": 1}})
+
+    try:
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert m.counters["pages_read"] == 4 * 5001
+    assert m.durations["read_file"].count == 4 * 5000
+
+
+def test_prometheus_histogram_is_cumulative():
+    m = Metrics()
+    m.observe("read_file", 0.0001)
+    m.observe("read_file", 20.0)
+    text = m.to_prometheus()
+    assert "# TYPE momiji_stage_duration_seconds histogram" in text
+    assert 'momiji_stage_duration_seconds_bucket{stage="read_file",le="0.0005"} 1' in text
+    assert 'momiji_stage_duration_seconds_bucket{stage="read_file",le="10.0"} 1' in text
+    assert 'momiji_stage_duration_seconds_bucket{stage="read_file",le="+Inf"} 2' in text
+    assert 'momiji_stage_duration_seconds_count{stage="read_file"} 2' in text
+    # Every known counter is exported, even when it stayed at zero.
+    assert "momiji_header_mismatches_total 0" in text
+
+
+def _corpus_with_failures(tmp_path: Path, sample_html_small_dir: Path, html: str) -> Path:
+    html_dir = tmp_path / "html"
+    shutil.copytree(sample_html_small_dir, html_dir)
+    (html_dir / "2025_AA_90000001.html").write_text(html.replace(">単位</TH>", ">未知の見出し</TH>"), encoding="utf-8")
+    (html_dir / "2025_AA_90000002.html").write_text(html.replace("2.0 </TD>", "二 </TD>"), encoding="utf-8")
+    return html_dir
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_harvest_counts_pages_by_outcome(
+    tmp_path: Path, sample_html_small_dir: Path, sample_html_content_aa10000100: str, workers: int
+):
+    html_dir = _corpus_with_failures(tmp_path, sample_html_small_dir, sample_html_content_aa10000100)
+    harv = Harvester(get_settings(None))
+    count = harv.save_results(harv.iter_local(html_dir, workers=workers), tmp_path / "out.json", [OutputFormat.JSON])
+
+    assert count == 1
+    assert METRICS.counters == {
+        "pages_read": 5,
+        "pages_parsed": 1,
+        "pages_skipped": 2,
+        "header_mismatches": 1,
+        "validation_failures": 1,
+        "extraction_errors": 2,
+        "records_written": 1,
+    }
+    assert METRICS.durations["read_file"].count == 5
+    assert METRICS.durations["parse_html"].count == 5
+    assert METRICS.durations["validate_model"].count == 2
+    assert METRICS.durations["write_records"].count == 1
+    # The two pages with canonical headers share one layout; the renamed header makes a second one.
+    layouts = sorted(METRICS.layouts.values(), key=lambda layout: -layout["pages"])
+    assert [(layout["pages"], layout["unexpected"]) for layout in layouts] == [(2, []), (1, ["未知の見出し"])]
+    report = METRICS.drift_report()
+    assert len(report) == 2
+    assert "MISMATCH" in report[1] and "2025_AA_90000001.html" in report[1]
+
+
+def test_write_dumps_json_and_prometheus_files(tmp_path: Path):
+    METRICS.inc("pages_parsed", 3)
+    json_path, prom_path = METRICS.write(tmp_path / "syllabus.json")
+    assert json_path.name == "syllabus.metrics.json"
+    assert json.loads(json_path.read_text(encoding="utf-8"))["counters"] == {"pages_parsed": 3}
+    assert "momiji_pages_parsed_total 3" in prom_path.read_text(encoding="utf-8")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["syllabus.metrics.json", "syllabus.prom"]
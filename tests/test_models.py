@@ -44,3 +44,38 @@ def test_list_field_parsing(minimal_subject_data: dict):
     s2 = Subject(**minimal2)
     assert isinstance(s2.media_equipment, str)
     assert "moodle" in s2.media_equipment
+
+
+def test_validate_subjects_matches_per_record(minimal_subject_data: dict):
+    from models import validate_subjects
+
+    records = []
+    for code, credits in (("10000100", "2.0"), ("10000101", "(1)")):
+        data = minimal_subject_data.copy()
+        data.update({"講義コード": code, "単位": credits, "授業のキーワード": "a、b"})
+        records.append(data)
+    batch = validate_subjects(records)
+    assert [s.model_dump() for s in batch] == [Subject(**r).model_dump() for r in records]
+    assert batch[1].credits == 1
+    assert batch[0].keywords == "a, b"
+
+
+def test_validate_subjects_reports_failing_index(minimal_subject_data: dict):
+    from pydantic import ValidationError
+
+    from models import validate_subjects
+
+    bad = minimal_subject_data.copy()
+    bad["単位"] = 1.5
+    with pytest.raises(ValidationError) as excinfo:
+        validate_subjects([minimal_subject_data, bad])
+    assert excinfo.value.errors()[0]["loc"][0] == 1
+
+
+def test_dumped_record_validates_back_unchanged(minimal_subject_data: dict):
+    # Manifest and checkpoint reuse rely on this instead of skipping validation.
+    subject = Subject(**{**minimal_subject_data, "単位": "2.0", "授業のキーワード": "a、b"})
+    record = subject.model_dump(mode="json")
+    restored = Subject.model_validate(record)
+    assert restored.model_dump() == subject.model_dump()
+    assert list(restored.model_dump()) == list(Subject.model_fields)
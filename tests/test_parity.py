@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import pytest
+
+import parity
+from extractors import extract_subject_data, make_soup
+from harvester import Harvester
+from models import Subject
+from parity import compare_parsers, iter_html_dir
+from settings import get_settings
+
+
+def test_make_soup_rejects_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown HTML parser backend"):
+        make_soup("<html></html>", "nonexistent")
+
+
+def test_lxml_backend_matches_html5lib(sample_html_small_dir: Path):
+    pytest.importorskip("lxml")
+    assert list(compare_parsers(iter_html_dir(sample_html_small_dir), "html5lib", "lxml")) == []
+
+
+def test_harvest_with_lxml_backend(sample_html_small_dir: Path):
+    pytest.importorskip("lxml")
+    settings = get_settings(None)
+    settings.html_parser = "lxml"
+    subjects = Harvester(settings).harvest_from_local(sample_html_small_dir)
+    assert [s.lecture_code for s in subjects] == ["10000100"]
+
+
+def test_compare_parsers_reports_field_differences(sample_html_content_aa10000100: str, monkeypatch):
+    def fake_extract(html: str, source: str, parser: str) -> Subject | None:
+        subject = extract_subject_data(html, source, parser="html5lib")
+        if parser == "candidate" and subject is not None:
+            return subject.model_copy(update={"plan": "changed"})
+        return subject
+
+    monkeypatch.setattr(parity, "_extract", fake_extract)
+    diffs = list(compare_parsers([("page.html", sample_html_content_aa10000100)], "baseline", "candidate"))
+    assert [(d.source, d.field, d.candidate) for d in diffs] == [("page.html", "plan", "changed")]
@@ -0,0 +1,113 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from models import Subject
+from service import QueryError, QueryServer, SubjectIndex, SubjectService
+from writers import JsonCsvWriter
+
+
+def _write_output(path: Path, minimal_subject_data: dict, rows: list[tuple[str, str, str]]) -> None:
+    with JsonCsvWriter(path, write_csv=False) as writer:
+        for code, faculty, instructor in rows:
+            data = {**minimal_subject_data, "講義コード": code, "開講部局": faculty, "担当教員名": instructor}
+            writer.write(Subject(**data))
+
+
+ROWS = [
+    ("10000100", "文学部", "林 光緒"),
+    ("10000200", "文学部", "林 光緒、山田 太郎"),
+    ("20000100", "理学部", "山田 太郎"),
+]
+
+
+def test_index_search(tmp_path: Path, minimal_subject_data: dict):
+    out = tmp_path / "data.json"
+    _write_output(out, minimal_subject_data, ROWS)
+    index = SubjectIndex.load(out)
+    assert len(index) == 3
+
+    def codes(ids: list[int]) -> list[str]:
+        return [json.loads(index.records[i])["lecture_code"] for i in ids]
+
+    assert codes(index.search({"faculty": "文学部"})) == ["10000100", "10000200"]
+    # Instructors are indexed one by one; several values of a field are OR, several fields are AND.
+    assert codes(index.search({"instructor_name": "山田 太郎"})) == ["10000200", "20000100"]
+    assert codes(index.search({"faculty": ["理学部", "文学部"], "instructor_name": ["山田 太郎"]})) == [
+        "10000200",
+        "20000100",
+    ]
+    assert index.search({"faculty": "文学部", "lecture_code": "20000100"}) == []
+    assert codes(index.search({})) == [code for code, _, _ in ROWS]
+    assert index.values("faculty") == ["文学部", "理学部"]
+    with pytest.raises(QueryError, match="Unknown field"):
+        index.search({"overview": "x"})
+
+
+def test_service_reloads_a_rewritten_output(tmp_path: Path, minimal_subject_data: dict):
+    out = tmp_path / "data.json"
+    _write_output(out, minimal_subject_data, ROWS[:1])
+    service = SubjectService(out)
+    assert service.query({"faculty": "理学部"}).total == 0
+
+    _write_output(out, minimal_subject_data, ROWS)
+    # The first check sees the change, the second (file unchanged since) reloads.
+    assert not service.check_reload()
+    assert service.check_reload()
+    result = service.query({"faculty": "理学部", "limit": "10"})
+    assert (result.total, result.count) == (1, 1)
+    assert json.loads(result.body)["results"][0]["lecture_code"] == "20000100"
+
+    # A half-written file keeps the previous index.
+    out.write_text('[\n  {"lecture_code": ', encoding="utf-8")
+    assert not service.check_reload()
+    assert not service.check_reload()
+    assert len(service.index) == 3
+    stats = service.stats()
+    assert (stats["subjects"], stats["reloads"], stats["queries"]) == (3, 1, 2)
+
+
+@pytest.fixture
+def query_server(tmp_path: Path, minimal_subject_data: dict) -> Iterator[QueryServer]:
+    out = tmp_path / "data.json"
+    _write_output(out, minimal_subject_data, ROWS)
+    server = QueryServer(SubjectService(out), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _get(url: str, data: bytes | None = None) -> tuple[dict, dict]:
+    with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=5) as response:
+        return json.loads(response.read()), dict(response.headers)
+
+
+def test_http_queries(query_server: QueryServer):
+    body, headers = _get(f"{query_server.url}query?faculty=%E6%96%87%E5%AD%A6%E9%83%A8&limit=1")
+    assert (body["total"], body["count"]) == (2, 1)
+    assert body["results"][0]["lecture_code"] == "10000100"
+    assert float(headers["X-Query-Time-Ms"]) == body["took_ms"]
+
+    query = {"instructor_name": "山田 太郎", "offset": 1}
+    body, _ = _get(f"{query_server.url}query", json.dumps(query).encode("utf-8"))
+    assert [r["lecture_code"] for r in body["results"]] == ["20000100"]
+    body, _ = _get(f"{query_server.url}subjects/10000200")
+    assert body["results"][0]["instructor_name"] == "林 光緒、山田 太郎"
+
+    stats, _ = _get(f"{query_server.url}stats")
+    assert stats["queries"] == 3
+    assert stats["mean_query_ms"] is not None
+
+    for url, status in ((f"{query_server.url}query?overview=x", 400), (f"{query_server.url}nothing", 404)):
+        with pytest.raises(urllib.error.HTTPError) as e:
+            _get(url)
+        assert e.value.code == status
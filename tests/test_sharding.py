@@ -0,0 +1,126 @@
+import csv
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from harvester import Harvester
+from settings import get_settings
+from sharding import Shard, ShardError, merge_shards, shard_key
+from writers import CSV_COLUMNS, OutputFormat, serialize_subject
+
+CODES = [f"9000{i:04d}" for i in range(12)]
+
+
+def _corpus(tmp_path: Path, sample_html_small_dir: Path, detail_html: str) -> Path:
+    html_dir = tmp_path / "html"
+    html_dir.mkdir()
+    for p in sample_html_small_dir.glob("*.html"):
+        (html_dir / p.name).write_bytes(p.read_bytes())
+    for code in CODES:
+        (html_dir / f"2025_AA_{code}.html").write_text(detail_html.replace("10000100", code), encoding="utf-8")
+    return html_dir
+
+
+def _harvest_shards(html_dir: Path, out: Path, count: int) -> list[Path]:
+    harv = Harvester(get_settings(None))
+    paths = []
+    for index in range(1, count + 1):
+        shard = Shard(index, count)
+        # Mix output formats across shards; merge reads any of them.
+        fmt = OutputFormat.JSONL if index % 2 else OutputFormat.JSON
+        shard_out = shard.output_path(out)
+        harv.save_results(harv.harvest_iter(html_dir, shard=shard), shard_out, [fmt])
+        paths.append(shard_out.with_suffix(".jsonl") if fmt == OutputFormat.JSONL else shard_out)
+    return paths
+
+
+def test_shards_partition_pages():
+    shards = [Shard.parse(f"{i}/4") for i in range(1, 5)]
+    for code in CODES:
+        owners = [s for s in shards if s.owns(f"2025_AA_{code}.html")]
+        assert len(owners) == 1
+        # Files, archive members and URLs of the same page go to the same shard.
+        assert owners[0].owns(f"https://example.com/syllabusHtml/2025_AA_{code}.html")
+        assert owners[0].owns(f"2024_BB_{code}_en.html")
+    assert shard_key("snapshot/index.html") == "index.html"
+    assert Shard.from_output(Shard(2, 4).output_path(Path("out/data.json"))) == Shard(2, 4)
+    assert Shard.from_output(Path("out/data.json")) is None
+    for spec in ("0/4", "5/4", "2", "a/b"):
+        with pytest.raises(ShardError):
+            Shard.parse(spec)
+
+
+def test_merged_shards_match_a_full_run(tmp_path: Path, sample_html_small_dir: Path, sample_html_content_aa10000100):
+    html_dir = _corpus(tmp_path, sample_html_small_dir, sample_html_content_aa10000100)
+    full = sorted(Harvester(get_settings(None)).iter_local(html_dir), key=lambda s: s.lecture_code)
+    shard_files = _harvest_shards(html_dir, tmp_path / "out" / "data.json", 3)
+
+    merged = tmp_path / "merged.json"
+    summary = merge_shards(shard_files, merged)
+    assert summary.records == len(full) == len(CODES) + 1
+    assert [str(s) for s in summary.shards] == ["1/3", "2/3", "3/3"]
+    records = json.loads(merged.read_text(encoding="utf-8"))
+    assert records == [serialize_subject(s) for s in full]
+    with merged.with_suffix(".csv").open(encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        assert reader.fieldnames == CSV_COLUMNS
+        assert [row["lecture_code"] for row in reader] == sorted(["10000100", *CODES])
+
+
+def test_merge_detects_missing_and_overlapping_shards(
+    tmp_path: Path, sample_html_small_dir: Path, sample_html_content_aa10000100
+):
+    html_dir = _corpus(tmp_path, sample_html_small_dir, sample_html_content_aa10000100)
+    first, second, third = _harvest_shards(html_dir, tmp_path / "out" / "data.json", 3)
+    merged = tmp_path / "merged.json"
+
+    with pytest.raises(ShardError, match="Missing shards: 2/3"):
+        merge_shards([first, third], merged)
+    summary = merge_shards([first, third], merged, allow_missing=True)
+    assert summary.missing == [2]
+
+    copy = first.with_name(first.name.replace("data.", "copy."))
+    shutil.copy(first, copy)
+    with pytest.raises(ShardError, match="Overlapping shards"):
+        merge_shards([first, second, third, copy], merged)
+
+    # A shard output relabeled as another shard repeats that shard's records.
+    relabeled = tmp_path / Shard(2, 3).output_path(Path("data.jsonl")).name
+    shutil.copy(first, relabeled)
+    with pytest.raises(ShardError, match=r"\(2025年度\) is in"):
+        merge_shards([first, relabeled, third], merged)
+
+    other_split = tmp_path / Shard(1, 2).output_path(Path("data.jsonl")).name
+    shutil.copy(first, other_split)
+    with pytest.raises(ShardError, match="different splits"):
+        merge_shards([other_split, second, third], merged)
+
+
+def test_merge_accepts_pages_not_named_by_lecture_code(tmp_path: Path, sample_html_content_aa10000100):
+    # Such pages are assigned to shards by file name, not by the lecture code inside.
+    html_dir = tmp_path / "html"
+    html_dir.mkdir()
+    for i, code in enumerate(CODES):
+        (html_dir / f"page{i}.html").write_text(sample_html_content_aa10000100.replace("10000100", code), "utf-8")
+    shard_files = _harvest_shards(html_dir, tmp_path / "out" / "data.json", 3)
+    summary = merge_shards(shard_files, tmp_path / "merged.json")
+    assert summary.records == len(CODES)
+
+
+def test_empty_shard_writes_an_empty_output(tmp_path: Path, sample_html_small_dir: Path):
+    harv = Harvester(get_settings(None))
+    # The small fixtures hold a single detail page, so one of two shards owns no subject.
+    empty = next(s for s in (Shard(1, 2), Shard(2, 2)) if not s.owns("2025_AA_10000100.html"))
+    full = Shard(3 - empty.index, 2)
+    outputs = []
+    for shard in (empty, full):
+        out = shard.output_path(tmp_path / "data.json")
+        harv.save_results(harv.harvest_iter(sample_html_small_dir, shard=shard), out, create_empty=True)
+        outputs.append(out)
+    assert json.loads(outputs[0].read_text(encoding="utf-8")) == []
+    with outputs[0].with_suffix(".csv").open(encoding="utf-8", newline="") as f:
+        assert next(csv.reader(f)) == CSV_COLUMNS
+    summary = merge_shards(outputs, tmp_path / "merged.json")
+    assert (summary.records, summary.missing) == (1, [])
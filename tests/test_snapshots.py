@@ -0,0 +1,56 @@
+from pathlib import Path
+
+from harvester import Harvester, SnapshotSource, WebSource
+from models import Subject
+from settings import get_settings
+from snapshots import SnapshotStore, train_dictionary
+
+
+def test_train_dictionary_keeps_common_lines_most_common_last():
+    samples = [b"<html>\n<p>a</p>\n</html>\n", b"<html>\n<p>b</p>\n</html>\n", b"<html>\n<p>c</p>\n"]
+    zdict = train_dictionary(samples)
+    assert zdict.endswith(b"<html>\n")
+    assert b"</html>\n" in zdict
+    assert b"<p>" not in zdict
+
+
+def test_store_dedups_and_round_trips_with_dictionary(tmp_path: Path, sample_html_small_dir: Path):
+    pages = {p.name: p.read_bytes() for p in sorted(sample_html_small_dir.glob("*.html"))}
+    store = SnapshotStore(tmp_path / "snap", train_after=2)
+    run = store.begin_run("test")
+    for name, data in pages.items():
+        run.add(name, data)
+    run.add("copy.html", pages["index.html"])  # same content, another URL
+    run.close()
+
+    objects = [p for p in (tmp_path / "snap" / "objects").rglob("*") if p.is_file()]
+    assert len(objects) == len(pages)
+    assert run.new_objects == len(pages)
+    assert len(list((tmp_path / "snap" / "dicts").iterdir())) == 1
+
+    # A new store instance picks up the trained dictionary.
+    reopened = SnapshotStore(tmp_path / "snap")
+    assert reopened.runs() == [run.run_id]
+    assert dict(reopened.iter_run()) == {**pages, "copy.html": pages["index.html"]}
+
+
+def test_reextract_local_harvest_from_snapshot(tmp_path: Path, sample_html_small_dir: Path):
+    harv = Harvester(get_settings(None))
+    run = SnapshotStore(tmp_path / "snap").begin_run("local")
+    original = list(harv.harvest_iter(sample_html_small_dir, snapshot=run))
+    run.close()
+    again = list(harv.harvest_iter(SnapshotSource(tmp_path / "snap")))
+    assert [s.model_dump() for s in again] == [s.model_dump() for s in original]
+
+
+def test_live_pages_are_snapshotted_and_reextracted_offline(live_settings, fixture_http_server, tmp_path: Path):
+    harv = Harvester(live_settings)
+    run = SnapshotStore(tmp_path / "snap").begin_run("live")
+    live = [i for i in harv.harvest_iter(WebSource(["2025_AA_10000100"]), snapshot=run) if isinstance(i, Subject)]
+    run.close()
+    assert run.pages == 1
+
+    fixture_http_server.requests.clear()
+    replayed = list(harv.harvest_iter(SnapshotSource(tmp_path / "snap", run.run_id)))
+    assert [s.model_dump() for s in replayed] == [s.model_dump() for s in live]
+    assert fixture_http_server.requests == []
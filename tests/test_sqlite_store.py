@@ -0,0 +1,59 @@
+import sqlite3
+from pathlib import Path
+
+from harvester import Harvester
+from models import Subject
+from settings import get_settings
+from sqlite_store import SqliteWriter, search
+from writers import OutputFormat
+
+
+def _subject(minimal_subject_data: dict, code: str, overrides: dict[str, str] | None = None) -> Subject:
+    data = minimal_subject_data.copy()
+    data["講義コード"] = code
+    data.update(overrides or {})
+    return Subject(**data)
+
+
+def test_sqlite_writer_upserts_by_lecture_code_and_year(tmp_path: Path, minimal_subject_data: dict):
+    out = tmp_path / "out.json"
+    with SqliteWriter(out) as writer:
+        writer.write(_subject(minimal_subject_data, "10000100", {"授業計画": "初版"}))
+        writer.write(_subject(minimal_subject_data, "10000101"))
+        writer.write(_subject(minimal_subject_data, "10000100", {"授業計画": "改訂版"}))
+
+    conn = sqlite3.connect(out.with_suffix(".sqlite"))
+    rows = conn.execute("SELECT lecture_code, plan, credits FROM subjects ORDER BY lecture_code").fetchall()
+    assert rows == [("10000100", "改訂版", 2), ("10000101", "", 2)]
+    indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"subjects_faculty", "subjects_term", "subjects_instructor_name"} <= indexes
+    conn.close()
+
+
+def test_search_japanese_text(tmp_path: Path, minimal_subject_data: dict):
+    out = tmp_path / "out.json"
+    Harvester(get_settings(None)).save_results(
+        [
+            _subject(minimal_subject_data, "10000100", {"授業の目標・概要等": "大学での学びの方法を理解する"}),
+            _subject(minimal_subject_data, "10000101", {"授業のキーワード": "留学, キャリアデザイン"}),
+        ],
+        out,
+        [OutputFormat.SQLITE],
+    )
+    db = out.with_suffix(".sqlite")
+    assert [r["lecture_code"] for r in search(db, "学びの方法")] == ["10000100"]
+    assert [r["lecture_code"] for r in search(db, "キャリア")] == ["10000101"]
+    # Two-character queries fall back to a LIKE scan
+    assert [r["lecture_code"] for r in search(db, "留学")] == ["10000101"]
+    assert search(db, "存在しない語句") == []
+
+
+def test_search_after_upsert_reflects_new_text(tmp_path: Path, minimal_subject_data: dict):
+    out = tmp_path / "out.json"
+    with SqliteWriter(out) as writer:
+        writer.write(_subject(minimal_subject_data, "10000100", {"授業計画": "古い計画"}))
+    with SqliteWriter(out) as writer:
+        writer.write(_subject(minimal_subject_data, "10000100", {"授業計画": "新しい計画"}))
+    db = out.with_suffix(".sqlite")
+    assert search(db, "古い計画") == []
+    assert [r["lecture_code"] for r in search(db, "新しい計画")] == ["10000100"]
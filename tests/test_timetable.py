@@ -0,0 +1,79 @@
+from pathlib import Path
+
+from harvester import Harvester
+from models import Subject
+from settings import get_settings
+from timetable import Slot, TimetableIndex, parse_day_time_room, term_quarters, timetable_path
+
+
+def test_parse_day_time_room():
+    assert parse_day_time_room("(1T) 水1-4：詳細はもみじ教養HP参照(東広島開講)", "10000100", "2025年度") == [
+        Slot("10000100", "2025年度", "1T", "水", 1, 4, "詳細はもみじ教養HP参照(東広島開講)")
+    ]
+    # Full-width digits, several weekdays and rooms, and one term per group.
+    slots = parse_day_time_room("(前) 月５－６，木5:工220、工221 (3T) 金1-2:総K204")
+    assert [(s.term, s.weekday, s.start, s.end, s.room) for s in slots] == [
+        ("前", "月", 5, 6, "工220"),
+        ("前", "月", 5, 6, "工221"),
+        ("前", "木", 5, 5, "工220"),
+        ("前", "木", 5, 5, "工221"),
+        ("3T", "金", 1, 2, "総K204"),
+    ]
+    assert parse_day_time_room("火3-4:理E209", default_term="2T")[0].term == "2T"
+    assert parse_day_time_room("(3T) 集中") == []
+    # Several quarters in one group, with or without a T after each number.
+    for text, quarters in (
+        ("(1・2T) 月1-2:工220", {1, 2}),
+        ("(1T・2T) 月1-2:工220", {1, 2}),
+        ("(3T-4T) 月1:工220", {3, 4}),
+    ):
+        [slot] = parse_day_time_room(text)
+        assert (slot.term, slot.weekday, slot.room) == (text[1 : text.index(")")], "月", "工220")
+        assert term_quarters(slot.term) == quarters
+
+
+def test_slots_are_parsed_during_extraction(sample_html_small_dir: Path, monkeypatch):
+    import timetable
+
+    [subject] = Harvester(get_settings(None)).harvest_from_local(sample_html_small_dir)
+    assert subject._slots == timetable.parse_subject_slots(subject)
+    monkeypatch.setattr(timetable, "parse_day_time_room", lambda *args: [])
+    assert timetable.subject_slots(subject) == subject._slots != []
+
+
+def _subject(minimal_subject_data: dict, code: str, term: str, day_time_room: str) -> Subject:
+    return Subject(**{**minimal_subject_data, "講義コード": code, "開設期": term, "曜日・時限・講義室": day_time_room})
+
+
+def test_index_lookups_and_conflicts(tmp_path: Path, minimal_subject_data: dict):
+    index = TimetableIndex()
+    for code, term, dtr in [
+        ("A", "1年次生 前期 １ターム", "火3-4:工220"),
+        ("B", "1年次生 前期 ２ターム", "火3-4:工220"),  # Same room and time, but another term.
+        ("C", "1年次生 前期", "(前) 火4-5:工220"),  # Overlaps A and B.
+        ("D", "1年次生 前期 １ターム", "(1T) 火3-4:詳細はもみじ教養HP参照"),  # Not a real room.
+        ("E", "1年次生 前期 １ターム", "(1T) 火3-4:詳細はもみじ教養HP参照"),
+        ("F", "集中", "(集中) 集中:未定"),
+    ]:
+        index.add(_subject(minimal_subject_data, code, term, dtr))
+
+    assert {s.lecture_code for s in index.at("火", 4)} == {"A", "B", "C", "D", "E"}
+    assert {s.lecture_code for s in index.at("火", 3, term="2T")} == {"B"}
+    assert {s.lecture_code for s in index.in_room("工220", period=5)} == {"C"}
+    assert index.unscheduled == ["F"]
+    assert sorted((a.lecture_code, b.lecture_code) for a, b in index.conflicts()) == [("A", "C"), ("B", "C")]
+
+    path = tmp_path / "t.timetable.json"
+    index.write(path)
+    loaded = TimetableIndex.load(path)
+    assert loaded.slots == index.slots
+    assert loaded.at("火", 3, term="2T") == index.at("火", 3, term="2T")
+    assert list(loaded.conflicts()) == list(index.conflicts())
+
+
+def test_save_results_writes_timetable_index(tmp_path: Path, sample_html_small_dir: Path):
+    harv = Harvester(get_settings(None))
+    out = tmp_path / "out" / "data.json"
+    harv.save_results(harv.harvest_iter(sample_html_small_dir), out, timetable=True)
+    index = TimetableIndex.load(timetable_path(out))
+    assert [str(s) for s in index.at("水", 2)] == ["2025年度 10000100 (1T) 水1-4 詳細はもみじ教養HP参照(東広島開講)"]
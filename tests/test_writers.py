@@ -0,0 +1,94 @@
+import csv
+import json
+from pathlib import Path
+
+import pytest
+
+import config
+from harvester import Harvester
+from models import Subject
+from settings import get_settings
+from writers import CSV_COLUMNS, JsonlCsvWriter, OutputFormat
+
+
+def test_csv_columns_follow_canonical_headers():
+    aliases = [Subject.model_fields[name].alias for name in CSV_COLUMNS]
+    assert aliases == [*config.CANONICAL_HEADERS, "英語版"]
+
+
+def test_jsonl_matches_json_output(tmp_path: Path, minimal_subject_data: dict):
+    minimal = minimal_subject_data.copy()
+    minimal.update({"単位": "2.0", "授業科目名（フリガナ）": None})
+    subjects = [Subject(**minimal)]
+    harv = Harvester(get_settings(None))
+    out = tmp_path / "out.json"
+    count = harv.save_results(subjects, out, [OutputFormat.JSON, OutputFormat.JSONL])
+    assert count == 1
+    records = [json.loads(line) for line in out.with_suffix(".jsonl").read_text(encoding="utf-8").splitlines()]
+    assert records == json.loads(out.read_text(encoding="utf-8"))
+    assert records[0]["credits"] == 2
+    assert "subject_name_kana" not in records[0]
+
+
+def test_streaming_writer_csv_rows(tmp_path: Path, minimal_subject_data: dict):
+    out = tmp_path / "out.json"
+    with JsonlCsvWriter(out) as writer:
+        for code in ("10000100", "10000101"):
+            data = minimal_subject_data.copy()
+            data["講義コード"] = code
+            writer.write(Subject(**data))
+    assert writer.count == 2
+    with out.with_suffix(".csv").open(encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["lecture_code"] for r in rows] == ["10000100", "10000101"]
+    assert list(rows[0]) == CSV_COLUMNS
+    # None values are stripped from the record, leaving an empty CSV cell
+    assert rows[0]["subject_name_kana"] == ""
+
+
+def test_nested_values_are_json_in_tabular_outputs(tmp_path: Path, minimal_subject_data: dict):
+    subject = Subject(**minimal_subject_data, 英語版={"Course Title": "Test Subject"})
+    out = tmp_path / "out.json"
+    Harvester(get_settings(None)).save_results([subject], out, [OutputFormat.JSONL])
+    assert json.loads(out.with_suffix(".jsonl").read_text(encoding="utf-8"))["english"] == {
+        "Course Title": "Test Subject"
+    }
+    with out.with_suffix(".csv").open(encoding="utf-8", newline="") as f:
+        row = next(csv.DictReader(f))
+    assert json.loads(row["english"]) == {"Course Title": "Test Subject"}
+
+
+def test_streaming_writer_creates_nothing_without_records(tmp_path: Path):
+    out = tmp_path / "out.json"
+    assert Harvester(get_settings(None)).save_results(iter([]), out, [OutputFormat.JSONL]) == 0
+    assert not out.with_suffix(".jsonl").exists()
+
+
+def test_parquet_writer_row_groups_and_schema(tmp_path: Path, minimal_subject_data: dict):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    from writers import ParquetWriter
+
+    out = tmp_path / "out.json"
+    with ParquetWriter(out, row_group_size=2) as writer:
+        for code in ("10000100", "10000101", "10000102"):
+            data = minimal_subject_data.copy()
+            data["講義コード"] = code
+            writer.write(Subject(**data))
+
+    parquet_file = pq.ParquetFile(out.with_suffix(".parquet"))
+    assert parquet_file.metadata.num_row_groups == 2
+    table = parquet_file.read(columns=["lecture_code", "faculty", "credits"])
+    assert table.column("lecture_code").to_pylist() == ["10000100", "10000101", "10000102"]
+    assert pa.types.is_dictionary(table.schema.field("faculty").type)
+    assert table.column("credits").to_pylist() == [2, 2, 2]
+    assert parquet_file.schema_arrow.field("year").metadata == {b"alias": "年度".encode()}
+
+
+def test_save_results_parquet_format(tmp_path: Path, minimal_subject_data: dict):
+    pytest.importorskip("pyarrow")
+    out = tmp_path / "out.json"
+    count = Harvester(get_settings(None)).save_results([Subject(**minimal_subject_data)], out, [OutputFormat.PARQUET])
+    assert count == 1
+    assert out.with_suffix(".parquet").exists()
+    assert not out.exists()